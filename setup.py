@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 # Note: Do not embed any non-ASCII characters in this file until pip has been
 # fixed. See https://github.com/xonsh/xonsh/issues/487.
+import glob
+import importlib
 import os
 import subprocess
 import sys
@@ -8,6 +10,7 @@ import sys
 from setuptools import setup
 from setuptools.command.build_py import build_py
 from setuptools.command.develop import develop
+from setuptools.command.editable_wheel import editable_wheel
 from setuptools.command.install import install
 from setuptools.command.install_scripts import install_scripts
 from setuptools.command.sdist import sdist
@@ -16,6 +19,7 @@ from wheel.bdist_wheel import bdist_wheel
 TABLES = [
     "xonsh/lexer_table.py",
     "xonsh/parser_table.py",
+    "xonsh/parser_v*_table.py",
     "xonsh/completion_parser_table.py",
 ]
 
@@ -25,12 +29,16 @@ def python_tag():
     return f"py{ver.major}{ver.minor}"
 
 
+def table_files():
+    """The lexer/parser modules that exist in the source tree."""
+    return [f for pattern in TABLES for f in sorted(glob.glob(pattern))]
+
+
 def clean_tables():
     """Remove the lexer/parser modules that are dynamically created."""
-    for f in TABLES:
-        if os.path.isfile(f):
-            os.remove(f)
-            print("Removed " + f)
+    for f in table_files():
+        os.remove(f)
+        print("Removed " + f)
 
 
 os.environ["XONSH_DEBUG"] = "1"
@@ -41,20 +49,31 @@ def build_tables():
     print("Building lexer and parser tables.", file=sys.stderr)
     root_dir = os.path.abspath(os.path.dirname(__file__))
     sys.path.insert(0, root_dir)
-    from xonsh.parser import Parser
+    from xonsh.parser import GRAMMARS, table_module
     from xonsh.parsers.completion_context import CompletionContextParser
 
-    Parser(
-        yacc_table="parser_table",
-        outputdir=os.path.join(root_dir, "xonsh"),
-        yacc_debug=True,
-    )
+    # tables for every grammar, so that one source tree serves all Python versions
+    for grammar in GRAMMARS:
+        parser = importlib.import_module("xonsh.parsers." + grammar).Parser
+        parser(
+            yacc_table=table_module(grammar, package=None),
+            outputdir=os.path.join(root_dir, "xonsh"),
+            yacc_debug=True,
+        )
     CompletionContextParser(
         yacc_table="completion_parser_table",
         outputdir=os.path.join(root_dir, "xonsh"),
         debug=True,
     )
     sys.path.pop(0)
+    missing = [
+        name
+        for name in [table_module(g, package=None) for g in GRAMMARS]
+        + ["completion_parser_table"]
+        if not os.path.isfile(os.path.join(root_dir, "xonsh", name + ".py"))
+    ]
+    if missing:
+        raise RuntimeError("the parser tables were not built: " + ", ".join(missing))
 
 
 def dirty_version():
@@ -127,8 +146,10 @@ class xbuild_py(build_py):
     """Xonsh specialization of setuptools build_py class."""
 
     def run(self):
-        clean_tables()
-        build_tables()
+        # editable installs build the tables in xeditable_wheel
+        if not getattr(self, "editable_mode", False):
+            clean_tables()
+            build_tables()
         # add dirty version number
         dirty = dirty_version()
         super().run()
@@ -167,7 +188,7 @@ class xsdist(sdist):
         clean_tables()
         build_tables()
         dirty = dirty_version()
-        files.extend(TABLES)
+        files.extend(table_files())
         super().make_release_tree(basedir, files)
         if dirty:
             restore_version()
@@ -214,6 +235,20 @@ class install_scripts_rewrite(install_scripts):
                         f.write(processed)
 
 
+class xeditable_wheel(editable_wheel):
+    """Xonsh specialization of setuptools editable_wheel class, used by
+    ``pip install -e .``. It builds the tables in the source tree, which
+    editable installs import from. Unlike errors of build_py, which
+    setuptools only reports as warnings there, a failed build stops the
+    install.
+    """
+
+    def run(self):
+        clean_tables()
+        build_tables()
+        super().run()
+
+
 class xdevelop(develop):
     """Xonsh specialization of setuptools develop class."""
 
@@ -238,6 +273,7 @@ cmdclass = {
     "sdist": xsdist,
     "build_py": xbuild_py,
     "develop": xdevelop,
+    "editable_wheel": xeditable_wheel,
     "bdist_wheel": xbdist,
 }
 if os.name == "nt":
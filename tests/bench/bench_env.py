@@ -0,0 +1,76 @@
+"""Time of the environment operations that grow with its size.
+
+* ``env-path-add``: 2000 ``EnvPath.add(replace=True)`` on a 300 entries
+  ``$PATH``, each followed by a membership test;
+* ``env-construct``: building an ``Env`` from a 1000 variables environment,
+  as found in containers, and detyping it.
+
+The best time of the repeats is printed::
+
+    python tests/bench/bench_env.py
+    python tests/bench/bench_env.py env-construct -n 20
+"""
+
+import argparse
+import os
+import sys
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, REPO)
+
+from xonsh.environ import Env, EnvPath  # noqa: E402
+
+
+def env_path_add():
+    path = EnvPath([f"/opt/base{i}/bin" for i in range(300)])
+    for i in range(1000):
+        path.add(f"/opt/tool{i}/bin", front=True, replace=True)
+        f"/opt/base{i % 300}/bin" in path  # noqa: B015
+    for i in range(1000):
+        path.add(f"/opt/tool{i}/bin", replace=True)
+
+
+def env_construct():
+    environ = {f"CONTAINER_VAR_{i}": f"value-{i}" for i in range(1000)}
+    environ.update({f"TOOL_{i}_PATH": f"/opt/tool{i}/bin" for i in range(20)})
+    Env(environ).detype()
+
+
+CASES = {
+    "env-path-add": env_path_add,
+    "env-construct": env_construct,
+}
+
+
+def measure(func, repeat):
+    """Returns the best time of ``repeat`` calls of ``func``, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description="Times the environment operations that grow with its size.",
+        epilog="cases: " + ", ".join(CASES),
+    )
+    parser.add_argument("cases", nargs="*", help="the cases to time, all by default")
+    parser.add_argument(
+        "-n", "--repeat", type=int, default=5, help="runs of each case (5)"
+    )
+    ns = parser.parse_args(args)
+    cases = ns.cases or list(CASES)
+    unknown = set(cases).difference(CASES)
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(sorted(unknown))}")
+    for name in cases:
+        print(f"{name}: {measure(CASES[name], ns.repeat):.4f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""Time of re-parsing a multi-line block at the prompt while it is edited,
+with and without the line cache of the single-pass parser.
+
+A 50-line ``for`` block that mixes Python and subprocess lines is parsed
+in single mode, as the shell does on enter, after each of a series of edits
+that append a character to one of its lines. The edits visit every line in
+turn. The modes are:
+
+* ``retry``: the retry loop of the execer, ``$XONSH_SINGLE_PASS_PARSE`` off;
+* ``single-pass``: the single-pass parser without line cache;
+* ``line-cache``: the single-pass parser with the line cache.
+
+The best time per parse of the repeats is printed::
+
+    python tests/bench/bench_line_cache.py
+    python tests/bench/bench_line_cache.py line-cache -n 10
+"""
+
+import argparse
+import os
+import sys
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, REPO)
+
+from xonsh.built_ins import XSH  # noqa: E402
+from xonsh.environ import Env  # noqa: E402
+from xonsh.execer import Execer  # noqa: E402
+
+LINES = 50
+
+BODY = (
+    "    x = i * {n}",
+    "    ls -l /tmp/dir{n}",
+    "    echo @(x) {n}",
+    "    total += len(names) + {n}",
+    "    git status --short path{n}",
+    "    grep -r pattern . | head -n {n}",
+)
+
+MODES = {
+    "retry": (False, 0),
+    "single-pass": (True, 0),
+    "line-cache": (True, 512),
+}
+
+
+def block_edits():
+    """Returns the block, and its versions after each edit."""
+    lines = ["for i in range(3):"]
+    lines += [BODY[n % len(BODY)].format(n=n) for n in range(LINES - 1)]
+    block = "\n".join(lines) + "\n"
+    versions = []
+    for n in range(1, LINES):
+        lines[n] += "0"
+        versions.append("\n".join(lines) + "\n")
+    return block, versions
+
+
+def measure(single_pass, cache_size, block, versions, repeat):
+    """Returns the best time per parse of ``repeat`` runs over the
+    ``versions`` of the ``block``, in seconds.
+    """
+    XSH.env = Env({"XONSH_PARSER_LINE_CACHE_SIZE": cache_size})
+    execer = XSH.execer = Execer(single_pass=single_pass)
+    ctx = {"names", "total"}
+    best = float("inf")
+    for _ in range(repeat):
+        execer.line_cache.clear()
+        # the block as it was before the edits, e.g. recalled from history
+        execer.parse(block, ctx, mode="single")
+        start = time.perf_counter()
+        for src in versions:
+            execer.parse(src, ctx, mode="single")
+        best = min(best, (time.perf_counter() - start) / len(versions))
+    return best
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description="Times re-parsing an edited block, with and without the "
+        "line cache.",
+        epilog="modes: " + ", ".join(MODES),
+    )
+    parser.add_argument("modes", nargs="*", help="modes to time (all)")
+    parser.add_argument(
+        "-n", "--repeat", type=int, default=5, help="runs of the edits (5)"
+    )
+    ns = parser.parse_args(args)
+    block, versions = block_edits()
+    for mode in ns.modes or MODES:
+        best = measure(*MODES[mode], block, versions, ns.repeat)
+        print(f"{mode:<12} {best * 1000:8.2f} ms per parse")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
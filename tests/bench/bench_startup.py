@@ -0,0 +1,416 @@
+"""Startup budget of xonsh in its common launch modes.
+
+Every mode runs xonsh from this checkout in a fresh interpreter, with a
+scratch home directory, and records:
+
+* ``wall``: the wall time in seconds until the command exits, or until the
+  first prompt is printed for the interactive modes;
+* ``rss``: the peak resident set size of the process in bytes;
+* ``modules``: the number of entries of ``sys.modules`` when xonsh exits.
+
+The best wall time and the largest RSS and module count of the repeats are
+kept. Results can be saved as a JSON baseline and later runs compared
+against it; a run exits with status 1 when a mode goes over its budget::
+
+    python tests/bench/bench_startup.py --save
+    python tests/bench/bench_startup.py
+    python tests/bench/bench_startup.py c-pass script -n 10
+
+Nothing is downloaded, the benchmark runs offline. Baselines are specific to
+a machine and a Python build, so they are not tracked by git.
+
+The parser tables must be built beforehand, e.g. by ``pip install -e .``,
+and the run fails if xonsh regenerates them: their generation would
+otherwise be measured as startup time.
+"""
+
+import argparse
+import contextlib
+import glob
+import json
+import os
+import platform
+import select
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, REPO)
+
+from xonsh.parser import table_module  # noqa: E402
+
+BASELINE = os.path.join(REPO, "tests", "bench", "startup_baseline.json")
+PROMPT = "@xonsh-bench@ "
+CURSOR_QUERY = b"\x1b[6n"
+
+# Runs xonsh and writes the number of imported modules when it exits.
+BOOT = (
+    "import atexit, os, sys\n"
+    "def _count(path=os.environ['XONSH_BENCH_MODULES']):\n"
+    "    with open(path, 'w') as f:\n"
+    "        f.write(str(len(sys.modules)))\n"
+    "atexit.register(_count)\n"
+    "sys.argv[0] = 'xonsh'\n"
+    "from xonsh.main import main\n"
+    "main()\n"
+)
+
+SCRIPT = """\
+import os
+def fib(n):
+    return n if n < 2 else fib(n - 1) + fib(n - 2)
+aliases["bench-hello"] = "echo hello"
+$BENCH_VALUE = str(fib(15))
+for i in range(3):
+    x = ${...}.get("BENCH_VALUE")
+print(x, os.path.basename($PWD))
+"""
+
+RC_BLOCK = """\
+$BENCH_VAR_{i} = "value-{i}"
+aliases["bench-{i}"] = "echo {i}"
+def _bench_func_{i}(args, stdin=None):
+    return "{i} " + " ".join(args)
+aliases["bench-func-{i}"] = _bench_func_{i}
+if {i} % 10 == 0:
+    $PATH.append("/nonexistent/bench/{i}")
+"""
+
+MODES = {
+    "c-pass": "xonsh --no-rc -c pass",
+    "script": "xonsh --no-rc script.xsh",
+    "ptk-prompt": "interactive prompt_toolkit shell, until the first prompt",
+    "rc-interactive": "xonsh -i --rc large_rc.xsh -c pass",
+}
+
+TOLERANCES = {"wall": 0.25, "rss": 0.10, "modules": 5}
+"""Allowed growth over the baseline: a fraction of it for the wall time and
+RSS, a number of modules for the module count.
+"""
+
+WALL_SLACK = 0.02
+"""Wall time increases below this many seconds are never regressions."""
+
+
+def synthetic_rc(blocks=250):
+    """Returns the source of a large rc file, of about 7 lines per block."""
+    return "".join(RC_BLOCK.format(i=i) for i in range(blocks))
+
+
+def _rss(rusage):
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return rusage.ru_maxrss * scale
+
+
+class Runner:
+    """Runs the launch modes in a scratch directory."""
+
+    def __init__(self, workdir, python=sys.executable, rc_blocks=250, timeout=60):
+        self.workdir = workdir
+        self.python = python
+        self.timeout = timeout
+        self.script = os.path.join(workdir, "script.xsh")
+        self.rc = os.path.join(workdir, "large_rc.xsh")
+        self.modules_file = os.path.join(workdir, "modules")
+        home = os.path.join(workdir, "home")
+        os.makedirs(home, exist_ok=True)
+        with open(self.script, "w") as f:
+            f.write(SCRIPT)
+        with open(self.rc, "w") as f:
+            f.write(synthetic_rc(rc_blocks))
+        env = {k: v for k, v in os.environ.items() if not k.startswith("XONSH")}
+        pythonpath = [REPO, env.get("PYTHONPATH", "")]
+        env.update(
+            HOME=home,
+            XDG_CONFIG_HOME=os.path.join(home, ".config"),
+            XDG_DATA_HOME=os.path.join(home, ".local", "share"),
+            XDG_CACHE_HOME=os.path.join(home, ".cache"),
+            PYTHONPATH=os.pathsep.join(filter(None, pythonpath)),
+            XONSH_HISTORY_BACKEND="dummy",
+            XONSH_BENCH_MODULES=self.modules_file,
+            TERM="xterm",
+        )
+        self.env = env
+
+    def argv(self, *args):
+        return [self.python, "-c", BOOT, *args]
+
+    def measure(self, mode):
+        """Returns the measures of one run of ``mode``."""
+        if os.path.exists(self.modules_file):
+            os.remove(self.modules_file)
+        if mode == "c-pass":
+            wall, rusage = self._run(self.argv("--no-rc", "-c", "pass"))
+        elif mode == "script":
+            wall, rusage = self._run(self.argv("--no-rc", self.script))
+        elif mode == "rc-interactive":
+            argv = self.argv("-i", "--rc", self.rc, "-c", "pass")
+            wall, rusage = self._run(argv)
+        elif mode == "ptk-prompt":
+            argv = self.argv(
+                "-i",
+                "--no-rc",
+                "--shell-type=prompt_toolkit",
+                f"-DPROMPT={PROMPT}",
+            )
+            wall, rusage = self._run_pty(argv)
+        else:
+            raise ValueError(f"unknown launch mode: {mode!r}")
+        with open(self.modules_file) as f:
+            modules = int(f.read())
+        return {"wall": wall, "rss": _rss(rusage), "modules": modules}
+
+    def _run(self, argv):
+        with tempfile.TemporaryFile() as err:
+            start = time.perf_counter()
+            proc = subprocess.Popen(
+                argv,
+                env=self.env,
+                cwd=self.workdir,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=err,
+            )
+            # wait4() instead of Popen.wait() for the usage of the child
+            killer = threading.Timer(self.timeout, proc.kill)
+            killer.start()
+            try:
+                _, status, rusage = os.wait4(proc.pid, 0)
+            finally:
+                killer.cancel()
+            wall = time.perf_counter() - start
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            if proc.returncode:
+                err.seek(0)
+                msg = err.read().decode(errors="replace").strip()
+                raise RuntimeError(f"{argv[3:]} exited with {proc.returncode}: {msg}")
+        return wall, rusage
+
+    def _run_pty(self, argv):
+        import pty
+
+        start = time.perf_counter()
+        pid, fd = pty.fork()
+        if pid == 0:  # child
+            try:
+                os.chdir(self.workdir)
+                os.execve(argv[0], argv, self.env)
+            finally:
+                os._exit(127)
+        output = b""
+        wall = None
+        try:
+            deadline = start + self.timeout
+            marker = PROMPT.strip().encode()
+            while wall is None:
+                chunk = self._read(fd, deadline)
+                if not chunk:
+                    break
+                output += chunk
+                if CURSOR_QUERY in chunk:
+                    # answer the cursor position request of prompt_toolkit
+                    os.write(fd, b"\x1b[1;1R")
+                if marker in output:
+                    wall = time.perf_counter() - start
+            if wall is not None:
+                os.write(fd, b"exit\r")
+                while self._read(fd, deadline):
+                    pass
+        finally:
+            if wall is None:
+                with contextlib.suppress(OSError):
+                    os.kill(pid, 9)
+            _, status, rusage = os.wait4(pid, 0)
+            os.close(fd)
+        if wall is None:
+            tail = output[-500:].decode(errors="replace")
+            raise RuntimeError(f"no prompt within {self.timeout}s: {tail!r}")
+        if os.waitstatus_to_exitcode(status):
+            raise RuntimeError(f"interactive xonsh exited with status {status}")
+        return wall, rusage
+
+    @staticmethod
+    def _read(fd, deadline):
+        timeout = deadline - time.perf_counter()
+        if timeout <= 0 or not select.select([fd], [], [], timeout)[0]:
+            raise TimeoutError("xonsh did not answer in time")
+        try:
+            return os.read(fd, 4096)
+        except OSError:  # EIO once the child closed the terminal
+            return b""
+
+
+def _table_mtimes(repo):
+    pattern = os.path.join(repo, "xonsh", "parser_*_table.py")
+    return {path: os.stat(path).st_mtime_ns for path in glob.glob(pattern)}
+
+
+@contextlib.contextmanager
+def prebuilt_parser_tables(repo=REPO):
+    """Raises :class:`RuntimeError` if the parser tables of the grammar of
+    this Python are missing from ``repo``, or if they were written while
+    the block ran.
+    """
+    table = os.path.join(repo, "xonsh", table_module(package=None) + ".py")
+    if not os.path.isfile(table):
+        raise RuntimeError(
+            f"{table} is missing, build the parser tables first, "
+            "e.g. with 'pip install -e .'"
+        )
+    before = _table_mtimes(repo)
+    yield
+    if _table_mtimes(repo) != before:
+        raise RuntimeError("xonsh regenerated its parser tables during the run")
+
+
+def run(modes, repeat=5, rc_blocks=250, timeout=60, log=None):
+    """Measures every mode ``repeat`` times, returns the results by mode."""
+    results = {}
+    with (
+        prebuilt_parser_tables(),
+        tempfile.TemporaryDirectory(prefix="xonsh-bench-") as workdir,
+    ):
+        runner = Runner(workdir, rc_blocks=rc_blocks, timeout=timeout)
+        runner.measure(modes[0])  # warm up the bytecode and disk caches
+        for mode in modes:
+            runs = [runner.measure(mode) for _ in range(repeat)]
+            results[mode] = {
+                "wall": min(r["wall"] for r in runs),
+                "rss": max(r["rss"] for r in runs),
+                "modules": max(r["modules"] for r in runs),
+            }
+            if log is not None:
+                print(f"{mode:<15} {format_result(results[mode])}", file=log)
+    return results
+
+
+def compare(results, baseline, tolerances=None):
+    """Returns the regressions of ``results`` over the ``baseline`` results,
+    as a list of ``(mode, measure, value, budget)`` tuples.
+    """
+    tolerances = {**TOLERANCES, **(tolerances or {})}
+    regressions = []
+    for mode, result in results.items():
+        base = baseline.get(mode)
+        if base is None:
+            continue
+        budgets = {
+            "wall": base["wall"] + max(base["wall"] * tolerances["wall"], WALL_SLACK),
+            "rss": base["rss"] * (1 + tolerances["rss"]),
+            "modules": base["modules"] + tolerances["modules"],
+        }
+        for measure, budget in budgets.items():
+            if result[measure] > budget:
+                regressions.append((mode, measure, result[measure], budget))
+    return regressions
+
+
+def format_result(result):
+    return (
+        f"{result['wall'] * 1e3:8.1f} ms {result['rss'] / 2**20:7.1f} MiB "
+        f"{result['modules']:5d} modules"
+    )
+
+
+def machine():
+    """Describes what the results depend on besides xonsh itself."""
+    return {
+        "python": platform.python_implementation() + " " + platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def load_baseline(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path, results):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    data = {"machine": machine(), "results": results}
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def make_parser():
+    parser = argparse.ArgumentParser(
+        description="Measures the startup of xonsh and compares it to a baseline.",
+        epilog="modes: "
+        + "; ".join(f"{name} ({desc})" for name, desc in MODES.items()),
+    )
+    parser.add_argument(
+        "modes",
+        nargs="*",
+        help="the launch modes to measure, all by default",
+    )
+    parser.add_argument(
+        "-n", "--repeat", type=int, default=5, help="runs of each mode (5)"
+    )
+    parser.add_argument("--baseline", default=BASELINE, help="the JSON baseline file")
+    parser.add_argument(
+        "--save",
+        action="store_true",
+        help="write the results to the baseline instead of comparing them",
+    )
+    parser.add_argument(
+        "--rc-blocks",
+        type=int,
+        default=250,
+        help="blocks of 7 lines in the large rc file (250)",
+    )
+    parser.add_argument("--timeout", type=float, default=60, help="per run, in s")
+    for measure, default in TOLERANCES.items():
+        parser.add_argument(
+            f"--{measure}-tolerance",
+            type=type(default),
+            default=default,
+            help=f"allowed growth of {measure} ({default})",
+        )
+    return parser
+
+
+def main(args=None):
+    parser = make_parser()
+    ns = parser.parse_args(args)
+    modes = ns.modes or list(MODES)
+    unknown = set(modes).difference(MODES)
+    if unknown:
+        parser.error(f"unknown modes: {', '.join(sorted(unknown))}")
+    results = run(
+        modes,
+        repeat=ns.repeat,
+        rc_blocks=ns.rc_blocks,
+        timeout=ns.timeout,
+        log=sys.stdout,
+    )
+    if ns.save:
+        if os.path.exists(ns.baseline):
+            # keep the modes that were not measured this time
+            results = {**load_baseline(ns.baseline)["results"], **results}
+        save_baseline(ns.baseline, results)
+        print(f"baseline saved to {ns.baseline}")
+        return 0
+    if not os.path.exists(ns.baseline):
+        print(f"no baseline at {ns.baseline}, create one with --save")
+        return 0
+    baseline = load_baseline(ns.baseline)
+    if baseline.get("machine") != machine():
+        print(f"warning: the baseline was measured on {baseline.get('machine')}")
+    tolerances = {m: getattr(ns, f"{m}_tolerance") for m in TOLERANCES}
+    regressions = compare(results, baseline["results"], tolerances)
+    for mode, measure, value, budget in regressions:
+        print(f"REGRESSION {mode} {measure}: {value:.6g} > budget {budget:.6g}")
+    if regressions:
+        return 1
+    print("all modes within budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""Time of the xonsh tokenizer on the sources of xonsh and the test scripts.
+
+The best time of the repeats is printed, with the number of files and
+tokens::
+
+    python tests/bench/bench_tokenize.py
+    python tests/bench/bench_tokenize.py -n 10
+"""
+
+import argparse
+import glob
+import io
+import os
+import sys
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, REPO)
+
+from xonsh.parsers.tokenize import tokenize  # noqa: E402
+
+
+def corpus():
+    """Returns the contents of the files that are tokenized."""
+    files = glob.glob(os.path.join(REPO, "xonsh", "**", "*.py"), recursive=True)
+    files += glob.glob(os.path.join(REPO, "tests", "**", "*.xsh"), recursive=True)
+    contents = []
+    for fname in sorted(files):
+        if fname.endswith("_table.py"):
+            continue
+        with open(fname, "rb") as f:
+            contents.append(f.read())
+    return contents
+
+
+def tokenize_all(contents):
+    """Tokenizes every file, returns the number of tokens."""
+    ntoks = 0
+    for data in contents:
+        for _ in tokenize(io.BytesIO(data).readline, tolerant=True):
+            ntoks += 1
+    return ntoks
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description="Times the xonsh tokenizer on the xonsh sources."
+    )
+    parser.add_argument(
+        "-n", "--repeat", type=int, default=5, help="runs of the corpus (5)"
+    )
+    ns = parser.parse_args(args)
+    contents = corpus()
+    best = float("inf")
+    for _ in range(ns.repeat):
+        start = time.perf_counter()
+        ntoks = tokenize_all(contents)
+        best = min(best, time.perf_counter() - start)
+    print(f"{len(contents)} files, {ntoks} tokens: {best:.3f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,13 @@
+import pytest
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip the tests marked ``bench``, which launch xonsh processes, unless
+    they are selected with ``-m bench``.
+    """
+    if "bench" in config.getoption("markexpr"):
+        return
+    skip = pytest.mark.skip(reason="launches xonsh, select with -m bench")
+    for item in items:
+        if item.get_closest_marker("bench"):
+            item.add_marker(skip)
@@ -0,0 +1,123 @@
+"""Tests for the startup benchmark harness in ``bench_startup.py``."""
+
+import json
+import os
+import sys
+
+import bench_startup
+import pytest
+from bench_startup import (
+    Runner,
+    compare,
+    load_baseline,
+    main,
+    prebuilt_parser_tables,
+    synthetic_rc,
+)
+
+from xonsh.parser import table_module
+
+posix_only = pytest.mark.skipif(
+    sys.platform.startswith("win"), reason="measures through wait4() and a pty"
+)
+BASE = {"wall": 0.2, "rss": 40 * 2**20, "modules": 250}
+
+
+def result(**kw):
+    return {**BASE, **kw}
+
+
+def test_compare_within_budget():
+    results = {"c-pass": result(wall=0.24, rss=43 * 2**20, modules=255)}
+    assert compare(results, {"c-pass": BASE}) == []
+
+
+@pytest.mark.parametrize(
+    "measure, value",
+    [("wall", 0.3), ("rss", 50 * 2**20), ("modules", 256)],
+)
+def test_compare_flags_regressions(measure, value):
+    results = {"c-pass": result(**{measure: value})}
+    (regression,) = compare(results, {"c-pass": BASE})
+    assert regression[:3] == ("c-pass", measure, value)
+
+
+def test_compare_wall_slack_and_tolerances():
+    base = {"c-pass": result(wall=0.01)}
+    # 50% slower, but by less than the absolute slack
+    assert compare({"c-pass": result(wall=0.015)}, base) == []
+    assert compare({"c-pass": result(modules=251)}, {"c-pass": BASE}, {"modules": 0})
+
+
+def test_compare_skips_modes_without_baseline():
+    assert compare({"script": result(wall=10.0)}, {"c-pass": BASE}) == []
+
+
+def test_synthetic_rc_is_valid_xonsh(xonsh_execer):
+    src = synthetic_rc(3)
+    assert src.count("aliases[") == 6
+    assert xonsh_execer.parse(src, ctx=None) is not None
+
+
+@pytest.fixture
+def runner(tmp_path):
+    return Runner(str(tmp_path), rc_blocks=20)
+
+
+@posix_only
+@pytest.mark.bench
+@pytest.mark.parametrize("mode", ["c-pass", "script", "rc-interactive"])
+def test_measure(runner, mode):
+    obs = runner.measure(mode)
+    assert obs["wall"] > 0
+    assert obs["rss"] > 2**20
+    assert obs["modules"] > 100
+
+
+@posix_only
+@pytest.mark.bench
+def test_measure_ptk_prompt(runner):
+    pytest.importorskip("prompt_toolkit")
+    obs = runner.measure("ptk-prompt")
+    assert obs["modules"] > runner.measure("c-pass")["modules"]
+
+
+def test_save_then_compare(tmp_path, monkeypatch, capsys):
+    fake = {"c-pass": BASE}
+    monkeypatch.setattr(bench_startup, "run", lambda modes, **kw: dict(fake))
+    path = str(tmp_path / "baseline.json")
+    assert main(["c-pass", "--baseline", path]) == 0
+    assert "--save" in capsys.readouterr().out
+    assert main(["c-pass", "--baseline", path, "--save"]) == 0
+    assert load_baseline(path)["results"] == fake
+    assert main(["c-pass", "--baseline", path]) == 0
+    fake["c-pass"] = result(modules=300)
+    assert main(["c-pass", "--baseline", path]) == 1
+    assert "REGRESSION c-pass modules" in capsys.readouterr().out
+
+
+def test_save_keeps_other_modes(tmp_path, monkeypatch):
+    path = tmp_path / "baseline.json"
+    path.write_text(json.dumps({"results": {"script": BASE}}))
+    monkeypatch.setattr(bench_startup, "run", lambda modes, **kw: {"c-pass": BASE})
+    main(["c-pass", "--baseline", str(path), "--save"])
+    assert set(load_baseline(str(path))["results"]) == {"c-pass", "script"}
+
+
+def test_prebuilt_parser_tables(tmp_path):
+    (tmp_path / "xonsh").mkdir()
+    with pytest.raises(RuntimeError, match="missing"):
+        with prebuilt_parser_tables(str(tmp_path)):
+            pass
+    table = tmp_path / "xonsh" / (table_module(package=None) + ".py")
+    table.write_text("")
+    with prebuilt_parser_tables(str(tmp_path)):
+        pass
+    with pytest.raises(RuntimeError, match="regenerated"):
+        with prebuilt_parser_tables(str(tmp_path)):
+            os.utime(table, ns=(0, 0))
+
+
+def test_unknown_mode():
+    with pytest.raises(SystemExit):
+        main(["nope"])
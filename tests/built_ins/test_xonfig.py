@@ -29,6 +29,7 @@ def test_xonfig_help(capsys, xession):
     assert verbs == {
         "info",
         "styles",
+        "cache",
         "wizard",
         "web",
         "colors",
@@ -1,4 +1,4 @@
-from xonsh.lib.collections import ChainDB
+from xonsh.lib.collections import ChainDB, LRUCache
 
 
 def test_dddi():
@@ -185,3 +185,22 @@ def test_lazy_all_with_mixed_mapping_and_scalar():
     z.maps.append(m2)
     # mixed types fall to else branch; reversed gives last mapping priority
     assert z["a"]["b"] == {"nested": 2}
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache["a"] = 1
+    cache["b"] = 2
+    assert cache.get("a") == 1
+    cache["c"] = 3
+    assert "b" not in cache
+    assert "a" in cache and "c" in cache
+    assert cache.get("b") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "size": 2, "maxsize": 2}
+
+
+def test_lru_cache_zero_size_stores_nothing():
+    cache = LRUCache(maxsize=0)
+    cache["a"] = 1
+    assert len(cache) == 0
+    assert cache.get("a", "default") == "default"
@@ -0,0 +1,89 @@
+"""Tests for the startup profiler behind ``xonsh --timings``."""
+
+import builtins
+import sys
+
+import pytest
+
+from xonsh.lib import lazyasd
+from xonsh.lib.startup_profile import StartupProfiler
+
+
+@pytest.fixture
+def profiler():
+    prof = StartupProfiler()
+    prof.start()
+    yield prof
+    prof.stop()
+
+
+def test_frames_record_self_time():
+    prof = StartupProfiler()
+    prof.start_time = 0.0
+    with prof.frame("outer"):
+        with prof.frame("inner"):
+            pass
+        with prof.frame("inner"):
+            pass
+    prof.stop()
+    assert set(prof.stacks) == {
+        ("xonsh",),
+        ("xonsh", "outer"),
+        ("xonsh", "outer", "inner"),
+    }
+    totals = prof.totals()
+    assert totals["outer"] >= totals["inner"] > 0
+    for line in prof.folded(unit=1e9).splitlines():
+        stack, value = line.rsplit(" ", 1)
+        assert stack.startswith("xonsh")
+        assert int(value) > 0
+
+
+def test_frames_closed_out_of_order():
+    prof = StartupProfiler()
+    outer = prof.push("outer")
+    inner = prof.push("inner")
+    prof.pop(outer)
+    prof.pop(inner)
+    assert ("xonsh", "outer") in prof.stacks
+    assert ("xonsh", "inner") in prof.stacks
+
+
+def test_imports_are_recorded(profiler, tmp_path, monkeypatch):
+    (tmp_path / "profiled_mod_a.py").write_text("import profiled_mod_b\n")
+    (tmp_path / "profiled_mod_b.py").write_text("X = 1\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    for name in ("profiled_mod_a", "profiled_mod_b"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    import profiled_mod_a  # noqa: F401
+
+    __import__("sys")  # already loaded, not recorded
+
+    stacks = set(profiler.stacks)
+    assert ("xonsh", "import profiled_mod_a") in stacks
+    assert ("xonsh", "import profiled_mod_a", "import profiled_mod_b") in stacks
+    assert not any("import sys" in names for names in stacks)
+
+
+def test_lazy_loads_name_their_call_site(profiler):
+    obj = lazyasd.LazyObject(lambda: [1], {"__name__": "mymod"}, "THING")
+    flag = lazyasd.LazyBool(lambda: True, {"__name__": "mymod"}, "FLAG")
+    assert obj[0] == 1
+    assert flag
+    assert obj[0] == 1  # loaded once
+    names = [names[-1] for names in profiler.stacks]
+    here = f"{__name__}:"
+    assert [n for n in names if n.startswith("lazy mymod.THING <- " + here)]
+    assert [n for n in names if n.startswith("lazy mymod.FLAG <- " + here)]
+    assert len([n for n in names if "THING" in n]) == 1
+
+
+def test_stop_removes_hooks():
+    import_ = builtins.__import__
+    lazy_obj = lazyasd.LazyObject._lazy_obj
+    prof = StartupProfiler()
+    prof.start()
+    assert builtins.__import__ is not import_
+    prof.stop()
+    assert builtins.__import__ is import_
+    assert lazyasd.LazyObject._lazy_obj is lazy_obj
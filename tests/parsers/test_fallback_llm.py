@@ -0,0 +1,170 @@
+"""Tests for the parser backend selection, the fallback parser and the
+parity harness.
+"""
+
+import ast
+import importlib
+import sys
+import types
+
+import pytest
+
+from xonsh import parser as parser_mod
+from xonsh.parser import parser_backend
+from xonsh.parsers.fallback import FallbackParser
+from xonsh.parsers.parity import compare_file, run_parity, summarize
+
+
+class FakeRDParser:
+    """Accepts plain Python only, like a parser without xonsh extensions."""
+
+    def parse(self, s, filename="<code>", mode="exec", **_):
+        return ast.parse(s, filename=filename, mode=mode)
+
+
+class FailingParser:
+    def __init__(self, **_):
+        self.lexer = object()
+
+    def parse(self, s, **_):
+        raise SyntaxError("nope")
+
+
+@pytest.mark.parametrize(
+    "environ, available, exp",
+    [
+        ({}, True, "ply"),
+        ({"XONSH_PARSER": "rd"}, False, "rd"),
+        ({"XONSH_PARSER": "RD"}, False, "rd"),
+        ({"XONSH_PARSER": "auto"}, True, "auto"),
+        ({"XONSH_PARSER": "auto"}, False, "ply"),
+        ({"XONSH_PARSER": "bogus"}, True, "ply"),
+        ({"XONSH_RD_PARSER": "1"}, False, "rd"),
+        ({"XONSH_PARSER": "ply", "XONSH_RD_PARSER": "1"}, True, "ply"),
+    ],
+)
+def test_parser_backend(environ, available, exp, monkeypatch):
+    monkeypatch.setattr(parser_mod, "rd_parser_available", lambda: available)
+    assert parser_backend(environ) == exp
+
+
+def test_fallback_parser_uses_primary(parser):
+    fp = FallbackParser(FakeRDParser, lambda **_: parser)
+    tree = fp.parse("x = 1\n")
+    assert isinstance(tree, ast.Module)
+    assert (fp.primary_parses, fp.fallback_parses) == (1, 0)
+    assert fp.lexer is parser.lexer
+
+
+def test_fallback_parser_falls_back_per_input(parser):
+    fp = FallbackParser(FakeRDParser, lambda **_: parser)
+    tree = fp.parse("x = $HOME\n")
+    assert "__xonsh__" in ast.dump(tree)
+    fp.parse("y = 2\n")
+    assert (fp.primary_parses, fp.fallback_parses) == (1, 1)
+
+
+def test_fallback_parser_reports_fallback_errors():
+    fp = FallbackParser(FailingParser, FailingParser)
+    with pytest.raises(SyntaxError, match="nope"):
+        fp.parse("x = (\n")
+
+
+def test_fallback_parser_raises_other_errors(parser):
+    class BrokenParser:
+        def parse(self, s, **_):
+            raise TypeError("a bug")
+
+    fp = FallbackParser(BrokenParser, lambda **_: parser)
+    with pytest.raises(TypeError, match="a bug"):
+        fp.parse("x = 1\n")
+    assert fp.fallback_parses == 0
+
+
+def test_fallback_parser_delegates_attributes(parser):
+    fp = FallbackParser(FakeRDParser, lambda **_: parser)
+    assert fp.reset == parser.reset
+
+
+@pytest.fixture
+def rd_parser(monkeypatch):
+    """The RD parser module, over a stand-in for ``xonsh_rd_parser`` that
+    returns the trees given to it.
+    """
+
+    class RDParser:
+        trees = {}
+
+        def __init__(self, s, file_name="<code>"):
+            self.s = s
+
+        def parse(self):
+            return self.trees[self.s]
+
+    fake = types.ModuleType("xonsh_rd_parser")
+    fake.Parser = RDParser
+    monkeypatch.setitem(sys.modules, "xonsh_rd_parser", fake)
+    monkeypatch.delitem(sys.modules, "xonsh.parsers.rd_parser", raising=False)
+    yield importlib.import_module("xonsh.parsers.rd_parser")
+    sys.modules.pop("xonsh.parsers.rd_parser", None)
+    vars(sys.modules["xonsh.parsers"]).pop("rd_parser", None)
+
+
+@pytest.mark.parametrize(
+    "mode, tree",
+    [
+        ("eval", ast.parse("x = 1\n")),
+        ("eval", ast.parse("x\ny\n")),
+        ("eval", ast.parse("")),
+        ("single", ast.Expression(body=ast.Constant(1))),
+    ],
+)
+def test_rd_parser_modes_fall_back(rd_parser, parser, mode, tree):
+    """Inputs that the RD parser cannot give in eval or single mode are
+    parsed by PLY.
+    """
+    src = "$HOME\n"
+    rd_parser.RDParser.trees[src] = tree
+    with pytest.raises(SyntaxError) as exc:
+        rd_parser.Parser().parse(src, mode=mode)
+    assert exc.value.loc.lineno == 1
+    fp = FallbackParser(rd_parser.Parser, lambda **_: parser)
+    tree = fp.parse(src, mode=mode)
+    assert "__xonsh__" in ast.dump(tree)
+    assert (fp.primary_parses, fp.fallback_parses) == (0, 1)
+
+
+def test_rd_parser_modes(rd_parser):
+    rd_parser.RDParser.trees["x\n"] = ast.parse("x\n")
+    tree = rd_parser.Parser().parse("x\n", mode="eval")
+    assert isinstance(tree, ast.Expression)
+    tree = rd_parser.Parser().parse("x\n", mode="single")
+    assert isinstance(tree, ast.Interactive)
+
+
+def test_parity(parser, tmp_path):
+    (tmp_path / "same.py").write_text("x = 1\n")
+    (tmp_path / "xonsh.xsh").write_text("x = $HOME\n")
+    (tmp_path / "bad.xsh").write_text("x = (\n")
+    results = run_parity([str(tmp_path)], ply_parser=parser, rd_parser=FakeRDParser())
+    statuses = {r.path.rpartition("/")[2]: r.status for r in results}
+    assert statuses == {
+        "same.py": "same",
+        "xonsh.xsh": "rd-error",
+        "bad.xsh": "both-error",
+    }
+    summary = summarize(results)
+    assert summary["files"] == 3
+    assert summary["same"] == 1
+
+
+def test_parity_reports_diff(parser, tmp_path):
+    class Other(FakeRDParser):
+        def parse(self, s, **kwargs):
+            return super().parse("y = 2\n", **kwargs)
+
+    path = tmp_path / "a.py"
+    path.write_text("x = 1\n")
+    res = compare_file(str(path), parser, Other())
+    assert res.status == "diff"
+    assert "ply:" in res.detail
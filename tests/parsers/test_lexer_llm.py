@@ -0,0 +1,125 @@
+"""Tests for the token stream cache shared by the xonsh lexers."""
+
+import threading
+
+import pytest
+
+from xonsh.parsers import lexer as lexer_mod
+from xonsh.parsers.lexer import (
+    TOKEN_STREAMS,
+    Lexer,
+    TokenStream,
+    TokenStreamCache,
+    _new_token,
+)
+
+
+def tokens_of(lexer, s, **kwargs):
+    lexer.input(s, **kwargs)
+    return [(t.type, t.value, t.lineno, t.lexpos) for t in lexer]
+
+
+@pytest.fixture
+def streams(monkeypatch):
+    cache = TokenStreamCache(maxsize=8)
+    monkeypatch.setattr(lexer_mod, "TOKEN_STREAMS", cache)
+    return cache
+
+
+@pytest.mark.parametrize(
+    "inp",
+    [
+        "x = 1\n",
+        "ls -l | grep x\n",
+        "if True:\n    echo $(ls)\n",
+        "x = (1,\n",
+        "echo 'unterminated\n",
+    ],
+)
+@pytest.mark.parametrize("tolerant", [False, True])
+def test_cached_tokens_match_uncached(inp, tolerant, streams):
+    uncached = TokenStreamCache(maxsize=0)
+    exp = [
+        (t.type, t.value, t.lineno, t.lexpos)
+        for t in uncached.stream(inp, tolerant)
+        if not isinstance(t.value, Exception)
+    ]
+    lexer = Lexer(tolerant=tolerant)
+    for _ in range(2):
+        obs = tokens_of(lexer, inp)
+        obs = [tok for tok in obs if not isinstance(tok[1], Exception)]
+        assert obs == exp
+
+
+def test_stream_is_shared_between_lexers(streams):
+    first = Lexer()
+    first.input("echo hello\n")
+    tok = first.token()
+    second = Lexer()
+    assert tokens_of(second, "echo hello\n")[0] == (
+        tok.type,
+        tok.value,
+        tok.lineno,
+        tok.lexpos,
+    )
+    assert streams.stats()["hits"] == 1
+    assert streams.stats()["size"] == 1
+    # readers get their own token objects
+    second.input("echo hello\n")
+    assert second.token() is not tok
+
+
+def test_lexer_error_reaches_every_reader():
+    def failing():
+        yield _new_token("NAME", "x", (1, 0))
+        yield _new_token("EQUALS", "=", (1, 2))
+        raise RuntimeError("lexer bug")
+
+    stream = TokenStream(failing())
+    results = {}
+
+    def read(name):
+        values = []
+        try:
+            values.extend(tok.value for tok in stream)
+        except RuntimeError as e:
+            values.append(str(e))
+        results[name] = values
+
+    read("main")
+    thread = threading.Thread(target=read, args=("thread",))
+    thread.start()
+    thread.join()
+    # not a silently truncated stream for the other reader
+    assert results == {name: ["x", "=", "lexer bug"] for name in results}
+    assert len(results) == 2
+    assert stream.failed
+
+
+def test_lexer_options_are_part_of_the_key(streams):
+    tokens_of(Lexer(), "ls -l\n")
+    tokens_of(Lexer(tolerant=True, pymode=False), "ls -l\n")
+    tokens_of(Lexer(), "ls -l\n", is_subproc=True)
+    assert streams.stats()["size"] == 3
+    assert streams.stats()["hits"] == 0
+
+
+def test_long_inputs_are_not_cached(streams, monkeypatch):
+    monkeypatch.setattr(lexer_mod, "TOKEN_CACHE_MAX_INPUT", 10)
+    tokens_of(Lexer(), "x = 1 + 2 + 3 + 4\n")
+    assert streams.stats()["size"] == 0
+
+
+def test_disabled_cache(streams):
+    streams.maxsize = 0
+    assert tokens_of(Lexer(), "x = 1\n")
+    assert streams.stats()["size"] == 0
+
+
+def test_execer_syncs_cache_size(xonsh_execer, xession):
+    xession.env["XONSH_TOKEN_CACHE_SIZE"] = 3
+    try:
+        xonsh_execer.parse("x = 1\n", ctx=None)
+        assert TOKEN_STREAMS.maxsize == 3
+    finally:
+        TOKEN_STREAMS.maxsize = 32
@@ -0,0 +1,78 @@
+"""Tests for the per-grammar yacc tables."""
+
+import importlib
+import os
+
+import pytest
+
+from xonsh.parser import (
+    GRAMMARS,
+    grammar_version,
+    ply_parser_class,
+    table_module,
+    tables_prebuilt,
+)
+
+TABLE = os.path.join(
+    os.path.dirname(importlib.import_module("xonsh").__file__),
+    table_module(package=None) + ".py",
+)
+# at collection, before the tests that build a parser could generate the tables
+TABLE_MTIME = os.path.getmtime(TABLE) if tables_prebuilt() else None
+
+
+@pytest.mark.parametrize(
+    "version, grammar",
+    [
+        ((3, 11, 0), "v310"),
+        ((3, 12, 4), "v310"),
+        ((3, 13, 0), "v313"),
+        ((3, 14, 1), "v313"),
+    ],
+)
+def test_grammar_version(version, grammar):
+    assert grammar_version(version) == grammar
+
+
+def test_table_module_per_grammar():
+    names = {table_module(g) for g in GRAMMARS}
+    assert len(names) == len(GRAMMARS)
+    assert table_module("v313") == "xonsh.parser_v313_table"
+    assert table_module("v313", package=None) == "parser_v313_table"
+
+
+@pytest.mark.parametrize("grammar", GRAMMARS)
+def test_build_tables(grammar, tmp_path):
+    parser_cls = importlib.import_module("xonsh.parsers." + grammar).Parser
+    parser = parser_cls(
+        yacc_table=table_module(grammar, package=None),
+        outputdir=str(tmp_path),
+        yacc_debug=True,
+    )
+    assert (tmp_path / f"parser_{grammar}_table.py").is_file()
+    assert parser.parse("x = 1\n") is not None
+
+
+def test_completion_parser_is_lazy(monkeypatch):
+    from xonsh import completer
+
+    created = []
+    monkeypatch.setattr(
+        completer, "CompletionContextParser", lambda: created.append(1) or object()
+    )
+    comp = completer.Completer()
+    assert not created
+    assert comp.context_parser is comp.context_parser
+    assert created == [1]
+
+
+def test_parser_uses_prebuilt_tables():
+    """The parser loads the tables built with the package, e.g. by
+    ``pip install -e .``, instead of generating them.
+    """
+    assert TABLE_MTIME is not None, "the parser tables of this grammar are not built"
+    parser_cls = ply_parser_class()
+    parser = parser_cls()
+    assert isinstance(parser, parser_cls)
+    assert parser.parse("x = 1\n") is not None
+    assert os.path.getmtime(TABLE) == TABLE_MTIME, "the parser regenerated its tables"
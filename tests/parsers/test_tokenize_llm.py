@@ -0,0 +1,114 @@
+"""Tests for the first-character dispatch of the xonsh tokenizer."""
+
+import glob
+import io
+import json
+import os
+
+import pytest
+
+from xonsh.parsers import tokenize as tokenize_mod
+from xonsh.parsers.tokenize import (
+    ERRORTOKEN,
+    NAME,
+    SEARCHPATH,
+    STRING,
+    tok_name,
+    tokenize,
+)
+from xonsh.platform import PYTHON_VERSION_INFO
+
+TESTS_DIR = os.path.dirname(os.path.dirname(__file__))
+
+
+def toks(s):
+    readline = io.BytesIO(s.encode()).readline
+    return [(t.type, t.string) for t in tokenize(readline, tolerant=True)][1:]
+
+
+@pytest.mark.parametrize(
+    "inp, exp",
+    [
+        ("`.*`", [(SEARCHPATH, "`.*`")]),
+        ("r`.*`", [(SEARCHPATH, "r`.*`")]),
+        ("gp`*.py`", [(SEARCHPATH, "gp`*.py`")]),
+        ("@foo`x`", [(SEARCHPATH, "@foo`x`")]),
+        ("rx", [(NAME, "rx")]),
+        ("gm", [(NAME, "gm")]),
+        ("mx", [(NAME, "mx")]),
+    ],
+)
+def test_searchpath_dispatch(inp, exp):
+    assert toks(inp)[: len(exp)] == exp
+
+
+@pytest.mark.parametrize(
+    "inp, first",
+    [
+        ("f'x'", "f'"),
+        ('rf"x"', 'rf"'),
+        ("pf'x'", "pf'"),
+        ("f'''x'''", "f'''"),
+        ("Rf'x'", "Rf'"),
+    ],
+)
+def test_fstring_start_dispatch(inp, first):
+    obs = toks(inp)
+    if PYTHON_VERSION_INFO >= (3, 12):
+        assert obs[0][1] == first
+    else:
+        assert obs[0] == (STRING, inp)
+
+
+@pytest.mark.parametrize("inp", ["f", "x = f", "rf", "p"])
+def test_fstring_prefix_at_end_of_line(inp):
+    obs = toks(inp)
+    assert (NAME, inp.split()[-1]) in obs
+    assert all(typ != ERRORTOKEN for typ, _ in obs)
+
+
+CORPUS = os.path.join(os.path.dirname(__file__), "tokenize_corpus.xsh")
+
+
+@pytest.mark.parametrize("version", [(3, 11), (3, 12)])
+@pytest.mark.parametrize("tolerant", [True, False])
+@pytest.mark.parametrize("is_subproc", [False, True])
+def test_tokenize_golden(version, tolerant, is_subproc, monkeypatch):
+    """The tokens of ``tokenize_corpus.xsh`` are those that the tokenizer
+    produced before its first-character dispatch, stored in
+    ``tokenize_corpus.json``, for the f-string handling of both Python
+    versions.
+    """
+    monkeypatch.setattr(tokenize_mod, "PYTHON_VERSION_INFO", version)
+    with open(CORPUS, "rb") as f:
+        readline = io.BytesIO(f.read()).readline
+    obs = [
+        [tok_name[t.type], t.string, list(t.start), list(t.end)]
+        for t in tokenize(readline, tolerant=tolerant, is_subproc=is_subproc)
+    ]
+    with open(os.path.splitext(CORPUS)[0] + ".json") as f:
+        golden = json.load(f)
+    key = f"{version[0]}.{version[1]} {'tolerant' if tolerant else 'strict'}"
+    if is_subproc:
+        key += " subproc"
+    assert obs == golden[key]
+
+
+def test_tokenize_corpus():
+    """Tokenizes the xonsh sources and test scripts, checking that every
+    single-line token matches the text it spans.
+    """
+    root = os.path.dirname(TESTS_DIR)
+    files = glob.glob(os.path.join(root, "xonsh", "**", "*.py"), recursive=True)
+    files += glob.glob(os.path.join(TESTS_DIR, "**", "*.xsh"), recursive=True)
+    files = [f for f in files if not f.endswith("_table.py")]
+    ntoks = 0
+    for fname in files:
+        with open(fname, "rb") as f:
+            readline = io.BytesIO(f.read()).readline
+        for tok in tokenize(readline, tolerant=True):
+            ntoks += 1
+            (srow, scol), (erow, ecol) = tok.start, tok.end
+            if srow == erow and tok.type != ERRORTOKEN and tok.line:
+                assert tok.line[scol:ecol] == tok.string, (fname, tok)
+    assert ntoks > 0
@@ -3,12 +3,19 @@
 Command-name resolution parity with other shells: a name containing a path
 separator is resolved against the file system (relative to the current
 directory or absolute) and is never looked up in ``$PATH`` (gh-6532).
+
+The resolution cache shared by the lookups in ``$PATH``.
 """
 
 import os
 
+import pytest
+
 from xonsh.platform import ON_WINDOWS
+from xonsh.procs import executables as executables_mod
 from xonsh.procs.executables import (
+    EXECUTABLE_CACHE,
+    ExecutableCache,
     is_explicit_path,
     locate_executable,
     locate_file,
@@ -75,3 +82,80 @@ def test_locate_executable_path_like_matches_shell(tmpdir, xession):
         (pathdir.mkdir("only") / tool).write_text("binary", encoding="utf8")
         os.chmod(pathdir / "only" / tool, 0o777)
         assert locate_executable(f"only{sep}{tool}") is None
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = ExecutableCache()
+    monkeypatch.setattr(executables_mod, "EXECUTABLE_CACHE", cache)
+    return cache
+
+
+def make_exe(path):
+    path.write_text("", encoding="utf8")
+    os.chmod(path, 0o755)
+
+
+@pytest.mark.skipif(ON_WINDOWS, reason="POSIX permissions")
+def test_resolution_cache(cache, tmp_path, xession, monkeypatch):
+    bin1, bin2 = tmp_path / "bin1", tmp_path / "bin2"
+    bin1.mkdir()
+    bin2.mkdir()
+    make_exe(bin2 / "tool")
+    xession.env["PATH"] = [str(bin1), str(bin2)]
+    assert locate_executable("tool") == str(bin2 / "tool")
+    assert locate_executable("missing") is None
+    # both answers come from the cache now
+    with monkeypatch.context() as m:
+        m.setattr(executables_mod, "is_file", pytest.fail)
+        assert locate_executable("tool") == str(bin2 / "tool")
+        assert locate_executable("missing") is None
+    assert cache.stats()["hits"] == 2
+    # a file added earlier in $PATH wins
+    make_exe(bin1 / "tool")
+    assert locate_executable("tool") == str(bin1 / "tool")
+    assert cache.stats()["invalidations"] == 1
+    # a name that exists but is not executable is not remembered
+    (bin1 / "script").write_text("", encoding="utf8")
+    assert locate_executable("script") is None
+    os.chmod(bin1 / "script", 0o755)
+    assert locate_executable("script") == str(bin1 / "script")
+    # another $PATH
+    xession.env["PATH"] = [str(bin2)]
+    assert locate_executable("tool") == str(bin2 / "tool")
+
+
+def test_resolution_cache_disabled(cache, tmp_path, xession):
+    xession.env["PATH"] = [str(tmp_path)]
+    xession.env["ENABLE_COMMANDS_CACHE"] = False
+    assert locate_executable("missing") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_resolution_cache_with_watcher(cache, tmp_path, xession, monkeypatch):
+    class Watcher:
+        changed = set()
+
+        def watching(self, path):
+            return True
+
+    make_exe(tmp_path / "tool")
+    xession.env["PATH"] = [str(tmp_path)]
+    assert locate_executable("tool") == str(tmp_path / "tool")
+    cache.watcher = Watcher()
+    # validates the cache once more, then trusts the watcher
+    assert locate_executable("tool") == str(tmp_path / "tool")
+    with monkeypatch.context() as m:
+        m.setattr(os, "stat", pytest.fail)
+        assert locate_executable("tool") == str(tmp_path / "tool")
+    cache.invalidate()
+    (tmp_path / "tool").unlink()
+    assert locate_executable("tool") is None
+
+
+def test_commands_cache_invalidates(tmp_path, xession):
+    from xonsh.commands_cache import CommandsCache
+
+    generation = EXECUTABLE_CACHE._generation
+    CommandsCache({"PATH": [str(tmp_path)]}, aliases={}).update_cache()
+    assert EXECUTABLE_CACHE._generation > generation
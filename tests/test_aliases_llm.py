@@ -9,6 +9,8 @@ Currently covers:
 * ``@lxml`` — the optional command decorator that is only registered in
   ``make_default_aliases()`` when the third-party ``lxml`` package is
   importable.
+* ``Aliases.generation`` — the counter of name changes that the commands
+  cache compares instead of hashing every alias name on each lookup.
 """
 
 import os
@@ -16,7 +18,13 @@ import os
 import pytest
 
 from xonsh import aliases
-from xonsh.aliases import WINDOWS_CMD_ALIASES, make_default_aliases, win_sudo
+from xonsh.aliases import (
+    WINDOWS_CMD_ALIASES,
+    Aliases,
+    make_default_aliases,
+    win_sudo,
+)
+from xonsh.commands_cache import CommandsCache
 from xonsh.procs.specs import SpecAttrDecoratorAlias
 
 
@@ -152,3 +160,34 @@ def test_lxml_decorator_unavailable(xession, monkeypatch):
     )
     aliases_ = make_default_aliases()
     assert "@lxml" not in aliases_
+
+
+def test_generation_changes_with_names(xession):
+    """The generation changes when a name is added or removed, not when
+    the value of an alias is replaced.
+    """
+    als = Aliases(a=["echo", "a"])
+    gen = als.generation
+    als["a"] = ["echo", "b"]
+    assert als.generation == gen
+    als["b"] = ["echo", "b"]
+    assert als.generation != gen
+    gen = als.generation
+    del als["b"]
+    assert als.generation != gen
+    assert Aliases().generation != Aliases().generation
+
+
+def test_commands_cache_follows_generation(xession, monkeypatch):
+    als = Aliases(a=["echo", "a"])
+    cache = CommandsCache({"PATH": []}, aliases=als)
+    assert cache["a"] == ("a", True)
+    monkeypatch.setattr(
+        Aliases, "__iter__", lambda self: pytest.fail("aliases were iterated")
+    )
+    assert "a" in cache
+    monkeypatch.undo()
+    als["b"] = ["echo", "b"]
+    assert "b" in cache
+    del als["a"]
+    assert "a" not in cache
@@ -1,24 +1,39 @@
 """Tests for xonsh code caching."""
 
+import ast
 import marshal
 import os
 
 import pytest
 
 from xonsh import __version__ as XONSH_VERSION
+from xonsh import codecache
+from xonsh import execer as execer_mod
 from xonsh.codecache import (
+    ScriptCachePack,
+    ScriptPrecompiler,
     _check_cache_versions,
+    _precompile_script,
     _splitpath,
+    cache_usage,
+    clear_cache,
     code_cache_check,
     code_cache_name,
     compile_code,
     get_cache_filename,
+    get_script_pack,
+    lookups_match,
+    prune_cache,
     run_code_with_cache,
     run_compiled_code,
+    run_precompiled_script,
     run_script_with_cache,
     script_cache_check,
     should_use_cache,
+    transform_cache_check,
+    transform_cache_key,
     update_cache,
+    update_transform_cache,
 )
 from xonsh.platform import PYTHON_VERSION_INFO_BYTES
 
@@ -28,6 +43,7 @@ def cache_env(xession, tmp_path):
     xession.env.update(
         {
             "XONSH_DATA_DIR": str(tmp_path),
+            "XONSH_CACHE_DIR": str(tmp_path / "cache"),
             "XONSH_CACHE_SCRIPTS": True,
             "XONSH_CACHE_EVERYTHING": False,
             "XONSH_DEBUG": False,
@@ -398,3 +414,384 @@ def test_run_code_with_cache_exception(cache_env):
         "1/0\n", "<test>", cache_env.execer, {}
     )
     assert exc_type is ZeroDivisionError
+
+
+def test_transform_cache_matches_on_name_lookups(cache_env):
+    key = transform_cache_key("ls -l\n", "exec")
+    tree = ast.parse("ls - l")
+    update_transform_cache(key, {"ls": True, "l": True}, {}, tree)
+    found = transform_cache_check(key, {"ls", "l", "other"}, None)
+    assert ast.dump(found) == ast.dump(tree)
+    assert transform_cache_check(key, {"l"}, None) is None
+
+
+def test_transform_cache_keeps_variants(cache_env):
+    key = transform_cache_key("x\n", "exec")
+    update_transform_cache(key, {"x": True}, {}, ast.parse("x"))
+    update_transform_cache(key, {"x": False}, {}, ast.parse("y"))
+    assert ast.dump(transform_cache_check(key, {"x"}, None)) == ast.dump(ast.parse("x"))
+    assert ast.dump(transform_cache_check(key, set(), None)) == ast.dump(ast.parse("y"))
+
+
+def test_transform_cache_key_depends_on_parser(cache_env, monkeypatch):
+    from xonsh import parser as parser_mod
+    from xonsh.parsers.fallback import FallbackParser
+
+    class RDParser:
+        pass
+
+    RDParser.__module__ = "xonsh.parsers.rd_parser"
+    ply = cache_env.execer.parser
+    auto = FallbackParser.__new__(FallbackParser)
+    auto.primary, auto.fallback = RDParser(), ply
+    keys = {
+        transform_cache_key("ls -l\n", "exec", parser)
+        for parser in (ply, RDParser(), auto)
+    }
+    assert len(keys) == 3
+    key = transform_cache_key("ls -l\n", "exec", ply)
+    monkeypatch.setattr(parser_mod, "grammar_version", lambda: "v313")
+    assert transform_cache_key("ls -l\n", "exec", ply) != key
+    monkeypatch.setattr(parser_mod, "parser_backend", lambda: "ply")
+    assert parser_mod.parser_version() == "ply-v313"
+
+
+def test_execer_parse_reuses_transform_cache(cache_env, monkeypatch):
+    monkeypatch.setattr(codecache, "TRANSFORM_CACHE_MIN_SIZE", 0)
+    cache_env.env["XONSH_CACHE_TRANSFORMS"] = True
+    execer = cache_env.execer
+    code = "ls -l\n"
+    as_subproc = execer.parse(code, ctx=set())
+    as_python = execer.parse(code, ctx={"ls", "l"})
+    assert ast.dump(as_subproc) != ast.dump(as_python)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("the transform should have been cached")
+
+    monkeypatch.setattr(execer.ctxtransformer, "ctxvisit", fail)
+    assert ast.dump(execer.parse(code, ctx={"other"})) == ast.dump(as_subproc)
+    assert ast.dump(execer.parse(code, ctx={"ls", "l", "z"})) == ast.dump(as_python)
+
+
+@pytest.mark.parametrize(
+    "code, mode",
+    [
+        ("ls -l\n", "exec"),
+        ("ls -l\n" * 30, "single"),
+        ("x + 1", "eval"),
+    ],
+)
+def test_short_and_interactive_code_skips_transform_cache(
+    cache_env, monkeypatch, code, mode
+):
+    cache_env.env["XONSH_CACHE_TRANSFORMS"] = True
+
+    def fail(*args, **kwargs):
+        raise AssertionError("the transform cache should not be read")
+
+    monkeypatch.setattr(execer_mod, "transform_cache_check", fail)
+    monkeypatch.setattr(execer_mod, "update_transform_cache", fail)
+    assert cache_env.execer.parse(code, ctx=set(), mode=mode)
+
+
+def test_code_cache_is_sharded(cache_env):
+    fname = code_cache_name("x = 1\n")
+    cachefname = get_cache_filename(fname, code=True)
+    assert os.path.basename(os.path.dirname(cachefname)) == fname[:2]
+
+
+def _make_entries(cachedir, n):
+    os.makedirs(cachedir, exist_ok=True)
+    for i in range(n):
+        path = os.path.join(cachedir, f"entry{i}")
+        with open(path, "wb") as f:
+            f.write(b"x" * 10)
+        os.utime(path, (i, i))
+
+
+def test_prune_cache_evicts_least_recently_used(tmp_path):
+    cachedir = str(tmp_path / "c")
+    _make_entries(cachedir, 5)
+    assert prune_cache(cachedir, max_files=3) == (2, 20)
+    assert sorted(os.listdir(cachedir)) == ["entry2", "entry3", "entry4"]
+    assert prune_cache(cachedir, max_bytes=15) == (2, 20)
+    assert os.listdir(cachedir) == ["entry4"]
+    assert cache_usage(cachedir) == (1, 10)
+    assert clear_cache(cachedir) == (1, 10)
+    assert cache_usage(cachedir) == (0, 0)
+
+
+def test_run_code_with_cache_enforces_budget(cache_env):
+    execer = cache_env.execer
+    execer.cacheall = True
+    cache_env.env["XONSH_CACHE_EVERYTHING"] = True
+    cache_env.env["XONSH_CODE_CACHE_MAX_FILES"] = 1  # one per shard
+    for i in range(20):
+        run_code_with_cache(f"v = {i}\n", "<test>", execer, {})
+    cachedir = os.path.join(cache_env.env["XONSH_DATA_DIR"], "xonsh_code_cache")
+    for shard in os.listdir(cachedir):
+        assert len(os.listdir(os.path.join(cachedir, shard))) == 1
+
+
+def test_code_cache_check_marks_entry_as_used(cache_env, tmp_path):
+    cachefname = str(tmp_path / "entry")
+    update_cache(compile("1", "<test>", "eval"), cachefname)
+    os.utime(cachefname, (0, 0))
+    assert code_cache_check(cachefname)[0]
+    assert os.stat(cachefname).st_mtime > 0
+
+
+def _write_script(path, src):
+    with open(path, "w") as f:
+        f.write(src)
+    return str(path)
+
+
+def test_script_pack_roundtrip(tmp_path):
+    pack = ScriptCachePack(str(tmp_path / "scripts.pack"))
+    a = _write_script(tmp_path / "a.py", "a = 1\n")
+    b = _write_script(tmp_path / "b.py", "b = 2\n")
+    assert pack.get(a) is None
+    pack.update(a, compile("a = 1\n", a, "exec"))
+    pack.update(b, compile("b = 2\n", b, "exec"))
+    glb = {}
+    exec(pack.get(a), glb)
+    exec(pack.get(b), glb)
+    assert (glb["a"], glb["b"]) == (1, 2)
+    assert len(pack) == 2
+
+
+def test_script_pack_stale_and_removed_entries(tmp_path, monkeypatch):
+    monkeypatch.setattr(ScriptCachePack, "COMPACT_SIZE", 0)
+    pack = ScriptCachePack(str(tmp_path / "scripts.pack"))
+    a = _write_script(tmp_path / "a.py", "a = 1\n")
+    b = _write_script(tmp_path / "b.py", "b = 2\n")
+    pack.update(a, compile("a = 1\n", a, "exec"))
+    pack.update(b, compile("b = 2\n", b, "exec"))
+    _write_script(a, "a = 10\n")
+    assert pack.get(a) is None
+    os.remove(b)
+    pack.update(a, compile("a = 10\n", a, "exec"))
+    assert pack.get(a) is not None
+    assert b in pack
+    # removed scripts are dropped when the pack is compacted
+    for _ in range(3):
+        pack.update(a, compile("a = 10\n", a, "exec"))
+    assert pack.get(a) is not None
+    assert b not in pack and len(pack) == 1
+
+
+def test_script_pack_appends(tmp_path):
+    fname = tmp_path / "scripts.pack"
+    pack = ScriptCachePack(str(fname))
+    big = _write_script(tmp_path / "big.py", "x = 1\n" * 5000)
+    a = _write_script(tmp_path / "a.py", "a = 1\n")
+    pack.update(big, compile("x = 1\n" * 5000, big, "exec"))
+    pack.update(a, compile("a = 1\n", a, "exec"))
+    size = fname.stat().st_size
+    _write_script(a, "a = 2\n")
+    pack.update(a, compile("a = 2\n", a, "exec"))
+    # only the record of the script that changed is written
+    assert size < fname.stat().st_size < size + 1000
+    glb = {}
+    exec(pack.get(a), glb)
+    assert glb["a"] == 2
+    assert pack.get(big) is not None
+
+
+def test_script_pack_compacts(tmp_path, monkeypatch):
+    monkeypatch.setattr(ScriptCachePack, "COMPACT_SIZE", 2000)
+    fname = tmp_path / "scripts.pack"
+    pack = ScriptCachePack(str(fname))
+    b = _write_script(tmp_path / "b.py", "b = 2\n")
+    pack.update(b, compile("b = 2\n", b, "exec"))
+    a = str(tmp_path / "a.py")
+    for i in range(50):
+        _write_script(a, f"a = {i}\n")
+        os.utime(a, ns=(i, i))
+        pack.update(a, compile(f"a = {i}\n", a, "exec"))
+    assert fname.stat().st_size < 2000
+    glb = {}
+    exec(pack.get(a), glb)
+    exec(pack.get(b), glb)
+    assert (glb["a"], glb["b"]) == (49, 2)
+
+
+def test_script_pack_truncated(tmp_path):
+    fname = tmp_path / "scripts.pack"
+    pack = ScriptCachePack(str(fname))
+    a = _write_script(tmp_path / "a.py", "a = 1\n")
+    b = _write_script(tmp_path / "b.py", "b = 2\n")
+    pack.update(a, compile("a = 1\n", a, "exec"))
+    pack.update(b, compile("b = 2\n", b, "exec"))
+    pack.close()
+    fname.write_bytes(fname.read_bytes()[:-2])
+    assert pack.get(a) is not None
+    assert pack.get(b) is None
+    # not appended after the cut short record, where it could not be read
+    pack.update(b, compile("b = 2\n", b, "exec"))
+    assert pack.get(a) is not None
+    assert pack.get(b) is not None
+
+
+def test_script_pack_sees_updates_from_other_shells(tmp_path):
+    fname = str(tmp_path / "scripts.pack")
+    mine, other = ScriptCachePack(fname), ScriptCachePack(fname)
+    a = _write_script(tmp_path / "a.py", "a = 1\n")
+    b = _write_script(tmp_path / "b.py", "b = 2\n")
+    mine.update(a, compile("a = 1\n", a, "exec"))
+    assert other.get(a) is not None
+    mine.update(b, compile("b = 2\n", b, "exec"))
+    # the old mapping stays readable and the new entry is found by remapping
+    assert other.get(a) is not None
+    assert other.get(b) is not None
+    other.update(b, compile("b = 2\n", b, "exec"))
+    assert mine.get(a) is not None
+
+
+def test_script_pack_reused_inode(tmp_path):
+    fname = tmp_path / "scripts.pack"
+    mine, other = ScriptCachePack(str(fname)), ScriptCachePack(str(tmp_path / "new"))
+    a = _write_script(tmp_path / "a.py", "a = 1\n")
+    b = _write_script(tmp_path / "b.py", "b = 2\n")
+    mine.update(a, compile("a = 1\n", a, "exec"))
+    assert mine.get(a) is not None
+    other.update(b, compile("b = 2\n", b, "exec"))
+    other.update(a, compile("a = 3\n" * 10, a, "exec"))
+    other.close()
+    # a new pack in the same inode, larger than the mapped one
+    data = (tmp_path / "new").read_bytes()
+    assert len(data) > fname.stat().st_size
+    with open(fname, "r+b") as f:
+        f.write(data)
+    glb = {}
+    exec(mine.get(b), glb)
+    exec(mine.get(a), glb)
+    assert (glb["a"], glb["b"]) == (3, 2)
+    assert len(mine) == 2
+
+
+def test_script_pack_short_writes(tmp_path, monkeypatch):
+    fname = str(tmp_path / "scripts.pack")
+    pack = ScriptCachePack(fname)
+    a = _write_script(tmp_path / "a.py", "a = 1\n")
+    b = _write_script(tmp_path / "b.py", "b = 2\n")
+    pack.update(a, compile("a = 1\n", a, "exec"))
+    write = os.write
+    with monkeypatch.context() as m:
+        m.setattr(os, "write", lambda fd, data: write(fd, data[:3]))
+        pack.update(b, compile("b = 2\n", b, "exec"))
+    glb = {}
+    exec(ScriptCachePack(fname).get(b), glb)
+    assert glb["b"] == 2
+
+
+def test_script_pack_ignores_other_versions(tmp_path):
+    fname = str(tmp_path / "scripts.pack")
+    pack = ScriptCachePack(fname)
+    a = _write_script(tmp_path / "a.py", "a = 1\n")
+    pack.update(a, compile("a = 1\n", a, "exec"))
+    with open(fname, "rb") as f:
+        data = f.read()
+    with open(fname + ".new", "wb") as f:
+        f.write(b"X" + data[1:])
+    os.replace(fname + ".new", fname)
+    pack = ScriptCachePack(fname)
+    assert pack.get(a) is None
+    pack.update(a, compile("a = 1\n", a, "exec"))
+    assert pack.get(a) is not None
+
+
+def test_run_script_with_cache_uses_pack(cache_env, tmp_path):
+    execer = cache_env.execer
+    execer.scriptcache = True
+    cache_env.env["XONSH_CACHE_SCRIPTS_PACK"] = True
+    src_file = _write_script(tmp_path / "packed.xsh", "y = 99\n")
+    glb = {}
+    run_script_with_cache(src_file, execer, glb)
+    assert glb["y"] == 99
+    assert not os.path.isfile(get_cache_filename(src_file, code=False))
+    pack = get_script_pack()
+    assert pack.get(src_file) is not None
+    glb = {}
+    run_script_with_cache(src_file, execer, glb)
+    assert glb["y"] == 99
+
+
+def test_lookups_match():
+    ctx_lookups = {"x": True, "ls": False}
+    assert lookups_match(ctx_lookups, {"x": True}, {"x"}, {"x"})
+    assert not lookups_match(ctx_lookups, {}, {"x", "ls"}, set())
+    assert not lookups_match(ctx_lookups, {"x": True}, {"x"}, set())
+
+
+def _done_precompiler(results):
+    from concurrent.futures import Future
+
+    precompiler = ScriptPrecompiler.__new__(ScriptPrecompiler)
+    precompiler.futures = {}
+    for fn, result in results.items():
+        future = Future()
+        future.set_running_or_notify_cancel()
+        future.set_result(result)
+        precompiler.futures[fn] = future
+    return precompiler
+
+
+def test_run_precompiled_script(cache_env, tmp_path):
+    src_file = _write_script(tmp_path / "rc.xsh", "y = x + 1\n")
+    glb = {"x": 1}
+    result = _precompile_script(src_file)
+    assert result is not None
+    precompiler = _done_precompiler({src_file: result})
+    run_precompiled_script(src_file, precompiler, cache_env.execer, glb)
+    assert glb["y"] == 2
+    assert not precompiler.futures
+
+
+class _Minus:
+    def __init__(self):
+        self.hits = []
+
+    def __sub__(self, other):
+        self.hits.append(other)
+
+
+def test_precompiled_script_depending_on_context(cache_env, tmp_path):
+    # compiled without ``x`` in the context, ``x -l`` is a subprocess call
+    src_file = _write_script(tmp_path / "rc.xsh", "l = 2\nx -l\n")
+    result = _precompile_script(src_file)
+    glb = {"x": _Minus()}
+    precompiler = _done_precompiler({src_file: result})
+    assert precompiler.get(src_file, dict(glb)) is None
+    precompiler = _done_precompiler({src_file: result})
+    run_precompiled_script(src_file, precompiler, cache_env.execer, glb)
+    assert glb["x"].hits == [2]
+
+
+def test_precompiler_skips_cached_scripts(cache_env, tmp_path):
+    execer = cache_env.execer
+    execer.scriptcache = True
+    first = _write_script(tmp_path / "a.xsh", "a = 1\n")
+    cached = _write_script(tmp_path / "b.xsh", "b = 1\n")
+    run_script_with_cache(cached, execer, {})
+    py_file = _write_script(tmp_path / "c.py", "c = 1\n")
+    assert ScriptPrecompiler.start([first, cached, py_file], execer) is None
+
+
+def test_xonshrc_context_precompiled(cache_env, tmp_path):
+    from xonsh.environ import xonshrc_context
+
+    cache_env.env["XONSH_RC_PRECOMPILE"] = True
+    rcdir = tmp_path / "rc.d"
+    rcdir.mkdir()
+    _write_script(rcdir / "00-first.xsh", "y = 3\n")
+    _write_script(rcdir / "10-second.xsh", "l = 2\nx -l\n")
+    _write_script(rcdir / "20-third.xsh", "z = [y] * 2\n")
+    ctx = {"x": _Minus()}
+    loaded = xonshrc_context(
+        rcdirs=[str(rcdir)], execer=cache_env.execer, ctx=ctx, env=cache_env.env
+    )
+    assert len(loaded) == 3
+    assert ctx["x"].hits == [2]
+    assert ctx["z"] == [3, 3]
@@ -1,4 +1,3 @@
-import json
 import os
 import shutil
 import stat
@@ -12,6 +11,7 @@ from xonsh.commands_cache import (
     SHELL_PREDICTOR_PARSER,
     CaseInsensitiveDict,
     CommandsCache,
+    CommandsCacheFile,
     _Commands,
     default_threadable_predictors,
     executables_in,
@@ -51,22 +51,22 @@ class TestCommandsCacheSaveIntermediate:
             "bin2",
         ]
 
-        files = tmp_path.glob("*.json")
+        files = tmp_path.glob(CommandsCache.CACHE_FILE)
         assert len(list(files)) == 1
         exin_mock.assert_called_once()
 
     def test_loading_cache(self, exin_mock, tmp_path, xession):
         cc = xession.commands_cache
         file = tmp_path / CommandsCache.CACHE_FILE
-        file.touch()
+        saved = CommandsCacheFile(str(file))
+        saved.update({})  # creates the file, which changes the mtime of tmp_path
         cached = {
             str(tmp_path): _Commands(
                 mtime=tmp_path.stat().st_mtime, cmds=("bin1", "bin2")
             )
         }
 
-        raw = {k: [v.mtime, list(v.cmds)] for k, v in cached.items()}
-        file.write_text(json.dumps(raw))
+        saved.update(cached)
         assert str(cc.cache_file) == str(file)
         assert [b.lower() for b in cc.all_commands.keys()] == ["bin1", "bin2"]
         exin_mock.assert_not_called()
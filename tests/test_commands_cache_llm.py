@@ -0,0 +1,315 @@
+"""Tests for watching the $PATH directories of the commands cache, and for
+the file of saved commands.
+"""
+
+import os
+import time
+
+import pytest
+
+from xonsh import commands_cache
+from xonsh.commands_cache import CommandsCache, CommandsCacheFile, _Commands
+from xonsh.platforms import inotify
+
+needs_inotify = pytest.mark.skipif(not inotify.available(), reason="needs inotify")
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def make_exe(path):
+    path.touch()
+    path.chmod(0o755)
+
+
+@pytest.fixture
+def watcher():
+    watcher = inotify.DirWatcher()
+    yield watcher
+    watcher.close()
+
+
+@needs_inotify
+def test_dir_watcher(watcher, tmp_path):
+    assert watcher.watch(str(tmp_path))
+    assert watcher.watching(str(tmp_path))
+    assert not watcher.watch(str(tmp_path / "missing"))
+    (tmp_path / "file").touch()
+    wait_for(lambda: watcher.changed)
+    assert watcher.pop_changed() == {str(tmp_path)}
+    assert not watcher.changed
+    watcher.unwatch(str(tmp_path))
+    assert not watcher.watching(str(tmp_path))
+
+
+@needs_inotify
+def test_dir_watcher_removed_dir(watcher, tmp_path):
+    path = tmp_path / "bin"
+    path.mkdir()
+    watcher.watch(str(path))
+    path.rmdir()
+    wait_for(lambda: not watcher.watching(str(path)))
+    assert str(path) in watcher.pop_changed()
+
+
+@needs_inotify
+def test_dir_watcher_repointed_link(watcher, tmp_path):
+    old, new = tmp_path / "old", tmp_path / "new"
+    old.mkdir()
+    new.mkdir()
+    link = tmp_path / "profile"
+    link.symlink_to(old)
+    path = str(link)
+    assert watcher.watch_links(path)
+    assert watcher.watched() == {path}
+    # the links are watched by name
+    (tmp_path / "other").touch()
+    (old / "cmd").touch()
+    tmp = tmp_path / "profile.tmp"
+    tmp.symlink_to(new)
+    tmp.replace(link)
+    wait_for(lambda: watcher.changed)
+    assert watcher.pop_changed() == {path}
+    assert not watcher.watched()
+    assert not watcher._links
+
+
+@needs_inotify
+def test_dir_watcher_link_in_target(watcher, tmp_path):
+    (tmp_path / "store1" / "bin").mkdir(parents=True)
+    (tmp_path / "store2" / "bin").mkdir(parents=True)
+    (tmp_path / "profile").symlink_to(tmp_path / "store1")
+    (tmp_path / "home").mkdir()
+    (tmp_path / "home" / "profile").symlink_to(tmp_path / "profile")
+    path = str(tmp_path / "home" / "profile" / "bin")
+    assert inotify._symlinks(path) == [
+        str(tmp_path / "home" / "profile"),
+        str(tmp_path / "profile"),
+    ]
+    assert watcher.watch_links(path)
+    (tmp_path / "profile").unlink()
+    (tmp_path / "profile").symlink_to(tmp_path / "store2")
+    wait_for(lambda: watcher.changed)
+    assert watcher.pop_changed() == {path}
+    watcher.unwatch(path)
+    assert not watcher._links
+
+
+@needs_inotify
+def test_dir_watcher_close(tmp_path):
+    watcher = inotify.DirWatcher()
+    assert watcher.watch(str(tmp_path))
+    watcher.close()
+    watcher.close()
+    watcher._thread.join(5)
+    assert not watcher._thread.is_alive()
+    watcher.unwatch(str(tmp_path))
+    assert not watcher.watch(str(tmp_path))
+    assert not watcher.watched()
+
+
+@needs_inotify
+def test_dir_watcher_forked_child_closes(watcher, tmp_path):
+    assert watcher.watch(str(tmp_path))
+    pid = os.fork()
+    if pid == 0:
+        # in the child, which has no thread to close the descriptors
+        try:
+            watcher.close()
+            watcher.close()
+            os.fstat(watcher._fd)
+        except OSError:
+            os._exit(0)
+        os._exit(1)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    (tmp_path / "file").touch()
+    wait_for(lambda: watcher.changed)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    bin1 = tmp_path / "bin1"
+    bin1.mkdir()
+    make_exe(bin1 / "cmd1")
+    env = {
+        "PATH": [str(bin1), str(tmp_path / "bin2")],
+        "XONSH_COMMANDS_CACHE_WATCH": True,
+    }
+    cache = CommandsCache(env, aliases={})
+    yield cache
+    cache._watcher.close()
+
+
+@needs_inotify
+def test_watched_lookups_make_no_syscall(cache, monkeypatch):
+    assert "cmd1" in cache
+    assert cache._watcher
+
+    def fail(*args):
+        raise AssertionError("unexpected system call")
+
+    monkeypatch.setattr(os.path, "getmtime", fail)
+    monkeypatch.setattr(os.path, "isdir", fail)
+    monkeypatch.setattr(commands_cache, "get_paths", fail)
+    monkeypatch.setattr(commands_cache, "executables_in", fail)
+    assert "cmd1" in cache
+    assert "missing-cmd" not in cache
+
+
+@needs_inotify
+def test_watched_changes(cache, tmp_path):
+    bin1 = tmp_path / "bin1"
+    assert "cmd1" in cache
+    watcher = cache._watcher
+    # no need to wait for the mtime of the directory to change
+    make_exe(bin1 / "cmd2")
+    wait_for(lambda: watcher.changed)
+    assert "cmd2" in cache
+    # permission changes do not change the mtime of the directory
+    (bin1 / "cmd3").touch()
+    wait_for(lambda: watcher.changed)
+    assert "cmd3" not in cache
+    (bin1 / "cmd3").chmod(0o755)
+    wait_for(lambda: watcher.changed)
+    assert "cmd3" in cache
+    # a $PATH directory created after the lookup
+    bin2 = tmp_path / "bin2"
+    bin2.mkdir()
+    make_exe(bin2 / "cmd4")
+    wait_for(lambda: watcher.changed)
+    assert "cmd4" in cache
+    # a $PATH directory removed
+    (bin1 / "cmd1").unlink()
+    (bin1 / "cmd2").unlink()
+    (bin1 / "cmd3").unlink()
+    bin1.rmdir()
+    wait_for(lambda: not watcher.watching(str(bin1)))
+    assert "cmd1" not in cache
+
+
+@needs_inotify
+def test_changed_path(cache, tmp_path):
+    assert "cmd1" in cache
+    bin3 = tmp_path / "bin3"
+    bin3.mkdir()
+    make_exe(bin3 / "cmd5")
+    cache.env["PATH"] = [str(bin3)]
+    assert "cmd5" in cache
+    assert "cmd1" not in cache
+    assert cache._watcher.watched() == {str(bin3)}
+
+
+@needs_inotify
+def test_repointed_path_link(cache, tmp_path):
+    store = tmp_path / "store"
+    store.mkdir()
+    make_exe(store / "cmd6")
+    profile = tmp_path / "profile"
+    profile.symlink_to(tmp_path / "bin1")
+    cache.env["PATH"] = [str(profile)]
+    assert "cmd1" in cache
+    assert "cmd6" not in cache
+    link = tmp_path / "profile.tmp"
+    link.symlink_to(store)
+    link.replace(profile)
+    wait_for(lambda: cache._watcher.changed)
+    assert "cmd6" in cache
+    assert "cmd1" not in cache
+
+
+def test_cache_file(tmp_path):
+    fname = str(tmp_path / "cache" / CommandsCache.CACHE_FILE)
+    saved = CommandsCacheFile(fname)
+    saved.load()
+    assert len(saved) == 0
+    listings = {
+        "/usr/bin": _Commands(1.5, ("cat", "ls", "zsh")),
+        "/bin": _Commands(2.0, ()),
+        "/opt/b\udcffn": _Commands(3.0, ("\udcffcmd",)),
+    }
+    saved.update(listings)
+    saved = CommandsCacheFile(fname)
+    saved.load()
+    assert {path: saved.get(path) for path in listings} == listings
+    assert saved.get("/usr/local/bin") is None
+
+
+def test_cache_file_appends(tmp_path, monkeypatch):
+    fname = tmp_path / CommandsCache.CACHE_FILE
+    saved = CommandsCacheFile(str(fname))
+    big = _Commands(1.0, tuple(sorted(f"cmd{i}" for i in range(5000))))
+    saved.update({"/usr/bin": big, "/home/bin": _Commands(1.0, ("a",))})
+    size = fname.stat().st_size
+    saved.update({"/home/bin": _Commands(2.0, ("a", "b"))})
+    # only the record of the directory that changed is written
+    assert size < fname.stat().st_size < size + 100
+    assert saved.get("/home/bin") == _Commands(2.0, ("a", "b"))
+    assert saved.get("/usr/bin") == big
+
+
+def test_cache_file_compacts(tmp_path, monkeypatch):
+    monkeypatch.setattr(os.path, "isdir", lambda path: True)
+    monkeypatch.setattr(CommandsCacheFile, "COMPACT_SIZE", 1000)
+    fname = tmp_path / CommandsCache.CACHE_FILE
+    saved = CommandsCacheFile(str(fname))
+    saved.update({"/usr/bin": _Commands(1.0, ("ls",))})
+    for i in range(100):
+        saved.update({"/home/bin": _Commands(float(i), ("x" * 20,))})
+    assert fname.stat().st_size < 1000
+    assert saved.get("/home/bin").mtime == 99.0
+    assert saved.get("/usr/bin") == _Commands(1.0, ("ls",))
+
+
+def test_cache_file_truncated(tmp_path):
+    fname = tmp_path / CommandsCache.CACHE_FILE
+    saved = CommandsCacheFile(str(fname))
+    saved.update({"/usr/bin": _Commands(1.0, ("ls",))})
+    saved.update({"/bin": _Commands(1.0, ("cat",))})
+    saved.close()
+    fname.write_bytes(fname.read_bytes()[:-2])
+    saved.load()
+    assert saved.get("/usr/bin") == _Commands(1.0, ("ls",))
+    assert "/bin" not in saved
+    saved.update({"/bin": _Commands(1.0, ("cat",))})
+    saved = CommandsCacheFile(str(fname))
+    saved.load()
+    assert saved.get("/usr/bin") == _Commands(1.0, ("ls",))
+    assert saved.get("/bin") == _Commands(1.0, ("cat",))
+    fname.write_bytes(b"garbage")
+    saved.load()
+    assert len(saved) == 0
+    saved.update({"/bin": _Commands(1.0, ("cat",))})
+    assert fname.read_bytes().startswith(CommandsCacheFile.MAGIC)
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_scan_paths(tmp_path, max_workers):
+    paths = []
+    for i in range(6):
+        path = tmp_path / f"bin{i}"
+        path.mkdir()
+        make_exe(path / f"cmd{i}")
+        make_exe(path / "same")
+        (path / "data").touch()
+        paths.append(str(path))
+    paths.append(str(tmp_path / "missing"))
+    listings = commands_cache.scan_paths(paths, max_workers=max_workers)
+    assert list(listings) == paths
+    assert listings[paths[0]] == ("cmd0", "same")
+    assert listings[paths[-1]] == ()
+
+
+def test_earlier_path_entry_wins(tmp_path):
+    paths = []
+    for i in range(10):
+        path = tmp_path / f"bin{i}"
+        path.mkdir()
+        make_exe(path / "same")
+        paths.append(str(path))
+    cache = CommandsCache({"PATH": paths}, aliases={})
+    assert cache["same"] == (os.path.join(paths[0], "same"), None)
@@ -0,0 +1,228 @@
+"""Tests for ``xonsh --daemon`` and its client."""
+
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from xonsh.daemon import client, server
+from xonsh.daemon.client import check_private_dir, is_supported, is_worker, socket_path
+
+pytestmark = pytest.mark.skipif(not is_supported(), reason="needs SO_PEERCRED")
+
+CLIENT = [sys.executable, "-m", "xonsh.daemon.client"]
+
+
+def test_socket_path(monkeypatch):
+    monkeypatch.setenv("XONSH_DAEMON_SOCKET", "/some/daemon.sock")
+    assert socket_path() == "/some/daemon.sock"
+    monkeypatch.delenv("XONSH_DAEMON_SOCKET")
+    monkeypatch.setenv("XDG_RUNTIME_DIR", "/run/user/1000")
+    assert socket_path() == "/run/user/1000/xonsh/daemon.sock"
+    monkeypatch.delenv("XDG_RUNTIME_DIR")
+    assert socket_path() == f"/tmp/xonsh-{os.getuid()}/daemon.sock"
+
+
+def test_check_private_dir(tmp_path):
+    private = tmp_path / "private"
+    with pytest.raises(FileNotFoundError):
+        check_private_dir(str(private))
+    check_private_dir(str(private), create=True)
+    assert oct(private.stat().st_mode & 0o777) == oct(0o700)
+    check_private_dir(str(private))
+    link = tmp_path / "link"
+    link.symlink_to(private)
+    with pytest.raises(PermissionError):
+        check_private_dir(str(link), create=True)
+    private.chmod(0o750)
+    with pytest.raises(PermissionError):
+        check_private_dir(str(private), create=True)
+
+
+def test_is_worker():
+    assert not is_worker(os.getpid(), os.getppid())
+    assert not is_worker(True, os.getpid())
+    assert not is_worker("1", os.getpid())
+    with subprocess.Popen(["sleep", "30"], start_new_session=True) as leader:
+        assert is_worker(leader.pid, os.getpid())
+        assert not is_worker(leader.pid, os.getppid())
+        leader.kill()
+    with subprocess.Popen(["sleep", "30"]) as member:
+        assert not is_worker(member.pid, os.getpid())
+        member.kill()
+
+
+class Fallback(Exception):
+    pass
+
+
+@pytest.fixture
+def listener(tmp_path, monkeypatch):
+    """A socket listening in a private directory, as a daemon would."""
+
+    def run_xonsh(argv):
+        raise Fallback
+
+    monkeypatch.setattr(client, "run_xonsh", run_xonsh)
+    rundir = tmp_path / "run"
+    check_private_dir(str(rundir), create=True)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.bind(str(rundir / "d.sock"))
+        sock.listen(1)
+        sock.setblocking(False)
+        yield sock
+
+
+def test_client_refuses_shared_dir(listener):
+    path = listener.getsockname()
+    os.chmod(os.path.dirname(path), 0o755)
+    with pytest.raises(Fallback):
+        client.run(["-c", "pass"], path)
+    with pytest.raises(BlockingIOError):
+        listener.accept()
+
+
+def test_client_refuses_daemon_of_other_user(listener, monkeypatch):
+    monkeypatch.setattr(
+        client, "peer_credentials", lambda sock: (1, os.getuid() + 1, 0)
+    )
+    with pytest.raises(Fallback):
+        client.run(["-c", "pass"], listener.getsockname())
+    conn, _ = listener.accept()
+    with conn:
+        # nothing was sent
+        assert conn.recv(1) == b""
+
+
+def test_daemon_refuses_shared_dir(env):
+    os.makedirs(os.path.dirname(env["XONSH_DAEMON_SOCKET"]), mode=0o755)
+    proc = subprocess.run(
+        [sys.executable, "-m", "xonsh", "--no-rc", "--daemon"],
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert proc.returncode == 1
+    assert "not a directory private to the user" in proc.stderr
+
+
+def test_worker_rejects_other_user(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        server, "peer_credentials", lambda sock: (1, os.getuid() + 1, 0)
+    )
+    srv = server.Server(str(tmp_path / "run" / "d.sock"), workers=1)
+    srv.bind()
+    srv._pipe = os.pipe()
+    try:
+        srv.fork_worker()
+        (pid,) = srv.idle
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(srv.path)
+            sock.settimeout(30)
+            assert sock.recv(1) == b""
+        _, status = os.waitpid(pid, 0)
+        assert os.waitstatus_to_exitcode(status) == 1
+    finally:
+        srv.listener.close()
+        for fd in srv._pipe:
+            os.close(fd)
+
+
+@pytest.fixture
+def env(tmp_path):
+    env = dict(os.environ, XONSH_DAEMON_SOCKET=str(tmp_path / "run" / "d.sock"))
+    env.pop("XONSH_DEBUG", None)
+    return env
+
+
+def test_client_without_daemon(env):
+    out = subprocess.run(
+        CLIENT + ["--no-rc", "-c", "print(1 + 1)"],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    assert out.stdout == "2\n"
+    assert out.returncode == 0
+
+
+@pytest.fixture
+def daemon(env):
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "xonsh", "--no-rc", "--daemon"],
+        env=env,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    assert "listening" in proc.stderr.readline()
+    yield env["XONSH_DAEMON_SOCKET"]
+    proc.send_signal(signal.SIGTERM)
+    assert proc.wait(10) == 0
+    proc.stderr.close()
+    assert not os.path.exists(env["XONSH_DAEMON_SOCKET"])
+
+
+def run_client(env, *args, **kwargs):
+    return subprocess.run(
+        CLIENT + ["--no-rc", *args],
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=30,
+        **kwargs,
+    )
+
+
+def test_daemon(daemon, env, tmp_path):
+    assert oct(os.stat(daemon).st_mode & 0o777) == oct(0o600)
+    env = dict(env, DAEMON_VAR="value")
+    code = (
+        "import os, sys\n"
+        "print($DAEMON_VAR, os.getcwd(), $(cat).strip(), os.getpid())\n"
+        "sys.exit(3)"
+    )
+    outs = []
+    for _ in range(2):
+        out = run_client(env, "-c", code, cwd=tmp_path, input="piped")
+        assert out.returncode == 3
+        outs.append(out.stdout.split())
+    assert outs[0][:3] == ["value", str(tmp_path), "piped"]
+    # every request runs in a new worker
+    assert outs[0][3] != outs[1][3]
+
+
+def test_daemon_isolates_requests(daemon, env):
+    run_client(env, "-c", "import json; json.daemon_leak = 1; $LEAK = 1")
+    out = run_client(
+        env, "-c", "import json; print(hasattr(json, 'daemon_leak'), 'LEAK' in ${...})"
+    )
+    assert out.stdout == "False False\n"
+
+
+def test_daemon_script_args(daemon, env, tmp_path):
+    script = tmp_path / "script.xsh"
+    script.write_text("import sys\nprint($ARGS[1:])\nsys.exit(int($ARG2))\n")
+    out = run_client(env, str(script), "4", "5")
+    assert out.stdout == "['4', '5']\n"
+    assert out.returncode == 5
+
+
+def test_daemon_interrupt(daemon, env):
+    proc = subprocess.Popen(
+        CLIENT + ["--no-rc", "-c", "print('started', flush=True)\nsleep 30"],
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    assert proc.stdout.readline() == "started\n"
+    start = time.monotonic()
+    proc.send_signal(signal.SIGINT)
+    assert proc.wait(10) != 0
+    assert time.monotonic() - start < 10
+    proc.stdout.close()
@@ -77,7 +77,8 @@ def test_env_detype_mutable_access_clear(path1, path2):
     env = Env(MYPATH=path1)
     assert path1[0] + os.pathsep + path1[1] == env.detype()["MYPATH"]
     env["MYPATH"][0] = path2
-    assert env._detyped is None
+    # only the changed variable is re-detyped
+    assert env._detyped_paths["MYPATH"] != env._d["MYPATH"].version
     assert path2 + os.pathsep + path1[1] == env.detype()["MYPATH"]
 
 
@@ -1,11 +1,25 @@
 import os
 import pathlib
 import pickle
+import threading
+import types
 from collections.abc import Iterable
 
 import pytest
 
-from xonsh.environ import DELETE_VAR, Env, EnvPath, _DeleteVarSentinel
+from xonsh.environ import (
+    DELETE_VAR,
+    Env,
+    EnvPath,
+    Var,
+    VarPattern,
+    _DeleteVarSentinel,
+    default_env,
+    load_typed_env_from_file,
+    save_typed_env_to_file,
+)
+from xonsh.lib.lazyasd import LazyObject
+from xonsh.prompt.base import PromptFields
 from xonsh.tools import env_path_to_str
 
 
@@ -82,6 +96,52 @@ def test_env_windows_does_not_strip_other_path_vars(monkeypatch):
     assert env["MANPATH"]._l == ["", "manuals"]
 
 
+def test_env_path_index_follows_mutations(xession):
+    path = EnvPath(["/a", "/b", "/a"])
+    assert "/a" in path
+    path.remove("/a")
+    assert "/a" in path
+    path.add("/a", front=True, replace=True)
+    assert path == ["/a", "/b"]
+    path.remove("/a")
+    assert "/a" not in path
+    path.append("/c")
+    path.insert(1, "/d")
+    path.prepend("/e")
+    assert path == ["/e", "/b", "/d", "/c"]
+    path[1] = "/f"
+    del path[0]
+    assert "/b" not in path and "/e" not in path
+    assert "/f" in path
+    path.add("/f", replace=True)
+    assert path == ["/d", "/c", "/f"]
+    assert path.paths == ["/d", "/c", "/f"]
+
+
+def test_env_path_contains_expands_entries(xession, monkeypatch):
+    xession.env["EXPAND_ENV_VARS"] = True
+    monkeypatch.setenv("HOME", "/home/me")
+    path = EnvPath(["~/bin", "/usr/bin"])
+    assert "/home/me/bin" in path
+    assert list(path) == ["/home/me/bin", "/usr/bin"]
+    monkeypatch.setenv("HOME", "/home/you")
+    assert "/home/you/bin" in path
+    assert "/home/me/bin" not in path
+    assert ["unhashable"] not in path
+
+
+def test_env_path_add_replace(xession):
+    path = EnvPath([f"/opt/base{i}/bin" for i in range(30)])
+    for i in range(100):
+        path.add(f"/opt/tool{i}/bin", front=True, replace=True)
+        assert f"/opt/base{i % 30}/bin" in path
+    for i in range(100):
+        path.add(f"/opt/tool{i}/bin", replace=True)
+    assert len(path) == 130
+    assert path[-1] == "/opt/tool99/bin"
+    assert path.paths[30] == "/opt/tool0/bin"
+
+
 # ═══ DELETE_VAR sentinel ═══════════════════════════════════════════════
 #
 # Covers the sentinel value that masks an environment variable for the
@@ -370,3 +430,338 @@ def test_callable_alias_can_mask_via_overlay(xession):
         assert "HOSTNAME" not in xession.env.detype()
     # Outside the alias scope the original value is intact.
     assert xession.env["HOSTNAME"] == "myhost"
+
+
+# ── incremental detype ───────────────────────────────────────────────────
+
+
+def test_detype_only_redetypes_changed_keys(monkeypatch):
+    env = Env(FOO="1", BAR="2", PATH=["/a"])
+    first = env.detype()
+    calls = []
+    orig = Env._detype_value
+
+    def counting(self, key, val):
+        calls.append(key)
+        return orig(self, key, val)
+
+    monkeypatch.setattr(Env, "_detype_value", counting)
+    assert env.detype() is first
+    env["FOO"] = "3"
+    second = env.detype()
+    assert calls == ["FOO"]
+    assert second["FOO"] == "3"
+    # dicts that were handed out are never changed
+    assert first["FOO"] == "1"
+
+
+def test_detype_tracks_env_path_mutation():
+    path = EnvPath(["/a"])
+    env = Env(PATH=path)
+    assert env.detype()["PATH"] == "/a"
+    # mutate through a reference obtained before, not through ``env``
+    path.append("/b")
+    assert env.detype()["PATH"] == os.pathsep.join(["/a", "/b"])
+
+
+def test_detype_tracks_mutable_values():
+    env = Env(BASH_COMPLETIONS=["/a"])
+    assert env.detype()["BASH_COMPLETIONS"] == "/a"
+    env["BASH_COMPLETIONS"].append("/b")
+    assert env.detype()["BASH_COMPLETIONS"] == os.pathsep.join(["/a", "/b"])
+
+
+def test_detype_deleted_key():
+    env = Env(FOO="1")
+    assert "FOO" in env.detype()
+    del env["FOO"]
+    assert "FOO" not in env.detype()
+
+
+def test_detype_swap_keeps_global_cache():
+    env = Env(FOO="1", BAR="2")
+    glb = env.detype()
+    with env.swap(FOO="swapped", BAR=DELETE_VAR):
+        swapped = env.detype()
+        assert swapped["FOO"] == "swapped"
+        assert "BAR" not in swapped
+    assert env.detype() is glb
+
+
+def _run_hg(xession, monkeypatch, seen):
+    from xonsh.prompt import vc
+
+    def check_output(*args, env, **kwargs):
+        seen.update(env)
+        return ""
+
+    monkeypatch.setattr(vc.subprocess, "check_output", check_output)
+    vc.hg_dirty_working_directory()
+
+
+def _run_gitstatus(xession, monkeypatch, seen):
+    from xonsh.prompt import gitstatus
+
+    class Popen:
+        def __init__(self, args, env, **kwargs):
+            seen.update(env)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            pass
+
+        def communicate(self, timeout=None):
+            return "", ""
+
+    monkeypatch.setattr(gitstatus.subprocess, "Popen", Popen)
+    gitstatus._get_sp_output(xession, "git", "status")
+
+
+def _run_exec(xession, monkeypatch, seen):
+    from xonsh import aliases
+
+    def execvpe(cmd, args, env):
+        seen.update(env)
+        raise OSError(1, "not permitted")
+
+    monkeypatch.setattr(aliases.os, "execvpe", execvpe)
+    aliases.xexec_fn(["true"])
+
+
+@pytest.mark.parametrize(
+    "run, key, value",
+    [
+        (_run_hg, "HGRCPATH", ""),
+        (_run_gitstatus, "GIT_OPTIONAL_LOCKS", "0"),
+        (_run_exec, "SHLVL", "1"),
+    ],
+)
+def test_detype_callers_do_not_change_the_cache(run, key, value, xession, monkeypatch):
+    """Variables that callers add for their own subprocess must not stay in
+    the environment of the later ones.
+    """
+    xession.env["SHLVL"] = "2"
+    xession.env.pop("HGRCPATH", None)
+    xession.env.pop("GIT_OPTIONAL_LOCKS", None)
+    before = dict(xession.env.detype())
+    seen = {}
+    run(xession, monkeypatch, seen)
+    assert seen[key] == value
+    assert xession.env.detype() == before
+    xession.env["UNRELATED_VAR"] = "1"
+    assert xession.env.detype().get(key) == before.get(key)
+
+
+# ── VarPattern index ────────────────────────────────────────────────────
+
+
+def test_var_pattern_index_follows_pattern_changes():
+    env = Env(FOO_PATH="/a", BAR_SPOTS="/b")
+    assert isinstance(env["FOO_PATH"], EnvPath)
+    assert env.get_detyper("BAR_SPOTS") is env.get_detyper("OTHER")
+    env["XONSH_ENV_PATTERN_SPOTS"] = VarPattern(r"\w*SPOTS$", "env_path")
+    assert env._find_var_pattern_name("BAR_SPOTS") == "XONSH_ENV_PATTERN_SPOTS"
+    env["XONSH_ENV_PATTERN_PATH"] = None
+    assert env._find_var_pattern_name("NEW_PATH") is None
+    del env["XONSH_ENV_PATTERN_PATH"]
+    assert env._find_var_pattern_name("NEW_PATH") == "XONSH_ENV_PATTERN_PATH"
+    del env["XONSH_ENV_PATTERN_SPOTS"]
+    assert env._find_var_pattern_name("BAR_SPOTS") is None
+
+
+def test_var_pattern_index_honors_exclude():
+    env = Env()
+    env["XONSH_ENV_PATTERN_PATH"].exclude.append("NOT_A_PATH")
+    try:
+        assert env._find_var_pattern_name("NOT_A_PATH") is None
+        assert env._find_var_pattern_name("A_PATH") == "XONSH_ENV_PATTERN_PATH"
+    finally:
+        env["XONSH_ENV_PATTERN_PATH"].exclude.remove("NOT_A_PATH")
+
+
+def test_var_pattern_index_register():
+    env = Env()
+    env.register("MY_PATTERN", default=VarPattern(r"MY_\w*$", "env_path"))
+    assert env._find_var_pattern_name("MY_THING") == "MY_PATTERN"
+    env.deregister("MY_PATTERN")
+    assert env._find_var_pattern_name("MY_THING") is None
+
+
+def test_var_pattern_register_redetypes_matching_vars():
+    env = Env(MY_FLAG="yes", OTHER="x")
+    assert env.detype()["MY_FLAG"] == "yes"
+    env.register("MY_PATTERN", default=VarPattern(r"MY_\w*$", "bool"))
+    assert env.detype()["MY_FLAG"] == "1"
+    env.deregister("MY_PATTERN")
+    assert env.detype()["MY_FLAG"] == "yes"
+    assert env.detype()["OTHER"] == "x"
+
+
+def test_var_pattern_swapped():
+    env = Env()
+    with env.swap(XONSH_ENV_PATTERN_SPOTS=VarPattern(r"\w*SPOTS$", "env_path")):
+        assert env._find_var_pattern_name("X_SPOTS") == "XONSH_ENV_PATTERN_SPOTS"
+    assert env._find_var_pattern_name("X_SPOTS") is None
+
+
+def test_bulk_env_construction():
+    """Builds an env from a large environment, as in containers."""
+    environ = {f"CONTAINER_VAR_{i}": f"value-{i}" for i in range(100)}
+    environ.update({f"TOOL_{i}_PATH": f"/opt/tool{i}/bin" for i in range(20)})
+    env = Env(environ)
+    denv = env.detype()
+    assert denv["TOOL_3_PATH"] == "/opt/tool3/bin"
+    assert denv["CONTAINER_VAR_42"] == "value-42"
+    assert isinstance(env["TOOL_3_PATH"], EnvPath)
+
+
+# ── lazy defaults ────────────────────────────────────────────────────────
+
+
+def test_pattern_lookup_keeps_lazy_defaults_unloaded():
+    lazy = LazyObject(lambda: ("a", "b"), {}, "LAZY_DEFAULT")
+    env = Env()
+    env._vars["MY_LAZY"] = Var(default=lazy)
+    assert env.get_detyper("UNKNOWN_VAR") is not None
+    env["OTHER_VAR"] = "x"
+    assert env.detype()["OTHER_VAR"] == "x"
+    assert not lazy._lasdo["loaded"]
+
+
+def test_prompt_fields_materialize_on_first_access(xession):
+    ctx = default_env()
+    assert "PROMPT_FIELDS" not in ctx
+    env = Env(ctx)
+    assert "PROMPT_FIELDS" in env
+    fields = env["PROMPT_FIELDS"]
+    assert isinstance(fields, PromptFields)
+    fields["my_field"] = "value"
+    assert env["PROMPT_FIELDS"] is fields
+    assert env["PROMPT_FIELDS"]["my_field"] == "value"
+
+
+# ── snapshots ────────────────────────────────────────────────────────────
+
+
+def test_snapshot_is_reused_while_unchanged():
+    env = Env(FOO="1")
+    with env.swap(FOO="2"):
+        snap = env.snapshot()
+        assert env.snapshot() is snap
+        assert snap.detype() is env.detype()
+        assert env.detype()["FOO"] == "2"
+        env["BAR"] = "x"
+        assert env.snapshot() is not snap
+        assert env.detype()["BAR"] == "x"
+        # the old snapshot still holds the earlier environment
+        assert "BAR" not in snap.detype()
+    assert env.detype()["FOO"] == "1"
+
+
+def test_threaded_aliases_share_detyped_env(monkeypatch):
+    env = Env(**{f"VAR_{i}": str(i) for i in range(100)})
+    env.detype()
+    calls = []
+    orig = Env._detype_value
+
+    def counting(self, key, val):
+        calls.append(key)
+        return orig(self, key, val)
+
+    monkeypatch.setattr(Env, "_detype_value", counting)
+    barrier = threading.Barrier(8)
+    results = {}
+
+    def alias(n):
+        # like a threaded callable alias running 20 commands
+        with env.swap(__ALIAS_NAME=f"a{n}"):
+            barrier.wait()
+            results[n] = [env.detype() for _ in range(20)]
+
+    threads = [threading.Thread(target=alias, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # each thread detyped its own swapped value once, not the whole env
+    assert sorted(calls) == ["__ALIAS_NAME"] * 8
+    for n, denvs in results.items():
+        assert all(d is denvs[0] for d in denvs)
+        assert denvs[0]["__ALIAS_NAME"] == f"a{n}"
+        assert denvs[0]["VAR_7"] == "7"
+
+
+def test_callers_do_not_modify_shared_snapshots(xession, monkeypatch):
+    """The detyped env of a snapshot is shared by every thread that sees
+    the same environment, so callers must copy it before adding to it.
+    """
+    from xonsh.environ import EnvSnapshot
+    from xonsh.procs.specs import SubprocSpec
+
+    detype = EnvSnapshot.detype
+    monkeypatch.setattr(
+        EnvSnapshot, "detype", lambda self: types.MappingProxyType(detype(self))
+    )
+    xession.env["SHLVL"] = "2"
+    errors = []
+
+    def alias():
+        # like a threaded callable alias
+        try:
+            with xession.env.swap(__ALIAS_NAME="a"):
+                for run in (_run_hg, _run_gitstatus, _run_exec):
+                    run(xession, monkeypatch, {})
+                SubprocSpec(cmd=["/bin/true"]).prep_env_subproc({})
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=alias)
+    thread.start()
+    thread.join()
+    assert errors == []
+
+
+# ── typed env shared with nested sessions ────────────────────────────────
+
+
+def test_typed_env_file_skips_unchanged_conversions(tmp_path, monkeypatch):
+    parent = Env(XONSH_DATA_DIR=str(tmp_path), MYPATH="/a:/b", FOO="1", BAR="x")
+    save_typed_env_to_file(parent, "sid")
+    env_file = parent["XONSH_TYPED_ENV_FILE"]
+    assert os.stat(env_file).st_mode & 0o077 == 0
+    saved = load_typed_env_from_file(env_file)
+    assert saved["MYPATH"] == ("/a:/b", parent["MYPATH"])
+    # saving again in the same session keeps the file
+    mtime = os.stat(env_file).st_mtime_ns
+    save_typed_env_to_file(parent, "sid")
+    assert os.stat(env_file).st_mtime_ns == mtime
+
+    inherited = dict(parent.detype(), BAR="changed")
+    converted = []
+    set_item = Env._set_item
+
+    def _set_item(self, key, *args, **kwargs):
+        converted.append(key)
+        return set_item(self, key, *args, **kwargs)
+
+    monkeypatch.setattr(Env, "_set_item", _set_item)
+    child = Env(inherited)
+    assert sorted(converted) == ["BAR", "XONSH_TYPED_ENV_FILE"]
+    assert isinstance(child["MYPATH"], EnvPath)
+    assert child["MYPATH"] == ["/a", "/b"]
+    assert child["MYPATH"] is not parent["MYPATH"]
+    assert child["BAR"] == "changed"
+    assert child.detype() == inherited
+
+
+def test_typed_env_file_rejects_foreign_files(tmp_path, monkeypatch):
+    env = Env(XONSH_DATA_DIR=str(tmp_path), FOO="1")
+    save_typed_env_to_file(env, "sid")
+    env_file = env["XONSH_TYPED_ENV_FILE"]
+    assert load_typed_env_from_file(env_file)
+    assert load_typed_env_from_file(None) == {}
+    assert load_typed_env_from_file(str(tmp_path / "missing.pickle")) == {}
+    monkeypatch.setattr("xonsh.environ.XONSH_VERSION", "0.0.0")
+    assert load_typed_env_from_file(env_file) == {}
@@ -4,6 +4,7 @@ import os
 
 import pytest
 
+from xonsh.built_ins import XSH
 from xonsh.pytest.tools import ON_WINDOWS, skip_if_on_unix, skip_if_on_windows
 
 
@@ -314,6 +315,69 @@ def test_pyeval_in_andor_chain(line, xonsh_execer_parse):
     assert xonsh_execer_parse(line + "\n")
 
 
+@pytest.mark.parametrize(
+    "code",
+    [
+        "echo hello world\n",
+        "x = 1\necho $HOME\nprint(x)\n",
+        "if x:\n    echo hi\n    y = 2\nelse:\n    ls -la | grep foo && echo ok\n",
+        "for i in range(3):\n    print(i)\n    git status --short\n",
+        'echo a \\\n  b c\ns = """a\nb"""\necho @(s) $(ls)\n',
+        "def f():\n    echo in func\n    return 1\n\nf()\ncd /tmp\n",
+        "x = (1,\n     2)\nls -l\n",
+        "echo hi; x = 1; echo there\n",
+        "if True: echo one-liner\n",
+    ],
+)
+@pytest.mark.parametrize("mode", ["exec", "single"])
+def test_single_pass_parse_matches_retry_loop(code, mode, xonsh_execer):
+    import ast as pyast
+
+    expected, expected_src = xonsh_execer._parse_ctx_free(code, mode=mode)
+    obs = xonsh_execer._parse_ctx_free_single_pass(code, mode=mode)
+    assert obs is not None
+    tree, src = obs
+    assert src == expected_src
+    assert pyast.dump(tree) == pyast.dump(expected)
+
+
+def test_single_pass_parse_falls_back_on_syntax_error(xonsh_execer, monkeypatch):
+    code = "x = 1\nfoo('spam'='eggs')\n"
+    assert xonsh_execer._parse_ctx_free_single_pass(code) is None
+    monkeypatch.setattr(xonsh_execer, "single_pass", True)
+    with pytest.raises(SyntaxError):
+        xonsh_execer.parse(code, ctx=None)
+
+
+def test_single_mode_reuses_cached_lines(xonsh_execer, monkeypatch):
+    import ast as pyast
+
+    monkeypatch.setattr(xonsh_execer, "single_pass", True)
+    monkeypatch.setitem(XSH.env, "XONSH_PARSER_LINE_CACHE_SIZE", 16)
+    xonsh_execer.line_cache.clear()
+    code = "for i in range(3):\n    echo @(i)\n    ls -l\n    git status\n"
+    first = xonsh_execer.parse(code, ctx=None, mode="single")
+    misses = xonsh_execer.line_cache.misses
+    assert misses > 0
+    edited = code.replace("git status", "git log")
+    second = xonsh_execer.parse(edited, ctx=None, mode="single")
+    # only the edited line had to be looked at again
+    assert xonsh_execer.line_cache.misses == misses + 1
+    assert xonsh_execer.line_cache.hits > 0
+    assert pyast.dump(first) != pyast.dump(second)
+    monkeypatch.setattr(xonsh_execer, "single_pass", False)
+    expected = xonsh_execer.parse(edited, ctx=None, mode="single")
+    assert pyast.dump(second) == pyast.dump(expected)
+
+
+def test_single_mode_without_single_pass(xonsh_execer, monkeypatch):
+    monkeypatch.setattr(xonsh_execer, "single_pass", False)
+    monkeypatch.setitem(XSH.env, "XONSH_PARSER_LINE_CACHE_SIZE", 16)
+    xonsh_execer.line_cache.clear()
+    assert xonsh_execer.parse("x = 1\nls -l\n", ctx=None, mode="single")
+    assert xonsh_execer.line_cache.misses == 0
+
+
 def pyast_unparse(tree):
     """Return ast.unparse on the tree (helper for the tests above)."""
     import ast as pyast
@@ -1,6 +1,7 @@
 """Testing xonsh import hooks"""
 
 import os
+import sys
 from importlib import import_module
 
 import pytest
@@ -81,3 +82,23 @@ def test_get_source():
     source = loader.get_source("sample")
     with open(os.path.join(TEST_DIR, "sample.xsh")) as srcfile:
         assert source == srcfile.read()
+
+
+def test_import_with_script_pack(xession, tmp_path, monkeypatch):
+    from xonsh.codecache import get_script_pack
+
+    xession.execer.scriptcache = True
+    xession.env.update(
+        {
+            "XONSH_DATA_DIR": str(tmp_path),
+            "XONSH_CACHE_SCRIPTS": True,
+            "XONSH_CACHE_SCRIPTS_PACK": True,
+        }
+    )
+    (tmp_path / "packed_mod.xsh").write_text("x = 42\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    for _ in range(2):
+        mod = import_module("packed_mod")
+        assert mod.x == 42
+        monkeypatch.delitem(sys.modules, "packed_mod")
+    assert str(tmp_path / "packed_mod.xsh") in get_script_pack()
@@ -0,0 +1,209 @@
+"""Tests for the startup snapshots of the rc files."""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from xonsh.environ import xonshrc_context
+from xonsh.platform import ON_WINDOWS
+from xonsh.pytest.tools import copy_env
+from xonsh.startup_snapshot import StartupSnapshot, snapshot_dir
+
+RC = """
+import json
+$SNAP_VAR = "snap"
+$PATH.append("/snapshot/bin")
+aliases["snap-ll"] = "ls -l"
+aliases["snap-doc"] = {"alias": ["echo", "doc"], "doc": "documented"}
+del aliases["snap-gone"]
+snap_data = {"a": [1, 2]}
+from os.path import join as snap_join
+"""
+
+
+@pytest.fixture
+def session(xession, xonsh_execer):
+    xession.env["PATH"] = ["/usr/bin"]
+    xession.aliases["snap-gone"] = "echo gone"
+    return xession
+
+
+@pytest.fixture
+def reset(session, monkeypatch):
+    """Returns a function that undoes the changes made by the rc files, as
+    if xonsh started again.
+    """
+    env = copy_env(session.env)
+
+    def reset():
+        monkeypatch.setattr(session, "env", copy_env(env))
+        session.env["PATH"] = ["/usr/bin"]
+        for name in ("snap-ll", "snap-doc"):
+            session.aliases.pop(name, None)
+        session.aliases["snap-gone"] = "echo gone"
+
+    return reset
+
+
+def load(session, rcfile, ctx, run=True):
+    """Loads ``rcfile`` through a snapshot, ``run`` tells whether the rc
+    file is expected to run.
+    """
+    calls = []
+
+    def run_rc():
+        calls.append(rcfile)
+        return xonshrc_context(
+            rcfiles=[str(rcfile)], execer=session.execer, ctx=ctx, env=session.env
+        )
+
+    ctx.setdefault("aliases", session.aliases)
+    snapshot = StartupSnapshot([str(rcfile)], (), session.env, ctx)
+    snapshot.rc_files = snapshot.load(run_rc)
+    assert bool(calls) == run
+    return snapshot
+
+
+def check(session, ctx):
+    assert session.env["SNAP_VAR"] == "snap"
+    assert list(session.env["PATH"]) == ["/usr/bin", "/snapshot/bin"]
+    assert session.aliases["snap-ll"] == ["ls", "-l"]
+    assert session.aliases.get_doc("snap-doc") == "documented"
+    assert "snap-gone" not in session.aliases
+    assert ctx["snap_data"] == {"a": [1, 2]}
+    assert ctx["snap_join"] is os.path.join
+    assert ctx["json"] is sys.modules["json"]
+
+
+def test_restore(session, reset, tmp_path):
+    rcfile = tmp_path / "rc.xsh"
+    rcfile.write_text(RC)
+    ctx = {}
+    snapshot = load(session, rcfile, ctx)
+    assert snapshot.rc_files == [str(rcfile)]
+    assert os.path.isfile(snapshot.filename)
+    assert os.path.dirname(snapshot.filename) == snapshot_dir()
+    check(session, ctx)
+    reset()
+    ctx = {}
+    assert load(session, rcfile, ctx, run=False).rc_files == [str(rcfile)]
+    check(session, ctx)
+
+
+def test_changed_rc_runs_again(session, reset, tmp_path):
+    rcfile = tmp_path / "rc.xsh"
+    rcfile.write_text(RC)
+    load(session, rcfile, {})
+    reset()
+    rcfile.write_text(RC + "$SNAP_MORE = 1\n")
+    load(session, rcfile, {})
+    assert session.env["SNAP_MORE"] == 1
+
+
+def test_changed_env_runs_again(session, reset, tmp_path):
+    rcfile = tmp_path / "rc.xsh"
+    rcfile.write_text(RC)
+    load(session, rcfile, {})
+    reset()
+    session.env["SNAP_OTHER"] = "x"
+    load(session, rcfile, {})
+    reset()
+    session.env["PWD"] = str(tmp_path / "elsewhere")
+    load(session, rcfile, {}, run=False)
+
+
+def touch_later(path, text):
+    """Rewrites ``path`` with a modification time that differs even on file
+    systems with a coarse clock.
+    """
+    mtime = path.stat().st_mtime_ns
+    path.write_text(text)
+    os.utime(path, ns=(mtime + 10**9, mtime + 10**9))
+
+
+def test_changed_sourced_file_runs_again(session, reset, tmp_path, monkeypatch):
+    monkeypatch.setattr(session.builtins, "execx", session.execer.exec)
+    sourced = tmp_path / "sourced.xsh"
+    sourced.write_text("$SNAP_SOURCED = 'a'\n")
+    rcfile = tmp_path / "rc.xsh"
+    # the function of the source alias, aliases are not run by the tests
+    rcfile.write_text(
+        "from xonsh.aliases import source_alias_fn\n"
+        f"source_alias_fn([{str(sourced)!r}])\n"
+    )
+    snapshot = load(session, rcfile, {})
+    assert os.path.isfile(snapshot.filename)
+    reset()
+    load(session, rcfile, {}, run=False)
+    assert session.env["SNAP_SOURCED"] == "a"
+    reset()
+    touch_later(sourced, "$SNAP_SOURCED = 'b'\n")
+    load(session, rcfile, {})
+    assert session.env["SNAP_SOURCED"] == "b"
+
+
+def test_changed_imported_module_runs_again(session, reset, tmp_path, monkeypatch):
+    module = tmp_path / "snap_rc_module.py"
+    module.write_text("VALUE = 'a'\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "snap_rc_module", raising=False)
+    rcfile = tmp_path / "rc.xsh"
+    rcfile.write_text("from snap_rc_module import VALUE\n$SNAP_IMPORTED = VALUE\n")
+    load(session, rcfile, {})
+    reset()
+    load(session, rcfile, {}, run=False)
+    reset()
+    touch_later(module, "VALUE = 'b'\n")
+    del sys.modules["snap_rc_module"]
+    load(session, rcfile, {})
+    assert session.env["SNAP_IMPORTED"] == "b"
+
+
+@pytest.mark.parametrize(
+    "src",
+    [
+        "def snap_f(args):\n    return 'f'\naliases['snap-f'] = snap_f\n",
+        "@events.on_post_init\ndef snap_handler(**kw):\n    pass\n",
+        "class SnapClass:\n    pass\n",
+    ],
+)
+def test_rc_defined_objects_are_not_snapshot(session, tmp_path, src):
+    rcfile = tmp_path / "rc.xsh"
+    rcfile.write_text(src)
+    snapshot = load(session, rcfile, {})
+    assert not os.path.exists(snapshot.filename)
+
+
+def test_failed_rc_is_not_snapshot(session, tmp_path, capsys):
+    rcfile = tmp_path / "rc.xsh"
+    rcfile.write_text("$SNAP_VAR = 1\nraise ValueError('oops')\n")
+    snapshot = load(session, rcfile, {})
+    assert snapshot.rc_files == []
+    assert not os.path.exists(snapshot.filename)
+    assert "oops" in capsys.readouterr().err
+
+
+@pytest.mark.skipif(ON_WINDOWS, reason="POSIX file modes")
+def test_shared_snapshot_is_ignored(session, reset, tmp_path):
+    rcfile = tmp_path / "rc.xsh"
+    rcfile.write_text(RC)
+    snapshot = load(session, rcfile, {})
+    os.chmod(snapshot.filename, 0o644)
+    reset()
+    load(session, rcfile, {})
+
+
+def test_main_skips_rc(tmp_path):
+    rcfile = tmp_path / "rc.xsh"
+    rcfile.write_text("print('running rc')\n$SNAP_VAR = 'snap'\n")
+    env = dict(os.environ, XONSH_CACHE_DIR=str(tmp_path / "cache"))
+    env.pop("XONSH_DEBUG", None)
+    cmd = [sys.executable, "-m", "xonsh", "-DXONSH_STARTUP_SNAPSHOT=1"]
+    cmd += ["--rc", str(rcfile), "-c", "print($SNAP_VAR)"]
+    outs = [
+        subprocess.run(cmd, env=env, capture_output=True, text=True, check=True).stdout
+        for _ in range(2)
+    ]
+    assert outs == ["running rc\nsnap\n", "snap\n"]
@@ -5,8 +5,12 @@ tests target the pure helpers — ``format_time``, the lazy clock objects, and
 ``Timer.timeit`` — without spinning up an interactive shell.
 """
 
+import subprocess
+import sys
 import time
 
+import pytest
+
 from xonsh.timings import (
     _HAVE_RESOURCE,
     Timer,
@@ -130,3 +134,103 @@ def test_timeit_alias_no_args_returns_minus_one(capsys):
     assert rc == -1
     out = capsys.readouterr().out
     assert "Usage" in out
+
+
+# --- startup profile -------------------------------------------------------
+
+
+@pytest.mark.parametrize(
+    "argv, exp",
+    [
+        (["--timings"], (True, None)),
+        (["--timings-file", "out.folded"], (True, "out.folded")),
+        (["--timings-file=out.folded", "-c", "x"], (True, "out.folded")),
+        (["-c", "x", "--timings"], (True, None)),
+        (["-lc", "--timings", "-i"], (False, None)),
+        (["--rc", "a.xsh", "b.xsh", "--timings"], (True, None)),
+        (["-D", "--timings"], (False, None)),
+        (["--no-rc", "script.xsh", "--timings"], (False, None)),
+        (["script.xsh", "--timings-file", "out"], (False, None)),
+        (["--", "--timings"], (False, None)),
+        (["--timings-foo"], (False, None)),
+        ([], (False, None)),
+    ],
+)
+def test_timings_options(argv, exp):
+    from xonsh.lib.startup_profile import timings_options
+
+    assert timings_options(argv) == exp
+
+
+def test_script_arguments_do_not_start_profiler(monkeypatch):
+    import xonsh.main
+    from xonsh import __main__ as entry
+    from xonsh.lib import startup_profile
+
+    started = []
+    monkeypatch.setattr(startup_profile, "start", lambda: started.append(1))
+    monkeypatch.setattr(xonsh.main, "main", lambda: 0)
+    monkeypatch.setattr(sys, "argv", ["xonsh", "script.xsh", "--timings-foo"])
+    entry.main()
+    assert not started
+    monkeypatch.setattr(sys, "argv", ["xonsh", "--timings", "script.xsh"])
+    entry.main()
+    assert started
+
+
+def test_print_startup_profile(capsys):
+    from xonsh.lib.startup_profile import StartupProfiler
+    from xonsh.timings import print_startup_profile
+
+    prof = StartupProfiler()
+    prof.start_time = time.perf_counter()
+    with prof.frame("import " + "x" * 100):
+        with prof.frame("rc file"):
+            pass
+    prof.stop()
+    print_startup_profile(prof)
+    out = capsys.readouterr().out
+    assert "|xonsh " in out
+    assert "|rc file " in out
+    assert "import " + "x" * 60 + "..." in out
+
+
+def test_importing_xonsh_does_not_start_the_profiler():
+    """A host process with a ``--timings`` argument, e.g. a test runner,
+    does not get its imports hooked by importing xonsh.
+    """
+    code = (
+        "import sys\n"
+        "sys.argv[1:] = ['--timings']\n"
+        "import xonsh.main\n"
+        "from xonsh.lib import startup_profile\n"
+        "print(startup_profile.PROFILER)\n"
+    )
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout == "None\n"
+
+
+def test_timings_file_flame_graph(tmp_path):
+    """``--timings-file`` writes the startup as folded stacks."""
+    rc = tmp_path / "rc.xsh"
+    rc.write_text("@events.on_post_rc\ndef _rc_done(**kw):\n    pass\n")
+    out = tmp_path / "startup.folded"
+    cmd = [sys.executable, "-m", "xonsh", "--rc", str(rc), "--timings-file"]
+    proc = subprocess.run(
+        cmd + [str(out), "-c", "echo ok"], capture_output=True, text=True
+    )
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout == "ok\n"
+    assert "Startup frame" in proc.stderr
+    stacks = {}
+    for line in out.read_text().splitlines():
+        stack, value = line.rsplit(" ", 1)
+        stacks[stack] = int(value)
+    assert all(stack.split(";")[0] == "xonsh" for stack in stacks)
+    frames = {f for stack in stacks for f in stack.split(";")}
+    assert any(f.startswith("import xonsh.") for f in frames)
+    assert any(f.startswith("lazy xonsh.") and " <- " in f for f in frames)
+    assert f"rc {rc}" in frames
+    assert "xonsh_session_load" in frames
+    assert any(f.startswith("on_post_rc ") for f in frames)
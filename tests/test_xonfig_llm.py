@@ -17,6 +17,7 @@ from xonsh.xonfig import (
     XONFIG_DUMP_RULES,
     XonfigAlias,
     _align_string,
+    _cache,
     _dump_xonfig_env,
     _dump_xonfig_foreign_shell,
     _dump_xonfig_xontribs,
@@ -196,6 +197,20 @@ def test_info_to_json_returns_valid_json(xession):
     assert "Python" in parsed
 
 
+def test_cache_reports_and_clears(xession, tmp_path):
+    xession.env["XONSH_DATA_DIR"] = str(tmp_path)
+    xession.env["XONSH_CACHE_DIR"] = str(tmp_path / "cache")
+    shard = tmp_path / "xonsh_code_cache" / "ab"
+    shard.mkdir(parents=True)
+    (shard / "abcdef").write_bytes(b"0123456789")
+    data = json.loads(_cache(to_json=True))
+    assert data["code_cache_files"] == 1
+    assert data["code_cache_bytes"] == 10
+    data = json.loads(_cache(clear=True, to_json=True))
+    assert data["code_cache_files"] == 0
+    assert data["code_cache_removed"] == "1 files, 10 bytes"
+
+
 # --- make_envvar ------------------------------------------------------------
 
 
@@ -1,3 +1,20 @@
-from xonsh.main import main
+"""Entry point of ``python -m xonsh`` and of the ``xonsh`` script."""
 
-main()
+import sys
+
+
+def main():
+    """Runs xonsh, with the startup profiler of ``--timings`` started before
+    xonsh itself is imported, so that it times those imports too.
+    """
+    from xonsh.lib import startup_profile
+
+    if startup_profile.timings_options(sys.argv[1:])[0]:
+        startup_profile.start()
+    from xonsh.main import main
+
+    return main()
+
+
+if __name__ == "__main__":
+    main()
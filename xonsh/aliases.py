@@ -4,6 +4,7 @@ import argparse
 import functools
 import importlib.util
 import inspect
+import itertools
 import operator
 import os
 import pathlib
@@ -283,11 +284,19 @@ def print_alias_help(name: str, superhelp: bool = False) -> None:
     xt.print_color("\n".join(lines))
 
 
+_GENERATIONS = itertools.count()
+
+
 class Aliases(cabc.MutableMapping):
     """Represents a location to hold and look up aliases."""
 
     def __init__(self, *args, **kwargs):
         self._raw = {}
+        # Changes whenever an alias name is added or removed, so that
+        # caches of the names (e.g. the commands cache) can check for
+        # changes in O(1). Drawn from a counter shared by all instances, so
+        # that two ``Aliases`` never have the same generation.
+        self.generation = next(_GENERATIONS)
         # Per-alias docstring registry. Populated when an alias is assigned
         # via the dict-form ``aliases[k] = {"alias": ..., "doc": "..."}``
         # (which lets list/string aliases carry a description), and consumed
@@ -625,6 +634,8 @@ class Aliases(cabc.MutableMapping):
             explicit_doc = val.get("doc") or None
             val = val["alias"]
 
+        if key not in self._raw:
+            self.generation = next(_GENERATIONS)
         if isinstance(val, str):
             f = "<exec-alias:" + key + ">"
             if EXEC_ALIAS_RE.search(val) is not None:
@@ -690,6 +701,7 @@ class Aliases(cabc.MutableMapping):
     def __delitem__(self, key):
         del self._raw[key]
         self._docs.pop(key, None)
+        self.generation = next(_GENERATIONS)
 
     def update(self, *args, **kwargs):
         for key, val in dict(*args, **kwargs).items():
@@ -1401,7 +1413,7 @@ def xexec_fn(
 
     denv = {}
     if not clean:
-        denv = XSH.env.detype()
+        denv = dict(XSH.env.detype())
 
         # decrement $SHLVL to mirror bash's behaviour
         if "SHLVL" in denv:
@@ -1,13 +1,19 @@
 """Tools for caching xonsh code."""
 
+import builtins
 import hashlib
 import marshal
+import mmap
 import os
+import pickle
+import struct
 import sys
+import threading
 
 from xonsh import __version__ as XONSH_VERSION
 from xonsh.built_ins import XSH
 from xonsh.lib.lazyasd import lazyobject
+from xonsh.parser import parser_version
 from xonsh.platform import PYTHON_VERSION_INFO_BYTES
 from xonsh.tools import is_writable_file, print_warning
 
@@ -82,9 +88,12 @@ def get_cache_filename(fname, code=True):
     than the script store.
     """
     datadir = XSH.env["XONSH_DATA_DIR"]
-    cachedir = os.path.join(
-        datadir, "xonsh_code_cache" if code else "xonsh_script_cache"
-    )
+    if code:
+        # code is cached by hash, spread it over 256 subdirectories so that
+        # no single directory gets too large
+        cachedir = os.path.join(datadir, "xonsh_code_cache", fname[:2])
+    else:
+        cachedir = os.path.join(datadir, "xonsh_script_cache")
     cachefname = os.path.join(cachedir, *_cache_renamer(fname, code=code))
     return cachefname
 
@@ -114,6 +123,140 @@ def update_cache(ccode, cache_file_name):
             marshal.dump(ccode, cfile)
 
 
+def update_code_cache(ccode, cache_file_name):
+    """
+    Update the code cache entry at ``cache_file_name``, then evict the least
+    recently used entries of its subdirectory that are beyond its share of
+    ``$XONSH_CODE_CACHE_MAX_FILES`` and ``$XONSH_CODE_CACHE_MAX_SIZE``.
+    """
+    update_cache(ccode, cache_file_name)
+    if cache_file_name is not None:
+        prune_cache_shard(os.path.dirname(cache_file_name))
+
+
+def _touch(cache_file_name):
+    """Marks a cache entry as recently used. File access times can't be
+    relied upon (noatime, relatime), so the modification time is used."""
+    try:
+        os.utime(cache_file_name)
+    except OSError:
+        pass
+
+
+def cache_budget():
+    """
+    Return the ``(max_files, max_bytes)`` budget of the content-addressed
+    caches, where zero means unlimited.
+    """
+    env = XSH.env
+    return env.get("XONSH_CODE_CACHE_MAX_FILES", 0), env.get(
+        "XONSH_CODE_CACHE_MAX_SIZE", 0
+    )
+
+
+_NSHARDS = 256
+
+
+def prune_cache_shard(shard):
+    """
+    Enforce the per-subdirectory share of the cache budget on ``shard``,
+    one of the 256 subdirectories of a content-addressed cache.
+    """
+    max_files, max_bytes = cache_budget()
+    if max_files <= 0 and max_bytes <= 0:
+        return 0, 0
+    return prune_cache(
+        shard,
+        max_files=max(max_files // _NSHARDS, 1) if max_files > 0 else 0,
+        max_bytes=max(max_bytes // _NSHARDS, 1) if max_bytes > 0 else 0,
+    )
+
+
+def _cache_entries(cachedir):
+    """Yields ``(mtime, size, path)`` for every file below ``cachedir``."""
+    try:
+        it = os.scandir(cachedir)
+    except OSError:
+        return
+    with it:
+        for entry in it:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    yield from _cache_entries(entry.path)
+                else:
+                    st = entry.stat(follow_symlinks=False)
+                    yield st.st_mtime, st.st_size, entry.path
+            except OSError:
+                continue
+
+
+def cache_usage(cachedir):
+    """
+    Return the number of files and total size in bytes of the cache in
+    ``cachedir``.
+    """
+    nfiles = nbytes = 0
+    for _, size, _ in _cache_entries(cachedir):
+        nfiles += 1
+        nbytes += size
+    return nfiles, nbytes
+
+
+def prune_cache(cachedir, max_files=0, max_bytes=0):
+    """
+    Remove the least recently used files below ``cachedir`` until there are
+    at most ``max_files`` files totalling at most ``max_bytes`` bytes; zero
+    means no limit. Return the number of files removed and bytes freed.
+    """
+    entries = sorted(_cache_entries(cachedir), reverse=True)
+    nfiles = len(entries)
+    nbytes = sum(size for _, size, _ in entries)
+    removed = freed = 0
+    while entries and (
+        (max_files > 0 and nfiles > max_files) or (max_bytes > 0 and nbytes > max_bytes)
+    ):
+        _, size, path = entries.pop()
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        nfiles -= 1
+        nbytes -= size
+        removed += 1
+        freed += size
+    return removed, freed
+
+
+def clear_cache(cachedir):
+    """
+    Remove every file below ``cachedir``. Return the number of files removed
+    and bytes freed.
+    """
+    removed = freed = 0
+    for _, size, path in list(_cache_entries(cachedir)):
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        removed += 1
+        freed += size
+    return removed, freed
+
+
+def cache_dirs():
+    """
+    Return a dict mapping the name of each of xonsh's code caches, and of
+    the startup snapshots, to its directory.
+    """
+    env = XSH.env
+    return {
+        "code": os.path.join(env["XONSH_DATA_DIR"], "xonsh_code_cache"),
+        "script": os.path.join(env["XONSH_DATA_DIR"], "xonsh_script_cache"),
+        "transform": os.path.join(env["XONSH_CACHE_DIR"], "xonsh_transform_cache"),
+        "startup": os.path.join(env["XONSH_CACHE_DIR"], "xonsh_startup_snapshot"),
+    }
+
+
 def _check_cache_versions(cfile):
     # version data should be < 1 kb
     ver = cfile.readline(1024).strip()
@@ -169,26 +312,414 @@ def script_cache_check(filename, cachefname):
     return run_cached, ccode
 
 
+class ScriptCachePack:
+    """
+    A single file holding the compiled code of many scripts, memory-mapped
+    and read in place instead of opening one cache file per script.
+
+    The pack starts with the xonsh and Python version lines and a random
+    generation, which changes whenever the pack is rewritten, followed by
+    one record per compiled script: the size of the rest of the record, the
+    modification time and size of the script and the length of its real
+    path, then the path and the marshalled code object. An entry is only
+    used if the script still has the recorded modification time and size.
+
+    Adding an entry appends a record, and the last record of a script wins,
+    so that the code of the other scripts is not written again. Once the
+    outdated records, and those of scripts that no longer exist, make up
+    most of the pack, it is rewritten next to the old one, which it then
+    atomically replaces. Shells that have the pack mapped pick up the new
+    records the next time they look up a script that isn't in their copy.
+    When a shell compacts the pack while another one appends to it, the
+    appended script is simply compiled and added again.
+    """
+
+    COMPACT_SIZE = 1024 * 1024
+    """The pack is only rewritten once it is larger than this."""
+
+    _RECORD = struct.Struct("<IqqI")
+    _GENERATION_SIZE = 16
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._mm = None
+        # path -> (mtime_ns, size, start of the code, end of the record,
+        # record size)
+        self._index = {}
+        self._end = 0
+        self._stat = None
+        self._generation = None
+
+    @staticmethod
+    def _header():
+        return (
+            XONSH_VERSION.encode()
+            + b"\n"
+            + bytes(PYTHON_VERSION_INFO_BYTES)
+            + b"\npack 2\n"
+        )
+
+    def close(self):
+        """Unmaps the pack."""
+        if self._mm is not None:
+            self._mm.close()
+        self._mm = None
+        self._index = {}
+        self._end = 0
+        self._stat = None
+        self._generation = None
+
+    def load(self):
+        """
+        Maps the pack file if it changed since it was last mapped. Returns
+        ``True`` if a new version of the pack was mapped.
+        """
+        try:
+            st = os.stat(self.filename)
+        except OSError:
+            self.close()
+            return False
+        stat = (st.st_ino, st.st_size, st.st_mtime_ns)
+        if stat == self._stat:
+            return False
+        generation = None
+        if (
+            self._stat is not None
+            and self._stat[0] == st.st_ino
+            and self._stat[1] <= st.st_size
+        ):
+            # records may have been appended, or the inode reused by a new
+            # pack, which has another generation
+            generation = self._generation
+            appended = self._index, self._end
+        self.close()
+        try:
+            with open(self.filename, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+        header = self._header()
+        start = len(header) + self._GENERATION_SIZE
+        if mm[: len(header)] != header or len(mm) < start:
+            # written by another version, it will be rewritten
+            mm.close()
+            return False
+        if mm[len(header) : start] == generation:
+            # only read the appended records
+            index, offset = appended
+        else:
+            generation = mm[len(header) : start]
+            index, offset = {}, start
+        size = len(mm)
+        while offset + self._RECORD.size <= size:
+            length, mtime, fsize, path_len = self._RECORD.unpack_from(mm, offset)
+            start = offset + self._RECORD.size
+            end = start + length
+            if end > size or path_len > length:
+                # the last record was cut short
+                break
+            path = os.fsdecode(mm[start : start + path_len])
+            index[path] = (mtime, fsize, start + path_len, end, end - offset)
+            offset = end
+        self._mm, self._index, self._end, self._stat = mm, index, offset, stat
+        self._generation = generation
+        return True
+
+    def __contains__(self, filename):
+        return os.path.realpath(filename) in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def get(self, filename):
+        """
+        Return the cached code for the script ``filename``, or ``None`` if
+        it isn't in the pack or the script changed since it was cached.
+        """
+        path = os.path.realpath(filename)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if self._mm is None:
+            self.load()
+        while True:
+            entry = self._index.get(path)
+            if entry is not None and entry[:2] == (st.st_mtime_ns, st.st_size):
+                _, _, start, end, _ = entry
+                try:
+                    with memoryview(self._mm)[start:end] as view:
+                        return marshal.loads(view)
+                except Exception:
+                    return None
+            # another shell may have added the script since the pack was mapped
+            if not self.load():
+                return None
+
+    def _record(self, path, mtime, size, data):
+        path = os.fsencode(path)
+        header = self._RECORD.pack(len(path) + len(data), mtime, size, len(path))
+        return header + path + data
+
+    def update(self, filename, ccode):
+        """
+        Add the compiled code ``ccode`` of the script ``filename`` to the
+        pack.
+        """
+        path = os.path.realpath(filename)
+        try:
+            st = os.stat(path)
+            record = self._record(
+                path, st.st_mtime_ns, st.st_size, marshal.dumps(ccode)
+            )
+            os.makedirs(os.path.dirname(self.filename), exist_ok=True)
+        except (OSError, ValueError):
+            return
+        self.load()
+        size = self._end + len(record)
+        live = len(record) + sum(
+            entry[4] for other, entry in self._index.items() if other != path
+        )
+        try:
+            if (
+                self._mm is None
+                # records appended after a cut short one could not be read
+                or len(self._mm) != self._end
+                or (size > self.COMPACT_SIZE and size > 2 * live)
+            ):
+                self._rewrite(path, record)
+            else:
+                fd = os.open(self.filename, os.O_WRONLY | os.O_APPEND)
+                try:
+                    view = memoryview(record)
+                    while view:
+                        # writes may be cut short, e.g. by a signal
+                        view = view[os.write(fd, view) :]
+                finally:
+                    os.close(fd)
+        except OSError:
+            if XSH.env.get("XONSH_DEBUG"):
+                print_warning(
+                    f"ScriptCachePack: could not write {self.filename}\n"
+                    "Set $XONSH_CACHE_SCRIPTS_PACK=0 to use one cache file per script."
+                )
+
+    def _rewrite(self, path, record):
+        """Writes a new pack with the last record of every script that still
+        exists, and ``record`` for the script ``path``.
+        """
+        records = [
+            self._mm[end - size : end]
+            for other, (_, _, _, end, size) in self._index.items()
+            if other != path and os.path.exists(other)
+        ]
+        records.append(record)
+        # release the old mapping, it can't be replaced while mapped on Windows
+        self.close()
+        tmpfname = f"{self.filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmpfname, "wb") as f:
+                f.write(self._header())
+                f.write(os.urandom(self._GENERATION_SIZE))
+                f.writelines(records)
+            os.replace(tmpfname, self.filename)
+        except OSError:
+            try:
+                os.remove(tmpfname)
+            except OSError:
+                pass
+            raise
+
+
+def should_use_script_pack():
+    """
+    Return ``True`` if scripts are cached in a single pack file
+    (``$XONSH_CACHE_SCRIPTS_PACK``) rather than in one file per script.
+    """
+    return bool(XSH.env.get("XONSH_CACHE_SCRIPTS_PACK"))
+
+
+_SCRIPT_PACKS: dict[str, ScriptCachePack] = {}
+
+
+def get_script_pack():
+    """
+    Return the script cache pack of the current ``$XONSH_DATA_DIR``.
+    """
+    fname = os.path.join(
+        XSH.env["XONSH_DATA_DIR"], "xonsh_script_cache", "scripts.pack"
+    )
+    pack = _SCRIPT_PACKS.get(fname)
+    if pack is None:
+        pack = _SCRIPT_PACKS[fname] = ScriptCachePack(fname)
+    return pack
+
+
+def load_script_cache(filename):
+    """
+    Return the cached code for the script ``filename``, from the pack file
+    or from the per script cache, or ``None`` if there is no valid entry.
+    """
+    if should_use_script_pack():
+        return get_script_pack().get(filename)
+    cachefname = get_cache_filename(filename, code=False)
+    run_cached, ccode = script_cache_check(filename, cachefname)
+    return ccode if run_cached else None
+
+
+def update_script_cache(ccode, filename):
+    """
+    Store the compiled code ``ccode`` of the script ``filename`` in the pack
+    file or in the per script cache.
+    """
+    if should_use_script_pack():
+        get_script_pack().update(filename, ccode)
+    else:
+        update_cache(ccode, get_cache_filename(filename, code=False))
+
+
 def run_script_with_cache(filename, execer, glb=None, loc=None, mode="exec"):
     """
     Run a script, using a cached version if it exists (and the source has not
     changed), and updating the cache as necessary.
     See run_compiled_code for the return value.
     """
-    run_cached = False
+    ccode = None
     use_cache = should_use_cache(execer, mode)
-    cachefname = get_cache_filename(filename, code=False)
     if use_cache:
-        run_cached, ccode = script_cache_check(filename, cachefname)
-    if not run_cached:
+        ccode = load_script_cache(filename)
+    if ccode is None:
         with open(filename, encoding="utf-8") as f:
             code = f.read()
         ccode = compile_code(filename, code, execer, glb, loc, mode)
         if use_cache:
-            update_cache(ccode, cachefname)
+            update_script_cache(ccode, filename)
     return run_compiled_code(ccode, glb, loc, mode)
 
 
+def script_compile_names(glb):
+    """
+    Return the user names a script is compiled with by
+    ``run_script_with_cache``, i.e. the names of ``glb`` and the locals of
+    ``run_script_with_cache`` itself, which the execer picks up from the
+    calling frame.
+    """
+    return set(glb) | set(run_script_with_cache.__code__.co_varnames)
+
+
+def _precompile_init():
+    from xonsh.execer import Execer
+
+    XSH.execer = Execer()
+
+
+def _precompile_script(filename):
+    with open(filename, encoding="utf-8") as f:
+        code = f.read()
+    glb = {"__file__": filename, "__name__": os.path.abspath(filename)}
+    loc = dict.fromkeys(run_script_with_cache.__code__.co_varnames)
+    execer = XSH.execer
+    ccode = compile_code(filename, code, execer, glb, loc, "exec")
+    if ccode is None:
+        return None
+    transformer = execer.ctxtransformer
+    return (
+        marshal.dumps(ccode),
+        dict(transformer.ctx_lookups),
+        dict(transformer.user_lookups),
+    )
+
+
+class ScriptPrecompiler:
+    """
+    Compiles xonsh scripts in a pool of worker processes, ahead of running
+    them one after the other in the current process.
+
+    A worker compiles a script without the context the earlier scripts
+    leave behind, so the compiled code is only handed out if the context
+    aware transform would have made the same decisions in the actual
+    context, see ``get``.
+    """
+
+    def __init__(self, filenames, max_workers=None):
+        import concurrent.futures
+        import multiprocessing
+
+        if max_workers is None:
+            max_workers = min(len(filenames), os.cpu_count() or 1)
+        self.pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_precompile_init,
+        )
+        self.futures = {
+            fn: self.pool.submit(_precompile_script, fn) for fn in filenames
+        }
+
+    @classmethod
+    def start(cls, filenames, execer):
+        """
+        Start compiling the xonsh scripts in ``filenames`` that need it,
+        except for the first one, which is run before any worker is ready.
+        Return ``None`` if there is nothing to compile.
+        """
+        use_cache = should_use_cache(execer, "exec")
+        todo = [
+            fn
+            for fn in filenames[1:]
+            if not fn.endswith(".py")
+            and not (use_cache and load_script_cache(fn) is not None)
+        ]
+        if not todo:
+            return None
+        try:
+            return cls(todo)
+        except Exception as e:
+            print_warning(f"could not start compiling scripts in parallel: {e}")
+            return None
+
+    def get(self, filename, glb):
+        """
+        Return the compiled code of ``filename`` if it is valid when run in
+        ``glb``, or ``None`` if the script should be compiled as usual.
+        Scripts whose compilation has not started yet are not waited for.
+        """
+        future = self.futures.pop(filename, None)
+        if future is None or future.cancel():
+            return None
+        try:
+            result = future.result()
+        except Exception:
+            # compile errors are reported by the regular code path
+            return None
+        if result is None:
+            return None
+        data, ctx_lookups, user_lookups = result
+        user_names = script_compile_names(glb)
+        ctx = set(dir(builtins)) | user_names
+        if not lookups_match(ctx_lookups, user_lookups, ctx, user_names):
+            return None
+        return marshal.loads(data)
+
+    def close(self):
+        """Stop the workers, dropping the scripts that were not asked for."""
+        self.futures.clear()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+def run_precompiled_script(filename, precompiler, execer, glb):
+    """
+    Run a script with the code compiled by ``precompiler``, falling back on
+    ``run_script_with_cache``. See run_compiled_code for the return value.
+    """
+    ccode = precompiler.get(filename, glb) if precompiler is not None else None
+    if ccode is None:
+        return run_script_with_cache(filename, execer, glb)
+    if should_use_cache(execer, "exec"):
+        update_script_cache(ccode, filename)
+    return run_compiled_code(ccode, glb, None, "exec")
+
+
 def code_cache_name(code):
     """
     Return an appropriate spoofed filename for the given code.
@@ -220,6 +751,7 @@ def code_cache_check(cachefname):
                 # Ignore it — the code will be recompiled and cached again.
                 return False, None
             run_cached = True
+        _touch(cachefname)
     return run_cached, ccode
 
 
@@ -240,5 +772,122 @@ def run_code_with_cache(
     if not run_cached:
         ccode = compile_code(display_filename, code, execer, glb, loc, mode)
         if use_cache:
-            update_cache(ccode, cachefname)
+            update_code_cache(ccode, cachefname)
     return run_compiled_code(ccode, glb, loc, mode)
+
+
+TRANSFORM_CACHE_MIN_SIZE = 128
+"""Code shorter than this is transformed again rather than looked up on
+disk: a miss costs a file write, which is more than transforming a line or
+two."""
+
+
+def should_use_transform_cache(mode, code):
+    """
+    Return ``True`` if the context-aware transform of ``code`` parsed in
+    this mode may be cached (``$XONSH_CACHE_TRANSFORMS``). Only scripts and
+    other ``exec`` code of at least ``TRANSFORM_CACHE_MIN_SIZE`` characters
+    are cached.
+    """
+    if mode != "exec" or len(code) < TRANSFORM_CACHE_MIN_SIZE:
+        return False
+    env = XSH.env
+    if env is None or not env.get("XONSH_CACHE_TRANSFORMS"):
+        return False
+    # with $XONSH_BUILTINS_TO_CMD the transform also depends on the aliases
+    # and on the commands found on $PATH, which are not part of the key
+    return not env.get("XONSH_BUILTINS_TO_CMD")
+
+
+def transform_cache_key(code, mode, parser=None):
+    """
+    Return the content hash under which the transformed AST of ``code`` is
+    cached. The trees of different parser backends and grammar versions
+    are kept apart, see :func:`xonsh.parser.parser_version`.
+    """
+    return code_cache_name(f"{mode}\0{parser_version(parser)}\0{code}")
+
+
+def get_transform_cache_filename(key):
+    """
+    Return the filename of the transform cache for the given content hash.
+    """
+    cachedir = os.path.join(XSH.env["XONSH_CACHE_DIR"], "xonsh_transform_cache")
+    return os.path.join(cachedir, key[:2], key)
+
+
+def _load_transform_variants(cachefname):
+    try:
+        with open(cachefname, "rb") as cfile:
+            if not _check_cache_versions(cfile):
+                return []
+            return pickle.load(cfile)
+    except Exception:
+        # missing or corrupted, it will be written again
+        return []
+
+
+def lookups_match(ctx_lookups, user_lookups, ctx, user_names):
+    """
+    Return ``True`` if every name lookup recorded by the context aware
+    transform has the same outcome in ``ctx`` and ``user_names``.
+    """
+    user_names = user_names or set()
+    if not all((name in ctx) == found for name, found in ctx_lookups.items()):
+        return False
+    return all((name in user_names) == found for name, found in user_lookups.items())
+
+
+def transform_cache_check(key, ctx, user_names):
+    """
+    Return the cached transformed AST for the code hashed as ``key``, if
+    one was recorded with the same outcome for every name lookup the
+    transform made in the context, i.e. whether each name was in ``ctx``
+    (and in ``user_names``). Return ``None`` if there is no such entry.
+    """
+    variants = _load_transform_variants(get_transform_cache_filename(key))
+    for ctx_lookups, user_lookups, tree in variants:
+        if lookups_match(ctx_lookups, user_lookups, ctx, user_names):
+            try:
+                tree = pickle.loads(tree)
+            except Exception:
+                return None
+            _touch(get_transform_cache_filename(key))
+            return tree
+    return None
+
+
+def update_transform_cache(key, ctx_lookups, user_lookups, tree, max_variants=8):
+    """
+    Add the transformed AST of the code hashed as ``key``, along with the
+    name lookups the transform depended on, to the transform cache. At most
+    ``max_variants`` differently transformed versions of the same code are
+    kept, the most recent first.
+    """
+    cachefname = get_transform_cache_filename(key)
+    try:
+        data = pickle.dumps(tree)
+        os.makedirs(os.path.dirname(cachefname), exist_ok=True)
+    except Exception:
+        return
+    variants = _load_transform_variants(cachefname)
+    variants.insert(0, (dict(ctx_lookups), dict(user_lookups), data))
+    del variants[max_variants:]
+    tmpfname = f"{cachefname}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmpfname, "wb") as cfile:
+            cfile.write(XONSH_VERSION.encode() + b"\n")
+            cfile.write(bytes(PYTHON_VERSION_INFO_BYTES) + b"\n")
+            pickle.dump(variants, cfile)
+        os.replace(tmpfname, cachefname)
+        prune_cache_shard(os.path.dirname(cachefname))
+    except OSError:
+        if XSH.env.get("XONSH_DEBUG"):
+            print_warning(
+                f"update_transform_cache: could not write {cachefname}\n"
+                "Set $XONSH_CACHE_TRANSFORMS=0 to disable the transform cache."
+            )
+        try:
+            os.remove(tmpfname)
+        except OSError:
+            pass
@@ -8,12 +8,11 @@ True) or must be run the foreground (returns False).
 
 import argparse
 import collections.abc as cabc
+import mmap
 import os
-
-try:
-    import ujson as json
-except ImportError:
-    import json  # type: ignore
+import struct
+import sys
+import threading
 import time
 import typing as tp
 from pathlib import Path
@@ -21,9 +20,9 @@ from pathlib import Path
 from xonsh.lib.lazyasd import lazyobject
 from xonsh.platform import ON_POSIX, ON_WINDOWS, pathbasename
 from xonsh.procs.executables import (
+    EXECUTABLE_CACHE,
     get_paths,
     get_possible_names,
-    is_executable_in_posix,
     is_executable_in_windows,
 )
 
@@ -84,18 +83,23 @@ class _Commands(tp.NamedTuple):
 
 def _yield_accessible_unix_file_names(path):
     """yield file names of executable files in path."""
-    if not os.path.exists(path):
-        return
-    for file_ in os.scandir(path):
-        if is_executable_in_posix(file_):
-            yield file_.name
+    with os.scandir(path) as entries:
+        for entry in entries:
+            try:
+                # the file type comes with the entry, so only symlinks and
+                # file systems without d_type need a stat
+                if entry.is_file() and os.access(entry.path, os.X_OK):
+                    yield entry.name
+            except OSError:
+                # broken symlinks are neither dirs nor files
+                pass
 
 
 def _executables_in_posix(path):
-    if not os.path.exists(path):
-        return
-    else:
+    try:
         yield from _yield_accessible_unix_file_names(path)
+    except FileNotFoundError:
+        return
 
 
 def _executables_in_windows(path):
@@ -112,6 +116,48 @@ def _executables_in_windows(path):
         return
 
 
+MAX_SCAN_WORKERS = 8
+"""The most directories that :func:`scan_paths` lists at the same time."""
+
+
+def scan_paths(paths, max_workers=MAX_SCAN_WORKERS):
+    """Lists the commands in each of the directories ``paths``, in threads
+    when there are several, since the time goes into waiting for the file
+    system (e.g. NFS home directories or many Nix store paths). Returns a
+    dict of each directory to the sorted tuple of its commands.
+    """
+    paths = list(paths)
+    workers = min(max_workers, len(paths))
+    if workers <= 1:
+        return {path: tuple(sorted(executables_in(path))) for path in paths}
+    import concurrent.futures
+
+    with concurrent.futures.ThreadPoolExecutor(
+        workers, thread_name_prefix="xonsh-scan-paths"
+    ) as pool:
+        listings = pool.map(lambda path: tuple(sorted(executables_in(path))), paths)
+        return dict(zip(paths, listings, strict=True))
+
+
+_PRELOADED_PATHS: "dict[str, _Commands]" = {}
+"""Commands listed ahead of time by :func:`preload_paths`."""
+
+
+def preload_paths(paths):
+    """Lists the commands in ``paths`` for the caches created afterwards,
+    e.g. in the workers forked by ``xonsh --daemon``. The listing is still
+    refreshed when the mtime of a directory changes.
+    """
+    mtimes = {}
+    for path in paths:
+        try:
+            mtimes[path] = os.path.getmtime(path)
+        except OSError:
+            continue
+    for path, cmds in scan_paths(mtimes).items():
+        _PRELOADED_PATHS[path] = _Commands(mtimes[path], cmds)
+
+
 def executables_in(path) -> tp.Iterable[str]:
     """Returns a generator of files in path that the user could execute."""
     if ON_WINDOWS:
@@ -124,6 +170,149 @@ def executables_in(path) -> tp.Iterable[str]:
         return
 
 
+class CommandsCacheFile:
+    """
+    The commands of the $PATH directories, saved between sessions when
+    ``$COMMANDS_CACHE_SAVE_INTERMEDIATE`` is set.
+
+    The file starts with a version line, followed by one record per listing
+    of a directory: the size of the rest of the record, the mtime of the
+    directory and the length of its path, then the path and the sorted
+    names of its commands separated by null bytes. A directory that changes
+    gets a new record appended, and its last record wins, so that the
+    other directories are not written again. The file is rewritten without
+    the outdated records once they make up most of it.
+
+    The file is memory-mapped and loading it only reads the record headers
+    and paths. The names of a directory are decoded when it is looked up.
+    """
+
+    MAGIC = b"xonsh commands cache 1\n"
+    COMPACT_SIZE = 64 * 1024
+    """The file is only rewritten once it is larger than this."""
+
+    _RECORD = struct.Struct("<IdI")
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._mm = None
+        # path -> (mtime, start of the names, end of the record, record size)
+        self._index: dict[str, tuple[float, int, int, int]] = {}
+        self._size = 0
+
+    def close(self):
+        """Unmaps the file."""
+        if self._mm is not None:
+            self._mm.close()
+        self._mm = None
+        self._index = {}
+        self._size = 0
+
+    def load(self):
+        """Maps the file and reads the index of its records."""
+        self.close()
+        try:
+            with open(self.filename, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # missing or empty
+            return
+        if mm[: len(self.MAGIC)] != self.MAGIC:
+            # written by another version, it will be rewritten
+            mm.close()
+            return
+        index = {}
+        offset = len(self.MAGIC)
+        size = len(mm)
+        while offset + self._RECORD.size <= size:
+            length, mtime, path_len = self._RECORD.unpack_from(mm, offset)
+            start = offset + self._RECORD.size
+            end = start + length
+            if end > size or path_len > length:
+                # the last record was cut short
+                break
+            path = os.fsdecode(mm[start : start + path_len])
+            index[path] = (mtime, start + path_len, end, end - offset)
+            offset = end
+        self._mm, self._index, self._size = mm, index, offset
+
+    def __contains__(self, path):
+        return path in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def get(self, path):
+        """Returns the saved commands of the directory ``path``, or None."""
+        entry = self._index.get(path)
+        if entry is None:
+            return None
+        mtime, start, end, _ = entry
+        names = self._mm[start:end]
+        if not names:
+            return _Commands(mtime, ())
+        names = names.decode(
+            sys.getfilesystemencoding(), sys.getfilesystemencodeerrors()
+        )
+        return _Commands(mtime, tuple(names.split("\0")))
+
+    def _record(self, path, commands):
+        path = os.fsencode(path)
+        names = b"\0".join(map(os.fsencode, commands.cmds))
+        header = self._RECORD.pack(len(path) + len(names), commands.mtime, len(path))
+        return header + path + names
+
+    def update(self, listings):
+        """Saves the ``listings``, a dict of directories to their
+        :class:`_Commands`, whose names must be sorted.
+        """
+        records = b"".join(self._record(*item) for item in listings.items())
+        size = self._size + len(records)
+        live = len(records) + sum(
+            entry[3] for path, entry in self._index.items() if path not in listings
+        )
+        try:
+            os.makedirs(os.path.dirname(self.filename), exist_ok=True)
+            if (
+                self._mm is None
+                # appended after a cut short record, it could not be read
+                or len(self._mm) != self._size
+                or (size > self.COMPACT_SIZE and size > 2 * live)
+            ):
+                self._rewrite(listings)
+            else:
+                fd = os.open(self.filename, os.O_WRONLY | os.O_APPEND)
+                try:
+                    os.write(fd, records)
+                finally:
+                    os.close(fd)
+        except OSError:
+            return
+        self.load()
+
+    def _rewrite(self, listings):
+        records = [
+            self._mm[end - size : end]
+            for path, (_, _, end, size) in self._index.items()
+            if path not in listings and os.path.isdir(path)
+        ]
+        records.extend(self._record(*item) for item in listings.items())
+        # release the old mapping, it can't be replaced while mapped on Windows
+        self.close()
+        tmpfname = f"{self.filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmpfname, "wb") as f:
+                f.write(self.MAGIC)
+                f.writelines(records)
+            os.replace(tmpfname, self.filename)
+        except OSError:
+            try:
+                os.remove(tmpfname)
+            except OSError:
+                pass
+            raise
+
+
 class CommandsCache(cabc.Mapping):
     """A lazy cache representing the commands available on the file system.
     The keys are the command names and the values a tuple of (loc, has_alias)
@@ -136,16 +325,17 @@ class CommandsCache(cabc.Mapping):
     where you just need to locate executable command.
     """
 
-    CACHE_FILE = "path-commands-cache.json"
+    CACHE_FILE = "path-commands-cache.bin"
 
     def __init__(self, env, aliases=None) -> None:
         # cache commands in path by mtime
         self._paths_cache: dict[str, _Commands] = {}
+        self._listed_paths: tp.Sequence[str] = ()
 
         # wrap aliases and commands in one place
         self._cmds_cache: dict[str, tuple[str, bool | None]] = {}
 
-        self._alias_checksum: int | None = None
+        self._alias_checksum: tuple | int | None = None
         self.threadable_predictors = default_threadable_predictors()
 
         # Path to the cache-file where all commands/aliases are cached for pre-loading"""
@@ -157,6 +347,13 @@ class CommandsCache(cabc.Mapping):
         else:
             self.aliases = aliases
         self._cache_file = None
+        self._saved: CommandsCacheFile | bool | None = None
+
+        # watches the directories of $PATH, see $XONSH_COMMANDS_CACHE_WATCH
+        self._watcher = None
+        self._watched_path_key: tuple | None = None
+        self._watched_paths: tuple[str, ...] = ()
+        self._watched_parents: set[str] = set()
 
     @property
     def cache_file(self):
@@ -174,6 +371,18 @@ class CommandsCache(cabc.Mapping):
 
         return self._cache_file
 
+    def _saved_listings(self):
+        """Returns the :class:`CommandsCacheFile` of :attr:`cache_file`, or
+        None if the commands are not saved.
+        """
+        if self._saved is None:
+            if self.cache_file:
+                self._saved = CommandsCacheFile(str(self.cache_file))
+                self._saved.load()
+            else:
+                self._saved = False
+        return None if self._saved is False else self._saved
+
     def __contains__(self, key):
         self.update_cache()
         return self.lazyin(key)
@@ -203,7 +412,12 @@ class CommandsCache(cabc.Mapping):
     def _update_aliases_cache(self):
         """Update aliases checksum and return result: updated or not."""
         prev_hash = self._alias_checksum
-        self._alias_checksum = hash(frozenset(self.aliases))
+        generation = getattr(self.aliases, "generation", None)
+        if generation is None:
+            # a plain mapping
+            self._alias_checksum = hash(frozenset(self.aliases))
+        else:
+            self._alias_checksum = ("generation", generation)
         return prev_hash != self._alias_checksum
 
     def _update_and_check_changes(self, paths: tuple[str, ...]):
@@ -248,10 +462,9 @@ class CommandsCache(cabc.Mapping):
         Usage ``executables`` is preferred instead of commands_cache for cases
         where you just need to locate executable command.
         """
-        env = self.env
         # iterate backwards so that entries at the front of PATH overwrite
         # entries at the back.
-        paths = get_paths(env)
+        paths = self._get_paths()
         if self._update_and_check_changes(paths):
             all_cmds = CacheDict()
             for cmd, path in self._iter_binaries(paths):
@@ -276,21 +489,108 @@ class CommandsCache(cabc.Mapping):
             self._cmds_cache = all_cmds
         return self._cmds_cache
 
-    def _update_paths_cache(self, paths: tp.Sequence[str]) -> bool:
-        """load cached results or update cache"""
-        if (not self._paths_cache) and self.cache_file and self.cache_file.exists():
-            # first time load the commands from cache-file if configured
+    def _get_watcher(self):
+        """Returns the watcher of the $PATH directories, or None to poll their
+        mtime instead.
+        """
+        env = self.env
+        enabled = env.get("XONSH_COMMANDS_CACHE_WATCH") and env.get(
+            "ENABLE_COMMANDS_CACHE", True
+        )
+        watcher = self._watcher
+        if not enabled:
+            if watcher:
+                watcher.close()
+                self._watcher = None
+                if EXECUTABLE_CACHE.watcher is watcher:
+                    EXECUTABLE_CACHE.watcher = None
+            return None
+        if watcher is None or (watcher and watcher.pid != os.getpid()):
+            from xonsh.platforms import inotify
+
+            if watcher:
+                # inherited from the parent process, closes its descriptors
+                watcher.close()
+
             try:
-                raw = json.loads(self.cache_file.read_text()) or {}
-                self._paths_cache = {
-                    k: _Commands(v[0], tuple(v[1])) for k, v in raw.items()
-                }
-            except Exception:
-                # the file is corrupt
-                self.cache_file.unlink(missing_ok=True)
+                watcher = inotify.DirWatcher() if inotify.available() else False
+            except OSError:
+                # e.g. out of inotify instances
+                watcher = False
+            self._watcher = watcher
+            self._watched_path_key = None
+            # lets the resolution of executables skip its stats too
+            EXECUTABLE_CACHE.watcher = watcher or None
+        return watcher or None
+
+    def _get_paths(self):
+        """Returns the directories of $PATH. When they are watched, they are
+        only looked up again when $PATH changes or when one of them, the
+        parent of a missing one, or a symbolic link they resolve through,
+        changes.
+        """
+        env = self.env
+        watcher = self._get_watcher()
+        if watcher is None:
+            return get_paths(env)
+        key = tuple(env.get("PATH") or ())
+        if key == self._watched_path_key and not any(
+            path in self._watched_parents or not watcher.watching(path)
+            for path in tuple(watcher.changed)
+        ):
+            return self._watched_paths
+        paths = get_paths(env)
+        parents = set()
+        linked = set()
+        for entry in key:
+            if not os.path.isdir(entry):
+                parent = os.path.dirname(os.path.abspath(entry))
+                if os.path.isdir(parent):
+                    parents.add(parent)
+            if os.path.realpath(entry) != os.path.abspath(entry):
+                # the paths are resolved, the links would not be watched
+                linked.add(entry)
+        for path in watcher.watched() - set(paths) - parents - linked:
+            watcher.unwatch(path)
+        for parent in parents:
+            watcher.watch(parent)
+        for entry in linked:
+            watcher.watch_links(entry)
+        parents |= linked
+        self._watched_path_key = key
+        self._watched_paths = paths
+        self._watched_parents = parents
+        return paths
 
-        updated = False
+    def _update_paths_cache(self, paths: tp.Sequence[str]) -> bool:
+        """load cached results or update cache"""
+        if not self._paths_cache:
+            self._paths_cache = dict(_PRELOADED_PATHS)
+        saved = self._saved_listings()
+        to_list = {}
+        listed = {}
+
+        watcher = self._get_watcher()
+        changed = watcher.pop_changed() if watcher is not None else set()
+        # directories removed from $PATH, or that no longer exist
+        updated = paths != self._listed_paths
+        self._listed_paths = paths
         for path in paths:
+            if saved is not None and path not in self._paths_cache:
+                # the first lookup of the directory in this session
+                commands = saved.get(path)
+                if commands is not None:
+                    self._paths_cache[path] = commands
+            if watcher is not None:
+                if (
+                    path in self._paths_cache
+                    and path not in changed
+                    and watcher.watching(path)
+                ):
+                    # unchanged since it was listed
+                    continue
+                # before listing it, so that no change is missed
+                watcher.watch(path)
             try:
                 modified_time = os.path.getmtime(path)
             except OSError:
@@ -298,16 +598,23 @@ class CommandsCache(cabc.Mapping):
             if (
                 (not self.env.get("ENABLE_COMMANDS_CACHE", True))
                 or (path not in self._paths_cache)
+                or (path in changed)
                 or (self._paths_cache[path].mtime != modified_time)
             ):
                 updated = True
-                self._paths_cache[path] = _Commands(
-                    modified_time, tuple(executables_in(path))
-                )
-
-        if updated and self.cache_file:
-            raw = {k: [v.mtime, list(v.cmds)] for k, v in self._paths_cache.items()}
-            self.cache_file.write_text(json.dumps(raw))
+                to_list[path] = modified_time
+
+        for path, cmds in scan_paths(to_list).items():
+            commands = _Commands(to_list[path], cmds)
+            if commands != self._paths_cache.get(path):
+                listed[path] = commands
+            self._paths_cache[path] = commands
+
+        if listed and saved is not None:
+            saved.update(listed)
+        if updated or changed:
+            # the changes that the watcher reported are gone once popped
+            EXECUTABLE_CACHE.invalidate()
         return updated
 
     def _iter_binaries(self, paths):
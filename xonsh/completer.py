@@ -1,6 +1,7 @@
 """A (tab-)completer for xonsh."""
 
 import collections.abc as cabc
+import functools
 import os
 import sys
 import typing as tp
@@ -59,8 +60,12 @@ completer is still allowed to run).
 class Completer:
     """This provides a list of optional completions for the xonsh shell."""
 
-    def __init__(self):
-        self.context_parser = CompletionContextParser()
+    @functools.cached_property
+    def context_parser(self):
+        """The completion context parser, its yacc tables are only loaded when
+        the first completion is requested.
+        """
+        return CompletionContextParser()
 
     def parse(
         self, text: str, cursor_index: "None|int" = None, ctx=None
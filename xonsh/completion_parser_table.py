@@ -0,0 +1,71 @@
+
+# completion_parser_table.py
+# This file is automatically generated. Do not edit.
+# pylint: disable=W,C,R
+_tabversion = '3.10'
+
+_lr_method = 'LALR'
+
+_lr_signature = 'AND ANY ATBANG_LPAREN ATDOLLAR_LPAREN AT_LPAREN BANG_LBRACKET BANG_LPAREN DOLLAR_LBRACKET DOLLAR_LPAREN GT IOREDIRECT1 IOREDIRECT2 LT NEWLINE OR PIPE RBRACKET RPAREN RSHIFT SEMI STRINGcontext : command\n        | commands\n        command : args\n        |\n        commands : commandcommands : commands NEWLINE command\n\t| commands AND command\n\t| commands OR command\n\t| commands PIPE command\n\t| commands SEMI commandsub_expression : DOLLAR_LPAREN commands RPAREN\n\t| BANG_LPAREN commands RPAREN\n\t| ATDOLLAR_LPAREN commands RPAREN\n\t| DOLLAR_LBRACKET commands RBRACKET\n\t| BANG_LBRACKET commands RBRACKET\n\t| AT_LPAREN commands RPAREN\n\t| ATBANG_LPAREN commands RPAREN\n        | DOLLAR_LPAREN commands\n\t| BANG_LPAREN commands\n\t| ATDOLLAR_LPAREN commands\n\t| DOLLAR_LBRACKET commands\n\t| BANG_LBRACKET commands\n\t| AT_LPAREN commands\n\t| ATBANG_LPAREN commands\n    arg : sub_expressionarg : AT_LPAREN\n\t| STRING\n\t| ANY\n\t| BANG_LBRACKET\n\t| DOLLAR_LBRACKET\n\t| DOLLAR_LPAREN\n\t| ATBANG_LPAREN\n\t| ATDOLLAR_LPAREN\n\t| LT\n\t| RSHIFT\n\t| BANG_LPAREN\n\t| IOREDIRECT2\n\t| GT\n\t| IOREDIRECT1args : argargs : args arg'
+    
+_lr_action_items = {'$end':([0,1,2,3,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,45,46,],[-4,0,-1,-2,-3,-40,-25,-4,-27,-28,-4,-4,-4,-4,-4,-34,-35,-4,-37,-38,-39,-4,-4,-4,-4,-4,-41,-23,-5,-22,-21,-18,-24,-20,-19,-6,-7,-8,-9,-10,-16,-15,-14,-11,-17,-13,-12,]),'NEWLINE':([0,2,3,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,45,46,],[-4,-5,21,-3,-40,-25,-4,-27,-28,-4,-4,-4,-4,-4,-34,-35,-4,-37,-38,-39,-4,-4,-4,-4,-4,-41,21,-5,21,21,21,21,21,21,-6,-7,-8,-9,-10,-16,-15,-14,-11,-17,-13,-12,]),'AND':([0,2,3,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,45,46,],[-4,-5,22,-3,-40,-25,-4,-27,-28,-4,-4,-4,-4,-4,-34,-35,-4,-37,-38,-39,-4,-4,-4,-4,-4,-41,22,-5,22,22,22,22,22,22,-6,-7,-8,-9,-10,-16,-15,-14,-11,-17,-13,-12,]),'OR':([0,2,3,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,45,46,],[-4,-5,23,-3,-40,-25,-4,-27,-28,-4,-4,-4,-4,-4,-34,-35,-4,-37,-38,-39,-4,-4,-4,-4,-4,-41,23,-5,23,23,23,23,23,23,-6,-7,-8,-9,-10,-16,-15,-14,-11,-17,-13,-12,]),'PIPE':([0,2,3,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,45,46,],[-4,-5,24,-3,-40,-25,-4,-27,-28,-4,-4,-4,-4,-4,-34,-35,-4,-37,-38,-39,-4,-4,-4,-4,-4,-41,24,-5,24,24,24,24,24,24,-6,-7,-8,-9,-10,-16,-15,-14,-11,-17,-13,-12,]),'SEMI':([0,2,3,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,45,46,],[-4,-5,25,-3,-40,-25,-4,-27,-28,-4,-4,-4,-4,-4,-34,-35,-4,-37,-38,-39,-4,-4,-4,-4,-4,-41,25,-5,25,25,25,25,25,25,-6,-7,-8,-9,-10,-16,-15,-14,-11,-17,-13,-12,]),'AT_LPAREN':([0,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,45,46,],[7,7,-40,-25,7,-27,-28,7,7,7,7,7,-34,-35,7,-37,-38,-39,7,7,7,7,7,-41,-23,-5,-22,-21,-18,-24,-20,-19,-6,-7,-8,-9,-10,-16,-15,-14,-11,-17,-13,-12,]),'STRING':([0,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,45,46,],[8,8,-40,-25,8,-27,-28,8,8,8,8,8,-34,-35,8,-37,-38,-39,8,8,8,8,8,-41,-23,-5,-22,-21,-18,-24,-20,-19,-6,-7,-8,-9,-10,-16,-15,-14,-11,-17,-13,-12,]),'ANY':([0,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,45,46,],[9,9,-40,-25,9,-27,-28,9,9,9,9,9,-34,-35,9,-37,-38,-39,9,9,9,9,9,-41,-23,-5,-22,-21,-18,-24,-20,-19,-6,-7,-8,-9,-10,-16,-15,-14,-11,-17,-13,-12,]),'BANG_LBRACKET':([0,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,45,46,],[10,10,-40,-25,10,-27,-28,10,10,10,10,10,-34,-35,10,-37,-38,-39,10,10,10,10,10,-41,-23,-5,-22,-21,-18,-24,-20,-19,-6,-7,-8,-9,-10,-16,-15,-14,-11,-17,-13,-12,]),'DOLLAR_LBRACKET':([0,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,45,46,],[11,11,-40,-25,11,-27,-28,11,11,11,11,11,-34,-35,11,-37,-38,-39,11,11,11,11,11,-41,-23,-5,-22,-21,-18,-24,-20,-19,-6,-7,-8,-9,-10,-16,-15,-14,-11,-17,-13,-12,]),'DOLLAR_LPAREN':([0,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,45,46,],[12,12,-40,-25,12,-27,-28,12,12,12,12,12,-34,-35,12,-37,-38,-39,12,12,12,12,12,-41,-23,-5,-22,-21,-18,-24,-20,-19,-6,-7,-8,-9,-10,-16,-15,-14,-11,-17,-13,-12,]),'ATBANG_LPAREN':([0,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,45,46,],[13,13,-40,-25,13,-27,-28,13,13,13,13,13,-34,-35,13,-37,-38,-39,13,13,13,13,13,-41,-23,-5,-22,-21,-18,-24,-20,-19,-6,-7,-8,-9,-10,-16,-15,-14,-11,-17,-13,-12,]),'ATDOLLAR_LPAREN':([0,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,45,46,],[14,14,-40,-25,14,-27,-28,14,14,14,14,14,-34,-35,14,-37,-38,-39,14,14,14,14,14,-41,-23,-5,-22,-21,-18,-24,-20,-19,-6,-7,-8,-9,-10,-16,-15,-14,-11,-17,-13,-12,]),'LT':([0,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,45,46,],[15,15,-40,-25,15,-27,-28,15,15,15,15,15,-34,-35,15,-37,-38,-39,15,15,15,15,15,-41,-23,-5,-22,-21,-18,-24,-20,-19,-6,-7,-8,-9,-10,-16,-15,-14,-11,-17,-13,-12,]),'RSHIFT':([0,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,45,46,],[16,16,-40,-25,16,-27,-28,16,16,16,16,16,-34,-35,16,-37,-38,-39,16,16,16,16,16,-41,-23,-5,-22,-21,-18,-24,-20,-19,-6,-7,-8,-9,-10,-16,-15,-14,-11,-17,-13,-12,]),'BANG_LPAREN':([0,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,45,46,],[17,17,-40,-25,17,-27,-28,17,17,17,17,17,-34,-35,17,-37,-38,-39,17,17,17,17,17,-41,-23,-5,-22,-21,-18,-24,-20,-19,-6,-7,-8,-9,-10,-16,-15,-14,-11,-17,-13,-12,]),'IOREDIRECT2':([0,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,45,46,],[18,18,-40,-25,18,-27,-28,18,18,18,18,18,-34,-35,18,-37,-38,-39,18,18,18,18,18,-41,-23,-5,-22,-21,-18,-24,-20,-19,-6,-7,-8,-9,-10,-16,-15,-14,-11,-17,-13,-12,]),'GT':([0,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,45,46,],[19,19,-40,-25,19,-27,-28,19,19,19,19,19,-34,-35,19,-37,-38,-39,19,19,19,19,19,-41,-23,-5,-22,-21,-18,-24,-20,-19,-6,-7,-8,-9,-10,-16,-15,-14,-11,-17,-13,-12,]),'IOREDIRECT1':([0,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,45,46,],[20,20,-40,-25,20,-27,-28,20,20,20,20,20,-34,-35,20,-37,-38,-39,20,20,20,20,20,-41,-23,-5,-22,-21,-18,-24,-20,-19,-6,-7,-8,-9,-10,-16,-15,-14,-11,-17,-13,-12,]),'RPAREN':([4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,45,46,],[-3,-40,-25,-4,-27,-28,-4,-4,-4,-4,-4,-34,-35,-4,-37,-38,-39,-4,-4,-4,-4,-4,-41,40,-5,-22,-21,43,44,45,46,-6,-7,-8,-9,-10,-16,-15,-14,-11,-17,-13,-12,]),'RBRACKET':([4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,45,46,],[-3,-40,-25,-4,-27,-28,-4,-4,-4,-4,-4,-34,-35,-4,-37,-38,-39,-4,-4,-4,-4,-4,-41,-23,-5,41,42,-18,-24,-20,-19,-6,-7,-8,-9,-10,-16,-15,-14,-11,-17,-13,-12,]),}
+
+_lr_action = {}
+for _k, _v in _lr_action_items.items():
+   for _x,_y in zip(_v[0],_v[1]):
+      if not _x in _lr_action:  _lr_action[_x] = {}
+      _lr_action[_x][_k] = _y
+del _lr_action_items
+
+_lr_goto_items = {'context':([0,],[1,]),'command':([0,7,10,11,12,13,14,17,21,22,23,24,25,],[2,28,28,28,28,28,28,28,35,36,37,38,39,]),'commands':([0,7,10,11,12,13,14,17,],[3,27,29,30,31,32,33,34,]),'args':([0,7,10,11,12,13,14,17,21,22,23,24,25,],[4,4,4,4,4,4,4,4,4,4,4,4,4,]),'arg':([0,4,7,10,11,12,13,14,17,21,22,23,24,25,],[5,26,5,5,5,5,5,5,5,5,5,5,5,5,]),'sub_expression':([0,4,7,10,11,12,13,14,17,21,22,23,24,25,],[6,6,6,6,6,6,6,6,6,6,6,6,6,6,]),}
+
+_lr_goto = {}
+for _k, _v in _lr_goto_items.items():
+   for _x, _y in zip(_v[0], _v[1]):
+       if not _x in _lr_goto: _lr_goto[_x] = {}
+       _lr_goto[_x][_k] = _y
+del _lr_goto_items
+_lr_productions = [
+  ("S' -> context","S'",1,None,None,None),
+  ('context -> command','context',1,'p_context_command','completion_context.py',495),
+  ('context -> commands','context',1,'p_context_command','completion_context.py',496),
+  ('command -> args','command',1,'p_command','completion_context.py',536),
+  ('command -> <empty>','command',0,'p_command','completion_context.py',537),
+  ('commands -> command','commands',1,'p_multiple_commands_first','completion_context.py',575),
+  ('commands -> commands NEWLINE command','commands',3,'p_multiple_commands_many','completion_context.py',585),
+  ('commands -> commands AND command','commands',3,'p_multiple_commands_many','completion_context.py',586),
+  ('commands -> commands OR command','commands',3,'p_multiple_commands_many','completion_context.py',587),
+  ('commands -> commands PIPE command','commands',3,'p_multiple_commands_many','completion_context.py',588),
+  ('commands -> commands SEMI command','commands',3,'p_multiple_commands_many','completion_context.py',589),
+  ('sub_expression -> DOLLAR_LPAREN commands RPAREN','sub_expression',3,'p_sub_expression','completion_context.py',618),
+  ('sub_expression -> BANG_LPAREN commands RPAREN','sub_expression',3,'p_sub_expression','completion_context.py',619),
+  ('sub_expression -> ATDOLLAR_LPAREN commands RPAREN','sub_expression',3,'p_sub_expression','completion_context.py',620),
+  ('sub_expression -> DOLLAR_LBRACKET commands RBRACKET','sub_expression',3,'p_sub_expression','completion_context.py',621),
+  ('sub_expression -> BANG_LBRACKET commands RBRACKET','sub_expression',3,'p_sub_expression','completion_context.py',622),
+  ('sub_expression -> AT_LPAREN commands RPAREN','sub_expression',3,'p_sub_expression','completion_context.py',623),
+  ('sub_expression -> ATBANG_LPAREN commands RPAREN','sub_expression',3,'p_sub_expression','completion_context.py',624),
+  ('sub_expression -> DOLLAR_LPAREN commands','sub_expression',2,'p_sub_expression','completion_context.py',625),
+  ('sub_expression -> BANG_LPAREN commands','sub_expression',2,'p_sub_expression','completion_context.py',626),
+  ('sub_expression -> ATDOLLAR_LPAREN commands','sub_expression',2,'p_sub_expression','completion_context.py',627),
+  ('sub_expression -> DOLLAR_LBRACKET commands','sub_expression',2,'p_sub_expression','completion_context.py',628),
+  ('sub_expression -> BANG_LBRACKET commands','sub_expression',2,'p_sub_expression','completion_context.py',629),
+  ('sub_expression -> AT_LPAREN commands','sub_expression',2,'p_sub_expression','completion_context.py',630),
+  ('sub_expression -> ATBANG_LPAREN commands','sub_expression',2,'p_sub_expression','completion_context.py',631),
+  ('arg -> sub_expression','arg',1,'p_sub_expression_arg','completion_context.py',698),
+  ('arg -> AT_LPAREN','arg',1,'p_any_token_arg','completion_context.py',702),
+  ('arg -> STRING','arg',1,'p_any_token_arg','completion_context.py',703),
+  ('arg -> ANY','arg',1,'p_any_token_arg','completion_context.py',704),
+  ('arg -> BANG_LBRACKET','arg',1,'p_any_token_arg','completion_context.py',705),
+  ('arg -> DOLLAR_LBRACKET','arg',1,'p_any_token_arg','completion_context.py',706),
+  ('arg -> DOLLAR_LPAREN','arg',1,'p_any_token_arg','completion_context.py',707),
+  ('arg -> ATBANG_LPAREN','arg',1,'p_any_token_arg','completion_context.py',708),
+  ('arg -> ATDOLLAR_LPAREN','arg',1,'p_any_token_arg','completion_context.py',709),
+  ('arg -> LT','arg',1,'p_any_token_arg','completion_context.py',710),
+  ('arg -> RSHIFT','arg',1,'p_any_token_arg','completion_context.py',711),
+  ('arg -> BANG_LPAREN','arg',1,'p_any_token_arg','completion_context.py',712),
+  ('arg -> IOREDIRECT2','arg',1,'p_any_token_arg','completion_context.py',713),
+  ('arg -> GT','arg',1,'p_any_token_arg','completion_context.py',714),
+  ('arg -> IOREDIRECT1','arg',1,'p_any_token_arg','completion_context.py',715),
+  ('args -> arg','args',1,'p_args_first','completion_context.py',721),
+  ('args -> args arg','args',2,'p_args_many','completion_context.py',726),
+]
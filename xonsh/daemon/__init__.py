@@ -0,0 +1,8 @@
+"""A server of warm xonsh processes for non-interactive runs, and its client.
+
+``xonsh --daemon`` imports xonsh once, then keeps a few forked workers
+waiting on a Unix socket. The client, ``xonsh-client``, sends its
+arguments, working directory, environment and standard streams to a worker,
+which runs them with :func:`xonsh.main.main` and answers with the exit code.
+Every worker runs a single request and exits.
+"""
@@ -0,0 +1,217 @@
+"""The client of ``xonsh --daemon``.
+
+This module only imports the standard library, so that the client starts
+as fast as the interpreter does. When no daemon is running, or for an
+interactive session, the client runs xonsh itself instead.
+
+The client and the daemon only talk to processes of their own user: the
+socket must be in a directory private to the user, and both ends check the
+credentials of the other through ``SO_PEERCRED`` before trusting it.
+"""
+
+import errno
+import json
+import os
+import signal
+import socket
+import stat
+import struct
+import sys
+
+FORWARDED_SIGNALS = ("SIGINT", "SIGTERM", "SIGHUP", "SIGQUIT", "SIGWINCH")
+"""The signals that the client passes on to the process group of its
+worker.
+"""
+
+_HEADER = struct.Struct("!I")
+_CREDENTIALS = struct.Struct("3i")
+
+
+def socket_path():
+    """The path of the socket of the daemon, ``$XONSH_DAEMON_SOCKET`` or a
+    file in a directory private to the user.
+    """
+    path = os.environ.get("XONSH_DAEMON_SOCKET")
+    if path:
+        return path
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime:
+        return os.path.join(runtime, "xonsh", "daemon.sock")
+    return os.path.join("/tmp", f"xonsh-{os.getuid()}", "daemon.sock")
+
+
+def is_supported():
+    """Whether the platform tells the credentials of the peer of a Unix
+    socket, which the client and the daemon need.
+    """
+    return hasattr(socket, "SO_PEERCRED")
+
+
+def check_private_dir(dirname, create=False):
+    """Raises :class:`PermissionError` unless ``dirname`` is a directory,
+    not a symbolic link, owned by the user and only accessible to them.
+    With ``create``, a missing directory is created first.
+    """
+    if create:
+        os.makedirs(dirname, mode=0o700, exist_ok=True)
+    st = os.lstat(dirname)
+    if (
+        not stat.S_ISDIR(st.st_mode)
+        or st.st_uid != os.getuid()
+        or stat.S_IMODE(st.st_mode) != 0o700
+    ):
+        raise PermissionError(
+            errno.EACCES,
+            "not a directory private to the user, with mode 0700",
+            dirname,
+        )
+
+
+def peer_credentials(sock):
+    """Returns the pid, uid and gid of the process at the other end of the
+    Unix socket ``sock``. For the client, this is the process of the daemon
+    that listens on the socket.
+    """
+    data = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, _CREDENTIALS.size)
+    return _CREDENTIALS.unpack(data)
+
+
+def _parent_pid(pid):
+    with open(f"/proc/{pid}/stat", "rb") as f:
+        # the name of the command, in parentheses, may contain spaces
+        return int(f.read().rsplit(b")", 1)[1].split()[1])
+
+
+def is_worker(pid, daemon_pid):
+    """Whether ``pid``, as sent by a daemon, is a worker of the daemon of pid
+    ``daemon_pid`` that leads its own session, so that signaling its process
+    group only reaches the run of the client.
+    """
+    if type(pid) is not int or pid <= 1 or pid == os.getpid():
+        return False
+    try:
+        return os.getsid(pid) == pid and _parent_pid(pid) == daemon_pid
+    except (OSError, ValueError, IndexError):
+        return False
+
+
+def send_request(sock, request, fds):
+    """Sends the ``request`` dict, and passes the file descriptors ``fds``
+    along.
+    """
+    data = json.dumps(request).encode("utf-8", "surrogateescape")
+    socket.send_fds(sock, [_HEADER.pack(len(data))], fds)
+    sock.sendall(data)
+
+
+def recv_request(sock, maxfds=3):
+    """Receives a request sent by :func:`send_request`, returns it along
+    with the file descriptors.
+    """
+    header, fds, _, _ = socket.recv_fds(sock, _HEADER.size, maxfds)
+    (size,) = _HEADER.unpack(_recv_exactly(sock, size=_HEADER.size, data=header))
+    data = _recv_exactly(sock, size)
+    return json.loads(data.decode("utf-8", "surrogateescape")), fds
+
+
+def _recv_exactly(sock, size, data=b""):
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("the connection was closed")
+        data += chunk
+    return data
+
+
+def send_reply(sock, **reply):
+    """Sends a reply, one JSON object per line."""
+    sock.sendall(json.dumps(reply).encode() + b"\n")
+
+
+def iter_replies(sock):
+    """Yields the replies, until the connection is closed."""
+    buf = b""
+    while True:
+        try:
+            chunk = sock.recv(4096)
+        except InterruptedError:
+            continue
+        if not chunk:
+            return
+        buf += chunk
+        *lines, buf = buf.split(b"\n")
+        for line in lines:
+            yield json.loads(line)
+
+
+def run_xonsh(argv):
+    """Replaces the client with a xonsh process."""
+    executable = sys.executable
+    os.execv(executable, [executable, "-m", "xonsh", *argv])
+
+
+def run(argv, path=None):
+    """Runs ``argv`` in a worker of the daemon listening on ``path``, returns
+    the exit code.
+    """
+    if not is_supported():
+        run_xonsh(argv)
+    path = path or socket_path()
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        check_private_dir(os.path.dirname(os.path.abspath(path)))
+        sock.connect(path)
+        daemon_pid, uid, _ = peer_credentials(sock)
+    except OSError:
+        uid = None
+    if uid != os.getuid():
+        # never hand the environment and streams to another user
+        sock.close()
+        run_xonsh(argv)
+    umask = os.umask(0)
+    os.umask(umask)
+    request = {
+        "argv": list(argv),
+        "cwd": os.getcwd(),
+        "env": dict(os.environ),
+        "umask": umask,
+    }
+    with sock:
+        send_request(sock, request, [0, 1, 2])
+        pid = None
+        received = []
+
+        def forward(signum, frame):
+            received.append(signum)
+            if pid is not None:
+                try:
+                    os.killpg(pid, signum)
+                except OSError:
+                    pass
+
+        for name in FORWARDED_SIGNALS:
+            signal.signal(getattr(signal, name), forward)
+        for reply in iter_replies(sock):
+            if "pid" in reply:
+                if not is_worker(reply["pid"], daemon_pid):
+                    continue
+                pid = reply["pid"]
+                for signum in received:
+                    os.killpg(pid, signum)
+            elif "exit" in reply:
+                return reply["exit"]
+            elif reply.get("fallback"):
+                run_xonsh(argv)
+    # the worker died without answering
+    return 128 + received[-1] if received else 1
+
+
+def main(argv=None):
+    """Entry point of ``xonsh-client``."""
+    if argv is None:
+        argv = sys.argv[1:]
+    sys.exit(run(argv))
+
+
+if __name__ == "__main__":
+    main()
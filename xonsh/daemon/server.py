@@ -0,0 +1,284 @@
+"""The server of ``xonsh --daemon``.
+
+The server imports xonsh, loads the parser tables and lists the commands of
+``$PATH`` once, then forks workers that wait for a request on the socket.
+A worker that gets a request signals the server, which forks a new one,
+takes over the standard streams, working directory, environment and umask
+of the client and runs :func:`xonsh.main.main` in a session of its own.
+It answers with the exit code, then exits, so that no state is shared
+between requests.
+"""
+
+import atexit
+import contextlib
+import errno
+import importlib
+import os
+import select
+import signal
+import socket
+import sys
+import threading
+import traceback
+
+from xonsh.daemon.client import (
+    check_private_dir,
+    is_supported,
+    peer_credentials,
+    recv_request,
+    send_reply,
+    socket_path,
+)
+
+WARM_MODULES = (
+    "xonsh.aliases",
+    "xonsh.commands_cache",
+    "xonsh.completer",
+    "xonsh.procs.posix",
+    "xonsh.procs.specs",
+    "xonsh.shells.base_shell",
+    "xonsh.xoreutils.which",
+)
+"""Modules that every session imports, besides those of :mod:`xonsh.main`."""
+
+SUBCOMMANDS = ("format", "check", "lint")
+
+
+def warm_up():
+    """Loads what every xonsh session needs and does not depend on the
+    environment of the client.
+    """
+    from xonsh.commands_cache import preload_paths
+    from xonsh.execer import Execer
+
+    for name in WARM_MODULES:
+        importlib.import_module(name)
+    # loads the parser tables
+    Execer().parse("echo warm | grep warm\n", ctx=None)
+    preload_paths(os.environ.get("PATH", "").split(os.pathsep))
+
+
+def _is_interactive(argv):
+    """Whether ``argv`` starts an interactive session, which needs the
+    terminal of the client.
+    """
+    from xonsh.main import parser
+
+    if argv and argv[0] in SUBCOMMANDS:
+        return False
+    try:
+        args, _ = parser.parse_known_args(argv)
+    except SystemExit:
+        return False  # let the worker report the usage error
+    if args.daemon or args.force_interactive:
+        return True
+    return args.command is None and args.file is None and os.isatty(0)
+
+
+def _watch_client(conn, done):
+    """Ends the session of the worker when the client goes away first."""
+    try:
+        while conn.recv(1):
+            pass
+    except OSError:
+        pass
+    if not done.is_set():
+        os.killpg(os.getpgrp(), signal.SIGHUP)
+
+
+def _run(argv):
+    from xonsh import main as xmain
+
+    # the worker is not in the session of the terminal of the client, so
+    # the terminal handshake of main() cannot succeed
+    xmain._tty_setup_done = True
+    try:
+        if argv and argv[0] in SUBCOMMANDS:
+            xmain.main(argv)
+        # unlike main(), do not fall back to another shell on errors
+        return xmain.main_xonsh(xmain.premain(argv))
+    except SystemExit as e:
+        code = e.code
+    except BaseException:
+        traceback.print_exc()
+        return 1
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
+
+
+def serve_request(conn):
+    """Runs the request of the client on ``conn`` in this process, returns
+    the exit code.
+    """
+    request, fds = recv_request(conn)
+    for target, fd in enumerate(fds[:3]):
+        os.dup2(fd, target)
+    for fd in fds:
+        if fd > 2:
+            os.close(fd)
+    sys.stdout.reconfigure(line_buffering=os.isatty(1))
+    os.chdir(request["cwd"])
+    os.umask(request["umask"])
+    os.environ.clear()
+    os.environ.update(request["env"])
+    argv = request["argv"]
+    sys.argv = ["xonsh", *argv]
+    for signum in (signal.SIGINT, signal.SIGTERM, signal.SIGCHLD):
+        signal.signal(signum, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    send_reply(conn, pid=os.getpid())
+    if _is_interactive(argv):
+        send_reply(conn, fallback=True)
+        return 0
+    done = threading.Event()
+    threading.Thread(target=_watch_client, args=(conn, done), daemon=True).start()
+    code = _run(argv)
+    with contextlib.suppress(Exception):
+        atexit._run_exitfuncs()
+    for f in (sys.stdout, sys.stderr):
+        with contextlib.suppress(Exception):
+            f.flush()
+    done.set()
+    send_reply(conn, exit=code)
+    return code
+
+
+class Server:
+    """Forks the workers and replaces the ones that took a request.
+
+    Parameters
+    ----------
+    path : str
+        The path of the socket.
+    workers : int
+        The number of workers waiting for a request.
+    """
+
+    def __init__(self, path, workers=2):
+        self.path = path
+        self.nworkers = max(workers, 1)
+        self.idle = set()
+        self.listener = None
+        self._pipe = None
+        self._stopping = False
+
+    def bind(self):
+        """Creates the socket, in a directory private to the user."""
+        check_private_dir(os.path.dirname(os.path.abspath(self.path)), create=True)
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        with probe:
+            try:
+                probe.connect(self.path)
+            except OSError:
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(self.path)  # left by a daemon that died
+            else:
+                raise OSError(errno.EADDRINUSE, "a daemon is running", self.path)
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o177)
+        try:
+            self.listener.bind(self.path)
+        finally:
+            os.umask(old_umask)
+        self.listener.listen(64)
+
+    def fork_worker(self):
+        pid = os.fork()
+        if pid:
+            self.idle.add(pid)
+            return
+        # worker
+        code = 1
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            rfd, wfd = self._pipe
+            os.close(rfd)
+            conn, _ = self.listener.accept()
+            self.listener.close()
+            _, uid, _ = peer_credentials(conn)
+            if uid != os.getuid():
+                conn.close()
+                print(f"xonsh: rejected a client of uid {uid}", file=sys.stderr)
+                return
+            os.setsid()
+            os.write(wfd, b"a")
+            os.close(wfd)
+            with conn:
+                code = serve_request(conn)
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            os._exit(code if 0 <= code < 256 else 1)
+
+    def _stop(self, signum, frame):
+        self._stopping = True
+        os.write(self._pipe[1], b"s")  # wakes up select()
+
+    def serve_forever(self):
+        """Keeps ``workers`` idle workers until SIGINT or SIGTERM."""
+        self._pipe = rfd, wfd = os.pipe()
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        # wakes up select() when a worker exits
+        signal.signal(signal.SIGCHLD, lambda signum, frame: os.write(wfd, b"c"))
+        try:
+            while not self._stopping:
+                while len(self.idle) < self.nworkers:
+                    self.fork_worker()
+                try:
+                    ready, _, _ = select.select([rfd], [], [], 5.0)
+                except InterruptedError:
+                    ready = []
+                if ready:
+                    # a worker took a request or exited
+                    os.read(rfd, 64)
+                self._reap()
+        finally:
+            for pid in self.idle:
+                with contextlib.suppress(OSError):
+                    os.kill(pid, signal.SIGTERM)
+            self.listener.close()
+            with contextlib.suppress(OSError):
+                os.unlink(self.path)
+            os.close(rfd)
+            os.close(wfd)
+
+    def _reap(self):
+        """Forgets the workers that took a request or exited."""
+        while True:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                pid = 0
+            if not pid:
+                break
+            self.idle.discard(pid)
+        for pid in list(self.idle):
+            # a worker that took a request is in its own session
+            with contextlib.suppress(OSError):
+                if os.getsid(pid) == pid:
+                    self.idle.discard(pid)
+
+
+def serve(path=None, workers=None):
+    """Runs the daemon, returns the exit code."""
+    if not hasattr(os, "fork") or not is_supported():
+        print("xonsh: --daemon is not supported on this platform", file=sys.stderr)
+        return 1
+    path = path or socket_path()
+    if workers is None:
+        workers = int(os.environ.get("XONSH_DAEMON_WORKERS", 2))
+    warm_up()
+    server = Server(path, workers=workers)
+    try:
+        server.bind()
+    except OSError as e:
+        print(f"xonsh: cannot listen on {path}: {e.strerror}", file=sys.stderr)
+        return 1
+    print(f"xonsh: daemon listening on {path}", file=sys.stderr)
+    server.serve_forever()
+    return 0
@@ -1,11 +1,13 @@
 """Environment for the xonsh shell."""
 
+import atexit
 import contextlib
 import inspect
 import json
 import locale
 import os
 import pathlib
+import pickle
 import platform
 import pprint
 import re
@@ -27,10 +29,11 @@ from xonsh.ansi_colors import (
     ansi_style_by_name,
 )
 from xonsh.built_ins import XSH
-from xonsh.codecache import run_script_with_cache
+from xonsh.codecache import ScriptPrecompiler, run_precompiled_script
 from xonsh.debug import is_breakpoint_engine, to_breakpoint_engine
 from xonsh.dirstack import _get_cwd
 from xonsh.events import events
+from xonsh.lib import startup_profile
 from xonsh.lib.lazyasd import LazyBool, lazyobject
 from xonsh.platform import (
     BASH_COMPLETIONS_DEFAULT,
@@ -1197,6 +1200,21 @@ class GeneralSetting(Xettings):
         "This is the location where xonsh user-level configuration information is stored.",
         type_str="str",
     )
+    XONSH_DAEMON_SOCKET = Var.no_default(
+        "str",
+        "The path of the socket where ``xonsh --daemon`` listens and where "
+        "``xonsh-client`` connects. Defaults to ``xonsh/daemon.sock`` in "
+        "``$XDG_RUNTIME_DIR``, or to ``/tmp/xonsh-<uid>/daemon.sock``. Its "
+        "directory must be owned by the user and have mode ``0700``. This is "
+        "read from the environment of the process, before xonsh starts.",
+    )
+    XONSH_DAEMON_WORKERS = Var.with_default(
+        2,
+        "The number of warm workers that ``xonsh --daemon`` keeps waiting "
+        "for requests. Each request takes one and the daemon forks a new one. "
+        "This is read from the environment of the process, before xonsh starts.",
+        type_str="int",
+    )
     XONSH_ORIGIN_ENV_FILE = Var.no_default(
         "str",
         "The path to the file where environment variables are saved when "
@@ -1205,6 +1223,13 @@ class GeneralSetting(Xettings):
         "Thus, from an existing xonsh session, you can start a new one with "
         "the same environment variables that were used when launching the original session.",
     )
+    XONSH_TYPED_ENV_FILE = Var.no_default(
+        "str",
+        "The path to the file where xonsh saved the typed values of its "
+        "environment variables when ``$XONSH_SHARE_TYPED_ENV`` is set. Nested "
+        "xonsh sessions take the values they inherit unchanged from this file "
+        "instead of converting them again.",
+    )
     XONSH_SYS_CONFIG_DIR = Var.with_default(
         xonsh_sys_config_dir,
         "This is the location where xonsh system-level configuration information is stored.",
@@ -1523,12 +1548,79 @@ class CacheSetting(Xettings):
         " (``True``) or re-compiled each time (``False``).",
     )
 
+    XONSH_CACHE_SCRIPTS_PACK = Var.with_default(
+        False,
+        "Controls whether the cached code of scripts and xonsh modules is "
+        "stored in a single memory-mapped pack file in ``$XONSH_DATA_DIR`` "
+        "(``True``) instead of one cache file per script (``False``). This "
+        "saves opening a file for each script that is run or imported.",
+    )
+
+    XONSH_RC_PRECOMPILE = Var.with_default(
+        False,
+        "Controls whether the rc files and the scripts of the rc directories "
+        "are compiled in parallel worker processes at startup, while they "
+        "are run in order (``True``). Scripts with an up to date script "
+        "cache are not compiled again. Starting the workers takes a while, "
+        "so this only pays off for many or large uncached rc scripts.",
+    )
+
+    XONSH_SHARE_TYPED_ENV = Var.with_default(
+        False,
+        "Controls whether xonsh saves the typed values of its environment "
+        "variables when it starts its first subprocess, so that nested xonsh "
+        "sessions started from it convert only the variables that changed "
+        "since. The file is passed down in ``$XONSH_TYPED_ENV_FILE`` and "
+        "removed at exit.",
+    )
+
+    XONSH_STARTUP_SNAPSHOT = Var.with_default(
+        False,
+        "Controls whether non-interactive xonsh sessions snapshot the changes "
+        "that their rc files make to the environment, aliases, completers, "
+        "event handlers, xontribs and execution context in "
+        "``$XONSH_CACHE_DIR``. Later sessions with the same rc files and "
+        "environment, apart from ``$PWD``, restore the snapshot instead of "
+        "running the rc files. Other side effects of the rc files, like "
+        "printing or running commands, are not repeated. The rc files are "
+        "not snapshot if they define functions or classes that end up in "
+        "the session. This must be set before xonsh starts, e.g. with "
+        "``-DXONSH_STARTUP_SNAPSHOT=1``.",
+    )
+
     XONSH_CACHE_EVERYTHING = Var.with_default(
         False,
         "Controls whether all code (including code entered at the interactive"
         " prompt) will be cached.",
     )
 
+    XONSH_CODE_CACHE_MAX_FILES = Var.with_default(
+        10000,
+        "Maximum number of entries kept in each of the content-addressed "
+        "caches (code compiled with ``$XONSH_CACHE_EVERYTHING`` and "
+        "``$XONSH_CACHE_TRANSFORMS``). The least recently used entries are "
+        "evicted beyond it. Set to 0 for no limit. "
+        "See also ``xonfig cache``.",
+    )
+
+    XONSH_CODE_CACHE_MAX_SIZE = Var.with_default(
+        100 * 1024 * 1024,
+        "Maximum total size in bytes of each of the content-addressed caches, "
+        "see ``$XONSH_CODE_CACHE_MAX_FILES``. Set to 0 for no limit.",
+        doc_default="100 MiB",
+    )
+
+    XONSH_CACHE_TRANSFORMS = Var.with_default(
+        False,
+        "Controls whether the context-aware transformation of parsed code "
+        "(deciding which lines are subprocess commands) is cached on disk in "
+        "``$XONSH_CACHE_DIR``. Cached results are reused for the same code "
+        "whenever the names it refers to are still (un)defined in the same "
+        "way, and by the same parser backend (``$XONSH_PARSER``) and "
+        "grammar version, so ``source``, ``xonsh -c`` and run control files "
+        "don't need to be transformed again when unrelated names change.",
+    )
+
     XONSH_CACHE_DIR = Var.with_default(
         xonsh_cache_dir,
         "This is the location where cache files used by xonsh are stored, such as commands-cache...",
@@ -1564,6 +1656,16 @@ class CacheSetting(Xettings):
         type_str="env_path",
     )
 
+    XONSH_COMMANDS_CACHE_WATCH = Var.with_default(
+        False,
+        "If True, on Linux, the commands cache watches the ``$PATH`` "
+        "directories with inotify instead of checking their mtime on every "
+        "command lookup, so that lookups make no system call until a "
+        "directory changes. This also notices executables whose permissions "
+        "change. Other platforms, and Linux when inotify is not available, "
+        "keep checking the mtime.",
+    )
+
     XONSH_COMMANDS_CACHE_TRACE = Var.with_default(
         False,
         "If True, print trace messages showing where each command was resolved "
@@ -1655,6 +1757,42 @@ class InterpreterSetting(Xettings):
         "Toggles whether globbing results are manually sorted. If ``False``, "
         "the results are returned in arbitrary order.",
     )
+    XONSH_PARSER = Var.with_default(
+        "ply",
+        "The parser implementation: ``ply`` for the PLY parser, ``rd`` for "
+        "the Rust-backed ``xonsh_rd_parser``, or ``auto`` to use the RD "
+        "parser when it is installed and re-parse every input it rejects "
+        "with the PLY parser. This is read from the environment that xonsh "
+        "was started from, setting it in the ``.xonshrc`` has no effect.",
+        type_str="str",
+    )
+    XONSH_SINGLE_PASS_PARSE = Var.with_default(
+        False,
+        "If True, subprocess lines in scripts and multi-line input are "
+        "detected in a single pass over the statements, and the code is then "
+        "parsed once, instead of re-parsing the whole input after every "
+        "syntax error. This makes large scripts of bare commands start "
+        "faster. Input that cannot be handled this way falls back to the "
+        "regular parsing.",
+    )
+    XONSH_PARSER_LINE_CACHE_SIZE = Var.with_default(
+        512,
+        "Maximum number of logical lines for which the single-pass parser "
+        "(see ``$XONSH_SINGLE_PASS_PARSE``) remembers whether, and how, they "
+        "were wrapped as subprocess commands, so that editing a multi-line "
+        "block at the prompt only re-examines the changed lines. Set to 0 "
+        "to disable. The hit and miss counts are shown by ``xonfig``.",
+    )
+    XONSH_TOKEN_CACHE_SIZE = Var.with_default(
+        32,
+        "Maximum number of recent inputs whose tokens are kept, so that "
+        "the syntax check on enter and the execution of the same buffer "
+        "tokenize it once, and so do repeated completions of an unchanged "
+        "buffer. Highlighting, completion and execution lex with different "
+        "options and do not share tokens. Only interactive-sized inputs are "
+        "kept. Set to 0 to disable. The hit and miss counts are shown by "
+        "``xonfig``.",
+    )
 
 
 class XontribSetting(Xettings):
@@ -2461,6 +2599,55 @@ def _resolve_delete_var():
 DELETE_VAR = _DeleteVarSentinel()
 
 
+# variables whose detyped value depends on other variables
+_DETYPE_DEPENDENTS = {"XONSH_COLOR_STYLE": ("LS_COLORS",)}
+
+
+class EnvSnapshot:
+    """The environment at one point in time, as seen by one thread: the
+    detyped global variables, which are never changed once handed out, with
+    the thread's swapped and overlaid values on top.
+
+    Taking a snapshot costs a copy of the (few) shadowing values, whatever
+    the size of the environment. The detyped variables are built once, on
+    first use, and then shared by every reader of the snapshot, in any
+    thread. Readers that pass extra variables to a subprocess add them to a
+    copy, e.g. ``dict(env.detype(), PROMPT="$P$G")``.
+    """
+
+    def __init__(self, base, items, detype_value):
+        self._base = base
+        self._items = items
+        self._detype_value = detype_value
+        self._detyped = None if items else base
+        self._lock = threading.Lock()
+
+    def is_of(self, base, items):
+        """Whether the snapshot holds exactly these detyped global variables
+        and these (same objects) shadowing values.
+        """
+        if base is not self._base or len(items) != len(self._items):
+            return False
+        mine = self._items
+        return all(k in mine and mine[k] is v for k, v in items.items())
+
+    def detype(self):
+        """Returns the dict of detyped variables, do not modify it."""
+        if self._detyped is None:
+            with self._lock:
+                if self._detyped is None:
+                    ctx = dict(self._base)
+                    for key, val in self._items.items():
+                        deval = self._detype_value(key, val)
+                        key = key if isinstance(key, str) else str(key)
+                        if deval is None:
+                            ctx.pop(key, None)
+                        else:
+                            ctx[key] = deval
+                    self._detyped = ctx
+        return self._detyped
+
+
 class Env(cabc.MutableMapping):
     """A xonsh environment, whose variables have limited typing.
     Most variables are, by default, strings.
@@ -2484,6 +2671,12 @@ class Env(cabc.MutableMapping):
     def __init__(self, *args, **kwargs):
         """If no initial environment is given, os_environ is used."""
         self._d = InternalEnvironDict()
+        self._var_patterns = None
+        # the detyped global variables, updated per variable by detype()
+        self._detyped = None
+        self._detyped_dirty = set()
+        self._detyped_paths = {}
+        self._detype_lock = threading.RLock()
         # sentinel value for non existing envvars
         self._no_value = object()
         self._orig_env = None
@@ -2491,7 +2684,7 @@ class Env(cabc.MutableMapping):
         # to provide scoped env variables that shadow the global env
         # during alias execution. See push_overlay()/pop_overlay().
         self._overlay_local = threading.local()
-        self._vars = {k: v for k, v in DEFAULT_VARS.items()}
+        self._vars = DEFAULT_VARS.copy()
         # ``__THREAD_LOCAL__`` is an internal overlay used by ExecAlias to
         # carry the alias return code out of the pipeline thread. Register it
         # here with ``detype=None`` so it is excluded from ``Env.detype()``
@@ -2519,10 +2712,22 @@ class Env(cabc.MutableMapping):
         # os.environ.  The canonical name alone will re-populate the
         # alias via its forward ``sync=`` declaration, so we can skip
         # the deprecated key silently here.
+        typed = load_typed_env_from_file(initial.get("XONSH_TYPED_ENV_FILE"))
         for key, val in initial.items():
             var = self._vars.get(key)
             if var is not None and var.deprecated and var.sync and var.sync in initial:
                 continue
+            cached = typed.get(key)
+            if (
+                cached is not None
+                and cached[0] == val
+                and key not in self._d
+                and (var is None or not var.sync)
+            ):
+                # inherited unchanged from a parent xonsh, which converted it
+                self._d[key] = cached[1]
+                events.on_envvar_new.fire(name=key, value=cached[1])
+                continue
             self[key] = val
         if ON_WINDOWS:
             path_key = next((k for k in self._d if k.upper() == "PATH"), None)
@@ -2537,13 +2742,20 @@ class Env(cabc.MutableMapping):
             # meaningful.
             path_val = self._d.get("PATH")
             if isinstance(path_val, EnvPath):
-                path_val._l = [p for p in path_val._l if str(p).strip()]
+                path_val[:] = [p for p in path_val._l if str(p).strip()]
         if "PATH" not in self._d:
             # this is here so the PATH is accessible to subprocs and so that
             # it can be modified in-place in the xonshrc file
             self._d["PATH"] = EnvPath(PATH_DEFAULT)
         self._detyped = None
 
+    def _invalidate_detyped(self, key):
+        """Marks the cached detyped value of ``key`` as stale."""
+        dirty = self._detyped_dirty
+        dirty.add(key)
+        for dependent in _DETYPE_DEPENDENTS.get(key, ()):
+            dirty.add(dependent)
+
     def get_detyped(self, key: str):
         detyped = self.detype()
         return detyped.get(key)
@@ -2553,34 +2765,104 @@ class Env(cabc.MutableMapping):
         Returns a dict of detyped variables.
         Note! If env variable wasn't explicitly set (e.g. the value has default value in ``Xettings``)
         it will be not in this list.
+        The dict is cached and shared, copy it with ``dict()`` to change it.
         """
-        if self._detyped is not None and not self._overlay_stack:
-            return self._detyped
-        ctx = {}
-        items = dict(self._d)
-        # Apply overlay values on top (most recent overlay wins)
+        return self.snapshot().detype()
+
+    def snapshot(self):
+        """Returns an ``EnvSnapshot`` of the environment as the current
+        thread sees it. Snapshots are reused by the thread for as long as
+        neither the global variables nor its swapped values change.
+        """
+        base = self._detype_global()
+        glb = self._d._global
+        # thread-local swapped values and then overlays (most recent overlay
+        # wins) shadow the global ones. ``swap`` leaves the restored global
+        # values in the thread-local layer.
+        no_value = self._no_value
+        items = {
+            k: v for k, v in self._d._local.items() if v is not glb.get(k, no_value)
+        }
         for overlay in self._overlay_stack:
             items.update(overlay)
-        for key, val in items.items():
-            # Skip variables masked by DELETE_VAR — they must not reach
-            # subprocess.Popen as a stringified sentinel.
-            if val is DELETE_VAR:
-                continue
-            if not isinstance(key, str):
-                key = str(key)
-            detyper = self.get_detyper(key)
-            if detyper is None:
-                # cannot be detyped
+        local = self._overlay_local.__dict__
+        snap = local.get("snapshot")
+        if snap is None or not snap.is_of(base, items):
+            snap = local["snapshot"] = EnvSnapshot(base, items, self._detype_value)
+        return snap
+
+    def _detype_value(self, key, val):
+        """Returns the detyped ``val`` of ``key``, or ``None`` if the variable
+        must not be exported.
+        """
+        # Skip variables masked by DELETE_VAR — they must not reach
+        # subprocess.Popen as a stringified sentinel.
+        if val is DELETE_VAR:
+            return None
+        if not isinstance(key, str):
+            key = str(key)
+        detyper = self.get_detyper(key)
+        if detyper is None:
+            # cannot be detyped
+            return None
+        try:
+            return detyper(val)
+        except Exception as exc:
+            raise RuntimeError(f"Error during detyping ${key}: {exc}") from exc
+
+    def _track_detyped(self, key, val):
+        # EnvPath values are re-detyped when their version moves, so that
+        # mutations through references held elsewhere are picked up too.
+        if isinstance(val, EnvPath):
+            self._detyped_paths[key] = val.version
+        else:
+            self._detyped_paths.pop(key, None)
+
+    def _detype_global(self):
+        """Returns the detyped global (not swapped) variables, re-detyping
+        only the variables that changed since the last call.
+        """
+        with self._detype_lock:
+            return self._update_detyped()
+
+    def _update_detyped(self):
+        glb = self._d._global
+        if self._detyped is None:
+            ctx = {}
+            self._detyped_dirty = set()
+            self._detyped_paths = {}
+            for key, val in list(glb.items()):
+                deval = self._detype_value(key, val)
+                if deval is not None:
+                    ctx[key if isinstance(key, str) else str(key)] = deval
+                self._track_detyped(key, val)
+            self._detyped = ctx
+            return ctx
+        # other threads may keep adding keys to the dirty set meanwhile
+        stale, dirty = set(), self._detyped_dirty
+        while dirty:
+            stale.add(dirty.pop())
+        for key, version in self._detyped_paths.items():
+            val = glb.get(key)
+            if not isinstance(val, EnvPath) or val.version != version:
+                stale.add(key)
+        base = ctx = self._detyped
+        for key in stale:
+            val = glb.get(key, DELETE_VAR)
+            deval = self._detype_value(key, val)
+            self._track_detyped(key, val)
+            key = key if isinstance(key, str) else str(key)
+            if ctx.get(key) == deval:
                 continue
-            try:
-                deval = detyper(val)
-            except Exception as exc:
-                raise RuntimeError(f"Error during detyping ${key}: {exc}") from exc
+            if ctx is base:
+                # never change a dict that was handed out
+                ctx = dict(ctx)
             if deval is None:
-                # cannot be detyped
-                continue
-            ctx[key] = deval
-        if not self._overlay_stack:
+                ctx.pop(key, None)
+            else:
+                ctx[key] = deval
+        if self._detyped is base:
+            # unless a pattern change dropped the whole cache meanwhile
             self._detyped = ctx
         return ctx
 
@@ -2649,38 +2931,60 @@ class Env(cabc.MutableMapping):
             default = ensure_string
         return default
 
+    def _var_pattern_index(self):
+        """The ``(name, VarPattern)`` pairs of the global env data, followed
+        by the default ones the user has not overridden. Built once and
+        dropped whenever a pattern variable is set, deleted or registered.
+        """
+        index = self._var_patterns
+        if index is None:
+            glb = self._d._global
+            index = [(k, v) for k, v in glb.items() if isinstance(v, VarPattern)]
+            # ``type()`` rather than ``isinstance()``, which would load the
+            # lazy defaults, e.g. ``PATH_DEFAULT``, through their ``__class__``
+            index.extend(
+                (name, var.default)
+                for name, var in self._vars.items()
+                if issubclass(type(var.default), VarPattern) and name not in glb
+            )
+            self._var_patterns = index
+        return index
+
+    def _invalidate_var_patterns(self, key, *values):
+        """Drops the pattern index if ``key`` holds (or held) a VarPattern."""
+        var = self._vars.get(key)
+        if (var is not None and issubclass(type(var.default), VarPattern)) or any(
+            isinstance(v, VarPattern) for v in values
+        ):
+            self._var_patterns = None
+            # patterns change the detypers of other variables
+            self._detyped = None
+            return True
+        return False
+
+    def _find_var_pattern_item(self, key):
+        # patterns swapped in for the current thread come first
+        local = self._d._local
+        for name, val in local.items():
+            if isinstance(val, VarPattern) and val.match(key):
+                return name, val
+        for name, pattern in self._var_pattern_index():
+            if name not in local and pattern.match(key):
+                return name, pattern
+        return None
+
     def _find_var_pattern(self, key):
         """Check VarPattern values in env data (and defaults) for a match.
 
         Setting a VarPattern variable to None disables that pattern.
         """
-        # User-set values first (in _d)
-        for val in self._d.values():
-            if isinstance(val, VarPattern) and val.match(key):
-                return val.to_var()
-        # Fall back to defaults, but skip vars the user has overridden
-        for var_name, var in self._vars.items():
-            if (
-                isinstance(var.default, VarPattern)
-                and var_name not in self._d
-                and var.default.match(key)
-            ):
-                return var.default.to_var()
-        return None
+        item = self._find_var_pattern_item(key)
+        return None if item is None else item[1].to_var()
 
     def _find_var_pattern_name(self, key):
         """Return the name of the VarPattern variable that matches key."""
-        for pat_name, val in self._d.items():
-            if isinstance(val, VarPattern) and val.match(key):
-                return pat_name
-        for var_name, var in self._vars.items():
-            if (
-                isinstance(var.default, VarPattern)
-                and var_name not in self._d
-                and var.default.match(key)
-            ):
-                return var_name
-        return None
+        item = self._find_var_pattern_item(key)
+        return None if item is None else item[0]
 
     def get_validator(self, key, default=None):
         """Gets a validator for the given key."""
@@ -2863,15 +3167,17 @@ class Env(cabc.MutableMapping):
             val = self.get_default(key)
             if is_callable_default(val):
                 val = self._d[key] = val(self)
+                self._invalidate_detyped(key)
         else:
             e = "Unknown environment variable: ${}"
             raise KeyError(e.format(key))
-        if isinstance(
-            val, cabc.MutableSet | cabc.MutableSequence | cabc.MutableMapping
-        ):
-            self._detyped = None
         if isinstance(val, EnvPath):
             val.target_env_var = key
+        elif isinstance(
+            val, cabc.MutableSet | cabc.MutableSequence | cabc.MutableMapping
+        ):
+            # the caller may change the value in place
+            self._invalidate_detyped(key)
         return val
 
     def __setitem__(self, key, val):
@@ -2893,7 +3199,6 @@ class Env(cabc.MutableMapping):
             #     was not set, silently no-op (matches "absent" intent).
             if thread_local:
                 self._d.set_locally(key, DELETE_VAR)
-                self._detyped = None
             elif key in self._d:
                 self._del_item(key)
             return
@@ -2944,7 +3249,8 @@ class Env(cabc.MutableMapping):
             self._d.set_locally(key, val)
         else:
             self._d[key] = val
-        self._detyped = None
+        if not self._invalidate_var_patterns(key, val, old_value) and not thread_local:
+            self._invalidate_detyped(key)
         if self.get("UPDATE_OS_ENVIRON"):
             if self._orig_env is None:
                 try:
@@ -2955,7 +3261,8 @@ class Env(cabc.MutableMapping):
                         del self._d[key]
                     else:
                         self._d[key] = old_value
-                    self._detyped = None
+                    if not self._invalidate_var_patterns(key, val, old_value):
+                        self._invalidate_detyped(key)
                     raise
             elif detyper is None:
                 pass
@@ -2981,11 +3288,13 @@ class Env(cabc.MutableMapping):
 
     def _del_item(self, key, thread_local=False):
         if key in self._d:
+            old_value = self._d[key]
             if thread_local:
                 self._d.del_locally(key)
             else:
                 del self._d[key]
-            self._detyped = None
+            if not self._invalidate_var_patterns(key, old_value) and not thread_local:
+                self._invalidate_detyped(key)
             if self.get("UPDATE_OS_ENVIRON") and key in os_environ:
                 del os_environ[key]
         elif key not in self._vars:
@@ -3129,6 +3438,8 @@ class Env(cabc.MutableMapping):
                     "by validate and is not a callable default."
                 )
 
+        # a pattern changes the detypers of all the variables it matches
+        patterns = self._invalidate_var_patterns(name)
         self._vars[name] = Var(
             validate,
             convert,
@@ -3139,6 +3450,8 @@ class Env(cabc.MutableMapping):
             doc_default,
             can_store_as_str,
         )
+        if not (self._invalidate_var_patterns(name) or patterns):
+            self._invalidate_detyped(name)
 
     def deregister(self, name):
         """Deregister an enviornment variable and all its type handling,
@@ -3149,7 +3462,10 @@ class Env(cabc.MutableMapping):
         name : str
             Environment variable name to deregister. Typically all caps.
         """
+        patterns = self._invalidate_var_patterns(name)
         self._vars.pop(name)
+        if not patterns:
+            self._invalidate_detyped(name)
 
     def is_configurable(self, name):
         if name not in self._vars:
@@ -3263,28 +3579,57 @@ def xonshrc_context(
     ctx = {} if ctx is None else ctx
     orig_thread = env.get("THREAD_SUBPROCS")
     env["THREAD_SUBPROCS"] = None
-    if rcfiles is not None:
-        for rcfile in rcfiles:
-            if os.path.isfile(rcfile):
-                status = xonsh_script_run_control(
-                    rcfile, ctx, env, execer=execer, login=login
-                )
-                if status:
-                    loaded.append(rcfile)
-
-    if rcdirs is not None:
-        for rcdir in rcdirs:
-            for rcfile in sorted(dict(scan_dir_for_source_files(rcdir))):
-                status = xonsh_script_run_control(
-                    rcfile, ctx, env, execer=execer, login=login
-                )
-                if status:
-                    loaded.append(rcfile)
+    precompiler = None
+    if (
+        execer is not None
+        and env.get("XONSH_RC_PRECOMPILE")
+        and not env.get("XONSH_BUILTINS_TO_CMD")
+    ):
+        precompiler = ScriptPrecompiler.start(_rc_script_files(rcfiles, rcdirs), execer)
+    try:
+        if rcfiles is not None:
+            for rcfile in rcfiles:
+                if os.path.isfile(rcfile):
+                    status = xonsh_script_run_control(
+                        rcfile,
+                        ctx,
+                        env,
+                        execer=execer,
+                        login=login,
+                        precompiler=precompiler,
+                    )
+                    if status:
+                        loaded.append(rcfile)
+
+        if rcdirs is not None:
+            for rcdir in rcdirs:
+                for rcfile in sorted(dict(scan_dir_for_source_files(rcdir))):
+                    status = xonsh_script_run_control(
+                        rcfile,
+                        ctx,
+                        env,
+                        execer=execer,
+                        login=login,
+                        precompiler=precompiler,
+                    )
+                    if status:
+                        loaded.append(rcfile)
+    finally:
+        if precompiler is not None:
+            precompiler.close()
     if env["THREAD_SUBPROCS"] is None:
         env["THREAD_SUBPROCS"] = orig_thread
     return loaded
 
 
+def _rc_script_files(rcfiles, rcdirs):
+    """The rc files and the scripts in the rc directories, in loading order."""
+    files = [rcfile for rcfile in rcfiles or () if os.path.isfile(rcfile)]
+    for rcdir in rcdirs or ():
+        files.extend(sorted(dict(scan_dir_for_source_files(rcdir))))
+    return files
+
+
 def windows_foreign_env_fixes(ctx):
     """Environment fixes for Windows. Operates in-place."""
     # remove these bash variables which only cause problems.
@@ -3316,18 +3661,21 @@ class _RcPath(str):
     pass
 
 
-def xonsh_script_run_control(filename, ctx, env, execer=None, login=True):
+def xonsh_script_run_control(
+    filename, ctx, env, execer=None, login=True, precompiler=None
+):
     """Loads a xonsh file and applies it as a run control.
     Any exceptions are logged here, returns boolean indicating success.
+    The code compiled ahead by ``precompiler`` is used when it is valid.
     """
     if execer is None:
         return False
     updates = {"__file__": filename, "__name__": os.path.abspath(filename)}
     rc_dir = _RcPath(os.path.dirname(filename))
     sys.path.append(rc_dir)
-    with swap_values(ctx, updates):
+    with swap_values(ctx, updates), startup_profile.frame(f"rc {filename}"):
         try:
-            exc_info = run_script_with_cache(filename, execer, ctx)
+            exc_info = run_precompiled_script(filename, precompiler, execer, ctx)
         except SyntaxError:
             exc_info = sys.exc_info()
         if exc_info != (None, None, None):
@@ -3349,7 +3697,6 @@ def default_env(env=None):
     # in order of increasing precedence
     ctx = {
         "BASH_COMPLETIONS": list(DEFAULT_VARS["BASH_COMPLETIONS"].default),
-        "PROMPT_FIELDS": DEFAULT_VARS["PROMPT_FIELDS"].default(env),
         "XONSH_VERSION": XONSH_VERSION,
     }
 
@@ -3385,6 +3732,15 @@ def make_args_env(args=None):
     return env
 
 
+def _is_plain_path(p):
+    """Whether the EnvPath entry ``p`` expands to itself."""
+    return type(p) is str and "~" not in p and "$" not in p
+
+
+def _expandpath_entry(p):
+    return p if _is_plain_path(p) else _expandpath(p)
+
+
 class EnvPath(cabc.MutableSequence):
     """A class that implements an environment path, which is a list of
     strings. Provides a custom method that expands all paths if the
@@ -3393,6 +3749,11 @@ class EnvPath(cabc.MutableSequence):
 
     def __init__(self, args=None):
         self.target_env_var = None  # Will be populated by Env
+        self.version = 0  # incremented on every change
+        # counts of the entries that expand to themselves, built on demand,
+        # and the number of the other entries
+        self._index = None
+        self._nexpand = 0
 
         if not args:
             self._l = []
@@ -3430,13 +3791,14 @@ class EnvPath(cabc.MutableSequence):
     def __getitem__(self, item):
         # handle slices separately
         if isinstance(item, slice):
-            return [_expandpath(i) for i in self._l[item]]
+            return [_expandpath_entry(i) for i in self._l[item]]
         else:
-            return _expandpath(self._l[item])
+            return _expandpath_entry(self._l[item])
 
     def __setitem__(self, index, item):
         with EnvPath._OnPathChange(self):
             self._l.__setitem__(index, item)
+            self._index = None
 
     def __len__(self):
         return len(self._l)
@@ -3444,6 +3806,56 @@ class EnvPath(cabc.MutableSequence):
     def __delitem__(self, key):
         with EnvPath._OnPathChange(self):
             self._l.__delitem__(key)
+            self._index = None
+
+    def __iter__(self):
+        self._entry_index()
+        if self._nexpand:
+            return (_expandpath_entry(p) for p in self._l)
+        return iter(self._l)
+
+    def __contains__(self, value):
+        try:
+            if value in self._entry_index():
+                return True
+        except TypeError:  # unhashable
+            return any(v is value or v == value for v in self)
+        # only entries that need expanding can match otherwise
+        return self._nexpand > 0 and any(
+            _expandpath(p) == value for p in self._l if not _is_plain_path(p)
+        )
+
+    def _entry_index(self):
+        """Counts the entries that expand to themselves."""
+        index = self._index
+        if index is None:
+            index = {}
+            nexpand = 0
+            for p in self._l:
+                if _is_plain_path(p):
+                    index[p] = index.get(p, 0) + 1
+                else:
+                    nexpand += 1
+            self._index, self._nexpand = index, nexpand
+        return index
+
+    def _count_entry(self, p, n):
+        index = self._index
+        if index is None:
+            return
+        if not _is_plain_path(p):
+            self._nexpand += n
+            return
+        count = index.get(p, 0) + n
+        if count:
+            index[p] = count
+        else:
+            del index[p]
+
+    def _has_entry(self, p):
+        if _is_plain_path(p):
+            return p in self._entry_index()
+        return p in self._l
 
     @staticmethod
     def _prepare_path(p):
@@ -3451,20 +3863,28 @@ class EnvPath(cabc.MutableSequence):
 
     def insert(self, index, value):
         with EnvPath._OnPathChange(self):
-            self._l.insert(index, self._prepare_path(value))
+            value = self._prepare_path(value)
+            self._l.insert(index, value)
+            self._count_entry(value, 1)
 
     def append(self, value):
         with EnvPath._OnPathChange(self):
-            self._l.append(self._prepare_path(value))
+            value = self._prepare_path(value)
+            self._l.append(value)
+            self._count_entry(value, 1)
 
     def prepend(self, value):
         with EnvPath._OnPathChange(self):
-            self._l.insert(0, self._prepare_path(value))
+            value = self._prepare_path(value)
+            self._l.insert(0, value)
+            self._count_entry(value, 1)
 
     def remove(self, value):
         try:
             with EnvPath._OnPathChange(self):
-                self._l.remove(self._prepare_path(value))
+                value = self._prepare_path(value)
+                self._l.remove(value)
+                self._count_entry(value, -1)
         except ValueError:
             print(f"EnvPath warning: path {repr(value)} not found.", file=sys.stderr)
 
@@ -3537,11 +3957,15 @@ class EnvPath(cabc.MutableSequence):
         """
         with EnvPath._OnPathChange(self):
             data = self._prepare_path(data)
-            if data not in self._l:
+            if not self._has_entry(data):
                 self._l.insert(0 if front else len(self._l), data)
+                self._count_entry(data, 1)
             elif replace:
-                # https://stackoverflow.com/a/25251306/1621381
-                self._l = list(filter(lambda x: x != data, self._l))
+                if self._entry_index().get(data) == 1:
+                    self._l.remove(data)
+                else:
+                    self._l = [x for x in self._l if x != data]
+                    self._index = None
                 self._l.insert(0 if front else len(self._l), data)
 
     class _OnPathChange:
@@ -3554,7 +3978,10 @@ class EnvPath(cabc.MutableSequence):
             self.before = list(self.obj._l)
 
         def __exit__(self, exc_type, exc_val, exc_tb):
-            if self.obj.target_env_var and self.before != self.obj._l:
+            if self.before == self.obj._l:
+                return
+            self.obj.version += 1
+            if self.obj.target_env_var:
                 events.on_envvar_change.fire(
                     name=self.obj.target_env_var,
                     oldvalue=self.before,
@@ -3581,6 +4008,73 @@ def save_origin_env_to_file(env, session_id):
         print(f"xonsh: Write access denied for {data_dir!r}", file=sys.stderr)
 
 
+def save_typed_env_to_file(env, session_id):
+    """Saves the typed values of the variables that are passed to
+    subprocesses, along with their detyped strings, for nested xonsh
+    sessions. Sets ``$XONSH_TYPED_ENV_FILE`` to the file, which is removed
+    at exit. Does nothing if the session already saved its file.
+    """
+    data_dir = env.get("XONSH_DATA_DIR", None)
+    if data_dir is None:
+        return
+    env_file_name = Path(data_dir) / f"typed-env-{session_id}.pickle"
+    if env.get("XONSH_TYPED_ENV_FILE") == str(env_file_name):
+        return
+    glb = env._d._global
+    typed = {}
+    for key, deval in env.detype().items():
+        val = glb.get(key)
+        if val is not None and not isinstance(val, VarPattern):
+            typed[key] = (deval, val)
+    try:
+        data = pickle.dumps({"version": XONSH_VERSION, "env": typed})
+    except Exception:
+        # leave out the values that cannot be pickled, e.g. functions
+        for key, item in list(typed.items()):
+            try:
+                pickle.dumps(item)
+            except Exception:
+                del typed[key]
+        data = pickle.dumps({"version": XONSH_VERSION, "env": typed})
+    try:
+        fd = os.open(env_file_name, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with open(fd, "wb") as f:
+            f.write(data)
+    except OSError as e:
+        print(f"xonsh: Failed to save typed env: {e}", file=sys.stderr)
+        env["XONSH_SHARE_TYPED_ENV"] = False
+        return
+    atexit.register(_remove_typed_env_file, env_file_name)
+    env["XONSH_TYPED_ENV_FILE"] = str(env_file_name)
+
+
+def _remove_typed_env_file(env_file_name):
+    with contextlib.suppress(OSError):
+        env_file_name.unlink()
+
+
+def load_typed_env_from_file(env_file_name):
+    """Loads the values saved by ``save_typed_env_to_file`` as a
+    ``{name: (detyped, value)}`` dict. The dict is empty if the file is
+    missing, was saved by another xonsh version or, on POSIX, if it is not
+    private to the current user.
+    """
+    if not env_file_name:
+        return {}
+    try:
+        with open(env_file_name, "rb") as f:
+            if not ON_WINDOWS:
+                st = os.fstat(f.fileno())
+                if st.st_uid != os.getuid() or st.st_mode & 0o077:
+                    return {}
+            data = pickle.load(f)
+    except Exception:
+        return {}
+    if not isinstance(data, dict) or data.get("version") != XONSH_VERSION:
+        return {}
+    return data.get("env") or {}
+
+
 def load_origin_env_from_file():
     e = os_environ
     if "XONSH_ORIGIN_ENV_FILE" not in e:
@@ -121,6 +121,12 @@ class AbstractEvent(collections.abc.MutableSet, abc.ABC):
                     continue
             yield handler
 
+    def _call_handler(self, handler, kwargs):
+        """Calls a handler. The single place handlers are called from, e.g.
+        for ``xonsh --timings`` to time them.
+        """
+        return handler(**kwargs)
+
     @abc.abstractmethod
     def fire(self, **kwargs):
         """
@@ -217,7 +223,7 @@ class Event(AbstractEvent):
         try:
             for handler in self._filterhandlers(self._handlers.values(), **kwargs):
                 try:
-                    rv = handler(**kwargs)
+                    rv = self._call_handler(handler, kwargs)
                 except Exception:
                     print_exception("Exception raised in event handler; ignored.")
                 else:
@@ -287,7 +293,7 @@ class LoadEvent(AbstractEvent):
 
     def _call(self, handler):
         try:
-            handler(**self._kwargs)
+            self._call_handler(handler, self._kwargs)
         except Exception:
             print_exception("Exception raised in event handler; ignored.")
 
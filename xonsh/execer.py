@@ -6,9 +6,18 @@ import inspect
 import sys
 import types
 
+from xonsh.built_ins import XSH
+from xonsh.codecache import (
+    should_use_transform_cache,
+    transform_cache_check,
+    transform_cache_key,
+    update_transform_cache,
+)
+from xonsh.lib.collections import LRUCache
 from xonsh.parser import Parser
 from xonsh.parsers.ast import CtxAwareTransformer
 from xonsh.parsers.base import wrap_subproc_raise_checks
+from xonsh.parsers.lexer import TOKEN_STREAMS
 from xonsh.tools import (
     balanced_parens,
     ends_with_colon_token,
@@ -20,6 +29,10 @@ from xonsh.tools import (
     subproc_toks,
 )
 
+# Statements that are only valid after a preceding block, and so cannot be
+# checked in isolation by the single-pass parser.
+_CONTINUATION_KEYWORDS = frozenset(["else", "elif", "except", "finally", "case"])
+
 
 class Execer:
     """Executes xonsh code in a context."""
@@ -31,6 +44,7 @@ class Execer:
         parser_args=None,
         scriptcache=True,
         cacheall=False,
+        single_pass=None,
     ):
         """Parameters
         ----------
@@ -46,6 +60,10 @@ class Execer:
         cacheall : bool, optional
             Whether or not to cache all xonsh code, and not just files. If this
             is set to true, it will cache command line input too, default: False.
+        single_pass : bool or None, optional
+            Whether to classify subprocess lines in a single pass over the
+            tokens instead of re-parsing after every syntax error. If None,
+            the value of ``$XONSH_SINGLE_PASS_PARSE`` is used, default: None.
         """
         parser_args = parser_args or {}
         self.parser = Parser(**parser_args)
@@ -54,6 +72,8 @@ class Execer:
         self.debug_level = debug_level
         self.scriptcache = scriptcache
         self.cacheall = cacheall
+        self.single_pass = single_pass
+        self.line_cache = LRUCache(maxsize=0)
         self.ctxtransformer = CtxAwareTransformer(self.parser)
 
     def parse(
@@ -65,10 +85,24 @@ class Execer:
         """
         if filename is None:
             filename = self.filename
+        self._use_token_cache()
         if not transform:
             return self.parser.parse(
                 input, filename=filename, mode=mode, debug_level=(self.debug_level >= 2)
             )
+        if ctx is None:
+            ctx = set()
+        elif isinstance(ctx, cabc.Mapping):
+            ctx = set(ctx.keys())
+
+        # The outcome of all phases only depends on the input and on which
+        # names were looked up in the context, so it may be cached on disk.
+        cache_key = None
+        if should_use_transform_cache(mode, input):
+            cache_key = transform_cache_key(input, mode, self.parser)
+            tree = transform_cache_check(cache_key, ctx, user_names)
+            if tree is not None:
+                return tree
 
         # [Phase 1]
         # Parsing actually happens in a couple of phases. The first is a
@@ -88,7 +122,14 @@ class Execer:
         # parse operation, we will have a tree which contains *some* subproc
         # nodes, and some subproc-as-Python nodes. We now need a context-
         # aware phase to disambiguate the two.
-        tree, input = self._parse_ctx_free(input, mode=mode, filename=filename)
+        parsed = None
+        if mode in ("exec", "single") and self._use_single_pass():
+            parsed = self._parse_ctx_free_single_pass(
+                input, mode=mode, filename=filename
+            )
+        if parsed is None:
+            parsed = self._parse_ctx_free(input, mode=mode, filename=filename)
+        tree, input = parsed
         if tree is None:
             return None
 
@@ -99,10 +140,6 @@ class Execer:
         # (ls) is part of the execution context. If it isn't, then we will
         # assume that this line is supposed to be a subprocess line, assuming
         # it also is valid as a subprocess line.
-        if ctx is None:
-            ctx = set()
-        elif isinstance(ctx, cabc.Mapping):
-            ctx = set(ctx.keys())
         tree = self.ctxtransformer.ctxvisit(
             tree,
             input,
@@ -117,6 +154,13 @@ class Execer:
         # $[...]) so their final returncode is checked at runtime
         # against $XONSH_SUBPROC_RAISE_ERROR.
         tree = wrap_subproc_raise_checks(tree)
+        if cache_key is not None:
+            update_transform_cache(
+                cache_key,
+                self.ctxtransformer.ctx_lookups,
+                self.ctxtransformer.user_lookups,
+                tree,
+            )
         return tree
 
     def compile(
@@ -243,7 +287,165 @@ class Execer:
             )
             print(msg, file=sys.stderr)
 
-    def _parse_ctx_free(self, input, mode="exec", filename=None, logical_input=False):
+    def _use_single_pass(self):
+        if self.single_pass is not None:
+            return self.single_pass
+        env = XSH.env
+        return env is not None and env.get("XONSH_SINGLE_PASS_PARSE", False)
+
+    def _use_line_cache(self):
+        env = XSH.env
+        size = 0 if env is None else env.get("XONSH_PARSER_LINE_CACHE_SIZE", 0)
+        if size != self.line_cache.maxsize:
+            self.line_cache.maxsize = size
+            self.line_cache.trim()
+        return size > 0
+
+    def _use_token_cache(self):
+        env = XSH.env
+        if env is None:
+            return
+        size = env.get("XONSH_TOKEN_CACHE_SIZE", TOKEN_STREAMS.maxsize)
+        if size != TOKEN_STREAMS.maxsize:
+            TOKEN_STREAMS.maxsize = size
+
+    def _logical_statements(self, input):
+        """Splits the input into logical statements with a single pass of the
+        lexer. Returns a list of ``(first_lineno, last_lineno, first_token,
+        last_token_type)`` tuples, or None if the input does not lex cleanly.
+        """
+        lexer = self.parser.lexer
+        lexer.reset()
+        lexer.input(input)
+        stmts = []
+        first = last = None
+        for tok in lexer:
+            if tok.type == "ERRORTOKEN":
+                return None
+            elif tok.type in ("INDENT", "DEDENT", "WS"):
+                continue
+            elif tok.type == "NEWLINE":
+                if first is not None:
+                    stmts.append((first.lineno, tok.lineno, first, last))
+                first = last = None
+                continue
+            if first is None:
+                first = tok
+            last = tok.type
+        lexer.reset()
+        return stmts
+
+    def _parse_ctx_free_single_pass(self, input, mode="exec", filename=None):
+        """Context-free parse that decides which logical lines are subprocess
+        lines in one linear pass, and then parses the whole input once.
+
+        Each statement at or after the first syntax error is parsed on its own;
+        only the ones that are not valid Python are wrapped with
+        ``subproc_toks``. The outcome for every logical line is kept in
+        ``line_cache``, so that re-parsing an edited buffer only has to look
+        at the lines that changed. Returns None when the input should instead
+        go through the retry loop of ``_parse_ctx_free``, e.g. because it
+        contains a genuine syntax error that needs to be reported.
+        """
+        if filename is None:
+            filename = self.filename
+        if not input.endswith("\n"):
+            input += "\n"
+        input = strip_continuation_comments(input)
+        self._use_line_cache()  # keep the cache size in sync
+        debug_level = self.debug_level >= 2
+        try:
+            tree = self.parser.parse(
+                input, filename=filename, mode=mode, debug_level=debug_level
+            )
+            return tree, input
+        except IndentationError:
+            return None
+        except SyntaxError as e:
+            if e.loc is None:
+                return None
+            first_error_line = e.loc.lineno
+        stmts = self._logical_statements(input)
+        if stmts is None:
+            return None
+        lines = input.splitlines()
+        lines.append("")
+        cache = self.line_cache
+        offset = 0
+        greedy = False
+        for first_lineno, last_lineno, first_tok, last_type in stmts:
+            if last_lineno < first_error_line:
+                continue  # everything before the first error is Python
+            if (
+                first_tok.value in _CONTINUATION_KEYWORDS
+                or first_tok.type == "AT"
+                or last_type == "COLON"
+            ):
+                continue  # block headers are left to the full parse
+            idx = first_lineno - 1 + offset
+            n = last_lineno - first_lineno + 1
+            # only look at the statement's own lines, the ones before it
+            # are already known to be complete
+            line, nlogical, _ = get_logical_line(lines[idx : idx + n], 0)
+            if nlogical != n:
+                # a bracketed statement spanning several lines can't be
+                # wrapped line by line, so it had better be Python
+                stmt = "\n".join(lines[idx : idx + n]).lstrip() + "\n"
+                key = (mode, None, stmt)
+                valid = cache.get(key)
+                if valid is None:
+                    try:
+                        self.parser.parse(
+                            stmt, filename=filename, mode=mode, debug_level=debug_level
+                        )
+                        valid = True
+                    except SyntaxError:
+                        valid = False
+                    cache[key] = valid
+                if not valid:
+                    return None
+                continue
+            key = (mode, greedy, line)
+            cached = cache.get(key)
+            if cached is None:
+                sbpline = None
+                for g in (True,) if greedy else (False, True):
+                    try:
+                        _, sbpline = self._parse_ctx_free(
+                            line,
+                            mode=mode,
+                            filename=filename,
+                            logical_input=True,
+                            greedy=g,
+                        )
+                        break
+                    except SyntaxError:
+                        greedy = True
+                cache[key] = (sbpline, greedy)
+            else:
+                sbpline, greedy = cached
+            if sbpline is None:
+                return None
+            elif sbpline.rstrip("\n") == line:
+                continue  # valid Python
+            if nlogical == 1:
+                sbpline = sbpline.rstrip("\n")
+            self._print_debug_wrapping(line, sbpline, first_lineno, 0)
+            nlines = len(lines)
+            replace_logical_line(lines, sbpline, idx, nlogical)
+            offset += len(lines) - nlines
+        input = "\n".join(lines)
+        try:
+            tree = self.parser.parse(
+                input, filename=filename, mode=mode, debug_level=debug_level
+            )
+        except SyntaxError:
+            return None
+        return tree, input
+
+    def _parse_ctx_free(
+        self, input, mode="exec", filename=None, logical_input=False, greedy=None
+    ):
         if filename is None:
             filename = self.filename
         if mode != "eval" and not input.endswith("\n"):
@@ -398,6 +600,8 @@ class Execer:
                 input = beg_spaces + input
             return tree, input
 
+        if greedy is not None:
+            return _try_parse(input, greedy=greedy)
         try:
             return _try_parse(input, greedy=False)
         except SyntaxError:
@@ -15,10 +15,9 @@ from importlib.machinery import ModuleSpec
 from xonsh.built_ins import XSH
 from xonsh.codecache import (
     compile_code,
-    get_cache_filename,
-    script_cache_check,
+    load_script_cache,
     should_use_cache,
-    update_cache,
+    update_script_cache,
 )
 from xonsh.events import events
 from xonsh.execer import Execer
@@ -116,15 +115,14 @@ class XonshImportHook(MetaPathFinder, SourceLoader):  # type: ignore
         execer = self._execer
         use_cache = XSH.env is not None and should_use_cache(execer, "exec")
         if use_cache:
-            cachefname = get_cache_filename(filename, code=False)
-            run_cached, ccode = script_cache_check(filename, cachefname)
-            if run_cached:
+            ccode = load_script_cache(filename)
+            if ccode is not None:
                 return ccode
         src = self.get_source(fullname)
         ctx = {}  # dummy for modules
         ccode = compile_code(filename, src, execer, ctx, ctx, "exec")
         if use_cache:
-            update_cache(ccode, cachefname)
+            update_script_cache(ccode, filename)
         return ccode
 
     def get_source(self, fullname):
@@ -2,7 +2,7 @@
 
 import itertools
 import typing as tp
-from collections import ChainMap
+from collections import ChainMap, OrderedDict
 from collections.abc import MutableMapping, MutableSequence, MutableSet
 
 
@@ -71,3 +71,65 @@ def _convert_to_dict(cm):
         return r
     else:
         return cm
+
+
+class LRUCache:
+    """A bounded mapping that drops the least recently used entries once
+    ``maxsize`` is exceeded, and counts lookup hits and misses.
+    A ``maxsize`` of zero disables storing anything.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        """Returns the value for key, marking it as recently used."""
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def __setitem__(self, key, value):
+        if self.maxsize <= 0:
+            return
+        self._data[key] = value
+        self._data.move_to_end(key)
+        self.trim()
+
+    def __delitem__(self, key):
+        del self._data[key]
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def trim(self):
+        """Evicts the least recently used entries beyond ``maxsize``."""
+        while len(self._data) > max(self.maxsize, 0):
+            self._data.popitem(last=False)
+
+    def clear(self, reset_stats=True):
+        """Removes all entries and, unless ``reset_stats`` is false, resets
+        the counters.
+        """
+        self._data.clear()
+        if reset_stats:
+            self.hits = self.misses = 0
+
+    def stats(self):
+        """Returns the hit/miss counters and the current size as a dict."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+        }
@@ -0,0 +1,270 @@
+"""A profiler for the startup of xonsh, used by ``xonsh --timings``.
+
+The profiler times nested frames: module imports, loads of the lazy objects
+of :mod:`xonsh.lib.lazyasd` along with the call site that forced them, and
+any frame opened with :func:`frame`, e.g. rc files and event handlers. The
+self time of every stack of frames is written in the folded stacks format
+read by flame graph tools (``flamegraph.pl``, speedscope, inferno)::
+
+    xonsh;import xonsh.main;import xonsh.environ 5120
+
+This module only imports the standard library, so that it can be started
+before the rest of xonsh is imported.
+"""
+
+import builtins
+import contextlib
+import importlib.util
+import sys
+import threading
+import time
+
+PROFILER = None
+"""The running :class:`StartupProfiler`, if any."""
+
+_NULL_FRAME = contextlib.nullcontext()
+
+
+class StartupProfiler:
+    """Records the self time of stacks of named frames.
+
+    Only frames of the thread that started the profiler are recorded, the
+    frames of other threads count towards the frame they run in.
+    """
+
+    root = "xonsh"
+
+    def __init__(self):
+        self.stacks = {}
+        """The self time in seconds of each tuple of frame names."""
+        self._stack = []
+        self._thread = threading.get_ident()
+        self._patches = []
+        self.start_time = self.stop_time = None
+
+    def push(self, name):
+        """Opens a frame, returns the entry to pass to :meth:`pop`."""
+        entry = [name, time.perf_counter(), 0.0]
+        self._stack.append(entry)
+        return entry
+
+    def pop(self, entry, keep=True):
+        """Closes the frame of ``entry``. Frames that are not kept, and have
+        no kept frames inside, count towards their parent frame.
+        """
+        elapsed = time.perf_counter() - entry[1]
+        stack = self._stack
+        if stack and stack[-1] is entry:
+            stack.pop()
+            parents = stack
+        else:  # closed out of order, e.g. by an abandoned generator
+            i = next((i for i, e in enumerate(stack) if e is entry), len(stack))
+            parents = stack[:i]
+            del stack[i : i + 1]
+        if not keep and not entry[2]:
+            return
+        names = (self.root, *(e[0] for e in parents), entry[0])
+        self.stacks[names] = self.stacks.get(names, 0.0) + elapsed - entry[2]
+        if parents:
+            parents[-1][2] += elapsed
+
+    @contextlib.contextmanager
+    def frame(self, name):
+        """Times the body of the ``with`` statement as a frame."""
+        if threading.get_ident() != self._thread:
+            yield
+            return
+        entry = self.push(name)
+        try:
+            yield
+        finally:
+            self.pop(entry)
+
+    def start(self):
+        """Starts timing and installs the import and lazy object hooks."""
+        self.start_time = time.perf_counter()
+        self._patch(builtins, "__import__", self._timed_import(builtins.__import__))
+        from xonsh.lib import lazyasd
+
+        self._patch_lazyasd(lazyasd)
+
+    def stop(self):
+        """Stops timing and removes the hooks."""
+        if self.stop_time is not None:
+            return
+        self.stop_time = time.perf_counter()
+        while self._patches:
+            obj, attr, orig = self._patches.pop()
+            setattr(obj, attr, orig)
+        while self._stack:
+            self.pop(self._stack[-1])
+        total = self.stop_time - self.start_time
+        inner = sum(t for names, t in self.stacks.items() if len(names) > 1)
+        self.stacks[(self.root,)] = max(total - inner, 0.0)
+
+    def patch(self, obj, attr, func):
+        """Replaces ``obj.attr`` with ``func(original)`` until the profiler
+        stops.
+        """
+        self._patch(obj, attr, func(getattr(obj, attr)))
+
+    def _patch(self, obj, attr, value):
+        self._patches.append((obj, attr, getattr(obj, attr)))
+        setattr(obj, attr, value)
+
+    def _timed_import(self, orig):
+        modules = sys.modules
+
+        def __import__(name, globals=None, locals=None, fromlist=(), level=0):
+            if threading.get_ident() != self._thread:
+                return orig(name, globals, locals, fromlist, level)
+            label = name
+            if level:
+                package = (globals or {}).get("__package__") or ""
+                label = "." * level + name
+                with contextlib.suppress(ImportError, ValueError):
+                    label = importlib.util.resolve_name(label, package)
+            if fromlist and fromlist[0] != "*":
+                label = f"from {label} import {', '.join(fromlist)}"
+            else:
+                label = "import " + label
+            nmodules = len(modules)
+            entry = self.push(label)
+            try:
+                return orig(name, globals, locals, fromlist, level)
+            finally:
+                self.pop(entry, keep=len(modules) != nmodules)
+
+        return __import__
+
+    def _patch_lazyasd(self, lazyasd):
+        profiler = self
+
+        def lazy_obj(orig):
+            def _lazy_obj(self):
+                d = self._lasdo
+                if d["loaded"]:
+                    return d["obj"]
+                with profiler.frame(_lazy_name(d["ctx"], d["name"])):
+                    return orig(self)
+
+            return _lazy_obj
+
+        def lazy_bool(orig):
+            def __bool__(self):
+                if self._result is not None:
+                    return self._result
+                with profiler.frame(_lazy_name(self._ctx, self._name)):
+                    return orig(self)
+
+            return __bool__
+
+        def lazy_dict_getitem(orig):
+            def __getitem__(self, key):
+                if key in self._d or key not in self._loaders:
+                    return orig(self, key)
+                name = f"{self._name}[{key!r}]"
+                with profiler.frame(_lazy_name(self._ctx, name)):
+                    return orig(self, key)
+
+            return __getitem__
+
+        self.patch(lazyasd.LazyObject, "_lazy_obj", lazy_obj)
+        self.patch(lazyasd.LazyBool, "__bool__", lazy_bool)
+        self.patch(lazyasd.LazyDict, "__getitem__", lazy_dict_getitem)
+
+    def folded(self, unit=1e6):
+        """Returns the stacks in the folded format, in microseconds by
+        default. Stacks shorter than one unit are left out.
+        """
+        lines = []
+        for names, t in self.stacks.items():
+            value = round(t * unit)
+            if value > 0:
+                lines.append(";".join(n.replace(";", ",") for n in names))
+                lines[-1] += f" {value}"
+        return "\n".join(lines) + "\n"
+
+    def totals(self):
+        """Returns the total time of each frame name, summed over the stacks
+        it appears in once.
+        """
+        totals = {}
+        for names, t in self.stacks.items():
+            for name in set(names):
+                totals[name] = totals.get(name, 0.0) + t
+        return totals
+
+
+def _lazy_name(ctx, name):
+    module = ctx.get("__name__", "?") if isinstance(ctx, dict) else "?"
+    return f"lazy {module}.{name} <- {_call_site()}"
+
+
+def _call_site():
+    """The first caller outside of the lazy objects and this module."""
+    f = sys._getframe(2)
+    skip = (__name__, "xonsh.lib.lazyasd", "contextlib")
+    while f is not None and f.f_globals.get("__name__") in skip:
+        f = f.f_back
+    if f is None:
+        return "?"
+    return f"{f.f_globals.get('__name__', '?')}:{f.f_lineno}"
+
+
+_VALUE_OPTIONS = frozenset(["-c", "-D", "-st", "--shell-type", "--timings-file"])
+"""The options of xonsh that take the next argument as their value."""
+
+
+def timings_options(argv):
+    """Returns whether the options of xonsh in ``argv`` ask for the startup
+    profile, with ``--timings`` or ``--timings-file``, and the file given to
+    the latter. The options are only read up to the script file, whose own
+    arguments may be anything.
+    """
+    timings, filename = False, None
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg in ("-", "--") or not arg.startswith("-"):
+            # the script file, or what the command line of a script holds
+            break
+        name, eq, value = arg.partition("=")
+        if name == "--timings":
+            timings = True
+        elif name == "--timings-file":
+            if not eq:
+                i += 1
+                value = argv[i] if i < len(argv) else None
+            timings, filename = True, value
+        elif arg == "--rc":
+            # one or more files
+            while i + 1 < len(argv) and not argv[i + 1].startswith("-"):
+                i += 1
+        elif arg in _VALUE_OPTIONS or (
+            # short flags that end with one taking a value, e.g. -lc
+            not arg.startswith("--")
+            and arg[-1] in "cD"
+            and set(arg[1:-1]) <= set("hilnV")
+        ):
+            i += 1
+        i += 1
+    return timings, filename
+
+
+def start():
+    """Starts the startup profiler, if it is not running yet."""
+    global PROFILER
+    if PROFILER is None:
+        PROFILER = StartupProfiler()
+        PROFILER.start()
+    return PROFILER
+
+
+def frame(name):
+    """Returns a context manager that times its body as a frame of the
+    running profiler, or does nothing.
+    """
+    if PROFILER is None or PROFILER.stop_time is not None:
+        return _NULL_FRAME
+    return PROFILER.frame(name)
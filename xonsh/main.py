@@ -924,6 +924,14 @@ def parser():
         action="store_true",
         default=None,
     )
+    p.add_argument(
+        "--timings-file",
+        help="Profiles the startup as with --timings and writes the profile "
+        "to the given file, in the folded stacks format of flame graph tools.",
+        metavar="FILE",
+        dest="timings_file",
+        default=None,
+    )
     p.add_argument(
         "file",
         metavar="script-file",
@@ -952,6 +960,14 @@ def parser():
         action="store_true",
         default=False,
     )
+    p.add_argument(
+        "--daemon",
+        help="Run a server of warm xonsh processes for xonsh-client, "
+        "listening on $XONSH_DAEMON_SOCKET.",
+        dest="daemon",
+        action="store_true",
+        default=False,
+    )
     return p
 
 
@@ -1026,9 +1042,23 @@ def _load_rc_files(shell_kwargs: dict, args, env, execer, ctx):
     # load rc files
     login = shell_kwargs.get("login", True)
     rc, rcd = _get_rc_files(shell_kwargs, args, env)
-    XSH.rc_files = xonshrc_context(
-        rcfiles=rc, rcdirs=rcd, execer=execer, ctx=ctx, env=env, login=login
-    )
+
+    def run_rc():
+        return xonshrc_context(
+            rcfiles=rc, rcdirs=rcd, execer=execer, ctx=ctx, env=env, login=login
+        )
+
+    if (
+        env.get("XONSH_STARTUP_SNAPSHOT")
+        and not env.get("XONSH_INTERACTIVE")
+        and (rc or rcd)
+    ):
+        from xonsh.startup_snapshot import StartupSnapshot
+
+        snapshot = StartupSnapshot(rc, rcd, env=env, ctx=ctx, login=login)
+        XSH.rc_files = snapshot.load(run_rc)
+    else:
+        XSH.rc_files = run_rc()
     events.on_post_rc.fire()
 
 
@@ -1102,6 +1132,10 @@ def premain(argv=None):
         from xonsh.checker.cli import check_no_execute
 
         sys.exit(check_no_execute(args))
+    if args.daemon:
+        from xonsh.daemon.server import serve
+
+        sys.exit(serve())
     shell_kwargs = {
         "shell_type": args.shell_type,
         "completer": False,
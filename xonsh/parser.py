@@ -1,23 +1,123 @@
 """Implements the xonsh parser."""
 
+import functools
+import importlib
+import importlib.util
 import os
 
 from xonsh.lib.lazyasd import lazyobject
 from xonsh.platform import PYTHON_VERSION_INFO
 
+GRAMMARS = ("v310", "v313")
+"""Grammar versions that are selected on the supported Python versions, and
+for which parser tables are generated at build time."""
+
+
+def grammar_version(version_info=None):
+    """Returns the name of the grammar module in ``xonsh.parsers`` used for
+    the given (or current) Python version.
+    """
+    version_info = PYTHON_VERSION_INFO if version_info is None else version_info
+    if version_info >= (3, 13):
+        return "v313"
+    elif version_info > (3, 10):
+        return "v310"
+    elif version_info > (3, 9):
+        return "v39"
+    elif version_info > (3, 8):
+        return "v38"
+    return "v36"
+
+
+def table_module(grammar=None, package="xonsh"):
+    """Returns the name of the yacc table module of a grammar version.
+    Every grammar has its own tables so that stale tables of another Python
+    version are never picked up.
+    """
+    grammar = grammar_version() if grammar is None else grammar
+    name = f"parser_{grammar}_table"
+    return f"{package}.{name}" if package else name
+
+
+def tables_prebuilt(grammar=None):
+    """Whether the yacc tables of the grammar are already generated."""
+    mod = table_module(grammar)
+    path = os.path.join(os.path.dirname(__file__), mod.rpartition(".")[2] + ".py")
+    return os.path.isfile(path)
+
+
+PARSER_BACKENDS = ("ply", "rd", "auto")
+
+
+def rd_parser_available():
+    """Whether the Rust-backed ``xonsh_rd_parser`` package is importable."""
+    return importlib.util.find_spec("xonsh_rd_parser") is not None
+
+
+def parser_backend(environ=None):
+    """Returns the parser backend selected by ``$XONSH_PARSER``, one of
+    ``"ply"``, ``"rd"`` and ``"auto"``. ``"auto"`` only stays selected when
+    the RD parser is available, otherwise it resolves to ``"ply"``.
+    """
+    environ = os.environ if environ is None else environ
+    backend = environ.get("XONSH_PARSER", "").strip().lower()
+    if not backend:
+        backend = "rd" if environ.get("XONSH_RD_PARSER") else "ply"
+    elif backend not in PARSER_BACKENDS:
+        backend = "ply"
+    if backend == "auto" and not rd_parser_available():
+        backend = "ply"
+    return backend
+
+
+@functools.cache
+def _rd_parser_version():
+    from importlib import metadata
+
+    try:
+        return metadata.version("xonsh-rd-parser")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def parser_version(parser=None):
+    """Returns the backend and grammar version of ``parser``, e.g.
+    ``"ply-v310"``, which tell apart the trees of different parsers. The
+    RD parser has its own grammar, named after the version of the
+    ``xonsh_rd_parser`` package. Without ``parser``, describes the backend
+    selected by ``$XONSH_PARSER``.
+    """
+    from xonsh.parsers.fallback import FallbackParser
+
+    if parser is None:
+        backend = parser_backend()
+    elif isinstance(parser, FallbackParser):
+        backend = "auto"
+    elif type(parser).__module__ == "xonsh.parsers.rd_parser":
+        backend = "rd"
+    else:
+        backend = "ply"
+    version = f"{backend}-{grammar_version()}"
+    if backend != "ply":
+        version += f"-rd{_rd_parser_version()}"
+    return version
+
+
+def ply_parser_class():
+    """Returns the PLY parser class of the current grammar version."""
+    return importlib.import_module("xonsh.parsers." + grammar_version()).Parser
+
 
 @lazyobject
 def Parser():
-    if os.environ.get("XONSH_RD_PARSER"):
+    backend = parser_backend()
+    if backend == "rd":
         from xonsh.parsers.rd_parser import Parser as p
-    elif PYTHON_VERSION_INFO >= (3, 13):
-        from xonsh.parsers.v313 import Parser as p
-    elif PYTHON_VERSION_INFO > (3, 10):
-        from xonsh.parsers.v310 import Parser as p
-    elif PYTHON_VERSION_INFO > (3, 9):
-        from xonsh.parsers.v39 import Parser as p
-    elif PYTHON_VERSION_INFO > (3, 8):
-        from xonsh.parsers.v38 import Parser as p
+    elif backend == "auto":
+        from xonsh.parsers.fallback import FallbackParser
+        from xonsh.parsers.rd_parser import Parser as rd
+
+        p = functools.partial(FallbackParser, rd, ply_parser_class())
     else:
-        from xonsh.parsers.v36 import Parser as p
+        p = ply_parser_class()
     return p
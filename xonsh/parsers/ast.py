@@ -388,6 +388,11 @@ class CtxAwareTransformer(NodeTransformer):
         self._nwith = 0
         self.filename = "<xonsh-code>"
         self.debug_level = 0
+        # outcomes of the lookups of names in the root context and in the
+        # user names during the last ``ctxvisit``, which fully determine
+        # the transform of a given tree
+        self.ctx_lookups = {}
+        self.user_lookups = {}
 
     def ctxvisit(
         self, node, inp, ctx, mode="exec", filename=None, debug_level=0, user_names=None
@@ -419,6 +424,8 @@ class CtxAwareTransformer(NodeTransformer):
         self._user_names = user_names or set()
         self.mode = mode
         self._nwith = 0
+        self.ctx_lookups = {}
+        self.user_lookups = {}
         node = self.visit(node)
         del self.lines, self.contexts, self.mode, self._user_names
         self._nwith = 0
@@ -534,7 +541,11 @@ class CtxAwareTransformer(NodeTransformer):
         if not names:
             return True
         inscope = False
+        root = self.contexts[0]
         for ctx in reversed(self.contexts):
+            if ctx is root:
+                for name in names:
+                    self.ctx_lookups.setdefault(name, name in root)
             names -= ctx
             if not names:
                 inscope = True
@@ -632,7 +643,7 @@ class CtxAwareTransformer(NodeTransformer):
         if not isinstance(rhs, Name):
             return False
         name = node.left.id
-        if name in self._user_names:
+        if self._is_user_name(name):
             return False
         for ctx in self.contexts[1:]:
             if name in ctx:
@@ -643,13 +654,16 @@ class CtxAwareTransformer(NodeTransformer):
         cc = XSH.commands_cache
         return bool(cc and cc.locate_binary(name) is not None)
 
+    def _is_user_name(self, name):
+        return self.user_lookups.setdefault(name, name in self._user_names)
+
     def _is_bare_builtin(self, node):
         """Check if node is a bare Name referencing a Python builtin, or Ellipsis.
         Returns False if the name was overridden by user (e.g. ``id = 123``)."""
         import builtins as _builtins
 
         if isinstance(node, Name) and hasattr(_builtins, node.id):
-            if node.id in self._user_names:
+            if self._is_user_name(node.id):
                 return False
             for ctx in self.contexts[1:]:
                 if node.id in ctx:
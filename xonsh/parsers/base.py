@@ -12,6 +12,7 @@ from collections.abc import Iterable, Mapping, Sequence
 from threading import Thread
 
 from xonsh.lib.lazyasd import LazyObject
+from xonsh.parser import table_module
 from xonsh.parsers import ast
 from xonsh.parsers.ast import has_elts, load_attribute_chain, xonsh_call
 from xonsh.parsers.context_check import check_contexts
@@ -453,10 +454,13 @@ class YaccLoader(Thread):
 class BaseParser:
     """A base class that parses the xonsh language."""
 
+    grammar: str | None = None
+    """Name of the grammar version, used to name the yacc tables."""
+
     def __init__(
         self,
         yacc_optimize=True,
-        yacc_table="xonsh.parser_table",
+        yacc_table=None,
         yacc_debug=False,
         outputdir=None,
     ):
@@ -465,7 +469,8 @@ class BaseParser:
         yacc_optimize : bool, optional
             Set to false when unstable and true when parser is stable.
         yacc_table : str, optional
-            Parser module used when optimized.
+            Parser module used when optimized. Defaults to the table module
+            of the grammar version, see ``xonsh.parser.table_module()``.
         yacc_debug : debug, optional
             Dumps extra debug info.
         outputdir : str or None, optional
@@ -668,6 +673,12 @@ class BaseParser:
         for rule in tok_rules:
             self._tok_rule(rule)
 
+        if yacc_table is None:
+            yacc_table = (
+                "xonsh.parser_table"
+                if self.grammar is None
+                else table_module(self.grammar)
+            )
         yacc_kwargs = dict(
             module=self,
             debug=yacc_debug,
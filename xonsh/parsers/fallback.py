@@ -0,0 +1,43 @@
+"""A parser that falls back to another parser for the inputs it rejects."""
+
+
+class FallbackParser:
+    """Parses with a primary parser, e.g. the RD parser, and re-parses every
+    input that it rejects with the fallback parser, e.g. the PLY parser.
+    The lexer and everything else comes from the fallback parser, so that
+    syntax errors and subprocess wrapping behave as with it alone.
+    """
+
+    def __init__(self, primary, fallback, **kwargs):
+        """Parameters
+        ----------
+        primary : callable
+            Creates the primary parser, called without arguments.
+        fallback : callable
+            Creates the fallback parser, called with the remaining keyword
+            arguments.
+        """
+        self.primary = primary()
+        self.fallback = fallback(**kwargs)
+        self.lexer = self.fallback.lexer
+        self.primary_parses = 0
+        self.fallback_parses = 0
+
+    def __getattr__(self, name):
+        if name in ("primary", "fallback"):
+            raise AttributeError(name)
+        return getattr(self.fallback, name)
+
+    def parse(self, s, filename="<code>", mode="exec", debug_level=0):
+        """Returns an abstract syntax tree of xonsh code."""
+        try:
+            tree = self.primary.parse(s, filename=filename, mode=mode)
+        except SyntaxError:
+            # unsupported syntax, or a genuine error that the fallback
+            # parser reports the way the execer expects it.
+            self.fallback_parses += 1
+            return self.fallback.parse(
+                s, filename=filename, mode=mode, debug_level=debug_level
+            )
+        self.primary_parses += 1
+        return tree
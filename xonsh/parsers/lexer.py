@@ -3,12 +3,15 @@
 Written using a hybrid of ``tokenize`` and PLY.
 """
 
+import atexit
 import io
 
 # 'keyword' interferes with ast.keyword
 import keyword as kwmod
 import re
+import threading
 
+from xonsh.lib.collections import LRUCache
 from xonsh.lib.lazyasd import lazyobject
 from xonsh.parsers.ply.lex import LexToken
 from xonsh.parsers.tokenize import (
@@ -438,6 +441,106 @@ def _new_token(type, value, pos):
     return o
 
 
+TOKEN_CACHE_MAX_INPUT = 8192
+"""Inputs longer than this, i.e. anything but interactive buffers and
+single lines, are not kept in the token stream cache."""
+
+
+class TokenStream:
+    """The PLY tokens of one input. The input is lexed at most once, lazily
+    as far as the first reader gets, and the tokens are replayed as fresh
+    ``LexToken`` objects to every reader, even from other threads. If the
+    lexer raises, every reader gets the exception at the same token.
+    """
+
+    def __init__(self, tokens):
+        self._source = tokens
+        self._lock = threading.Lock()
+        self.tokens = []
+        self.error = None
+
+    @property
+    def failed(self):
+        return self.error is not None
+
+    def _advance(self, i):
+        with self._lock:
+            while len(self.tokens) <= i and self._source is not None:
+                try:
+                    tok = next(self._source, None)
+                except Exception as e:
+                    self._source = None
+                    self.error = e
+                    break
+                if tok is None:
+                    self._source = None
+                else:
+                    self.tokens.append((tok.type, tok.value, tok.lineno, tok.lexpos))
+            if i >= len(self.tokens) and self.error is not None:
+                raise self.error
+        return i < len(self.tokens)
+
+    def __iter__(self):
+        tokens = self.tokens
+        i = 0
+        while i < len(tokens) or self._advance(i):
+            typ, value, lineno, lexpos = tokens[i]
+            yield _new_token(typ, value, (lineno, lexpos))
+            i += 1
+
+
+class TokenStreamCache:
+    """Keeps the token streams of recently lexed inputs, by input and lexer
+    options. Lexers with the same options share them: the syntax check on
+    enter and the execution of a buffer lex it once, and so do repeated
+    completions of an unchanged buffer. The completion context parser lexes
+    in tolerant subprocess mode and the execer in strict Python mode, so
+    they do not share streams, and highlighting uses the pygments lexer.
+    """
+
+    def __init__(self, maxsize=32):
+        self._lock = threading.Lock()
+        self._streams = LRUCache(maxsize=maxsize)
+
+    @property
+    def maxsize(self):
+        return self._streams.maxsize
+
+    @maxsize.setter
+    def maxsize(self, value):
+        with self._lock:
+            self._streams.maxsize = value
+            self._streams.trim()
+
+    def stream(self, s, tolerant, pymode=True, is_subproc=False):
+        """Returns the token stream of the input with these lexer options."""
+        if self._streams.maxsize <= 0 or len(s) > TOKEN_CACHE_MAX_INPUT:
+            return get_tokens(s, tolerant, pymode, is_subproc=is_subproc)
+        key = (s, tolerant, pymode, is_subproc)
+        with self._lock:
+            stream = self._streams.get(key)
+            if stream is None or stream.failed:
+                stream = TokenStream(
+                    get_tokens(s, tolerant, pymode, is_subproc=is_subproc)
+                )
+                self._streams[key] = stream
+        return iter(stream)
+
+    def clear(self):
+        with self._lock:
+            self._streams.clear()
+
+    def stats(self):
+        """Returns the hit/miss counters and the current size as a dict."""
+        with self._lock:
+            return self._streams.stats()
+
+
+TOKEN_STREAMS = TokenStreamCache()
+# close the partially read tokenizers while their module globals still exist
+atexit.register(TOKEN_STREAMS.clear)
+
+
 class Lexer:
     """Implements a lexer for the xonsh language."""
 
@@ -482,7 +585,7 @@ class Lexer:
 
     def input(self, s, is_subproc=False):
         """Calls the lexer on the string s."""
-        self._token_stream = get_tokens(
+        self._token_stream = TOKEN_STREAMS.stream(
             s, self._tolerant, self._pymode, is_subproc=is_subproc
         )
 
@@ -0,0 +1,153 @@
+"""Parity harness for the xonsh parsers.
+
+Parses files with both the PLY parser and the RD parser, then reports which
+files produce different trees, along with the per-file parse timings::
+
+    python -m xonsh.parsers.parity [--json] [path ...]
+
+Without paths, the ``*.xsh`` and ``*.py`` files under ``tests/`` are used.
+Both parsers only run their context-free phase, so a bare subprocess line
+that is a syntax error for both counts as parity.
+"""
+
+import argparse
+import ast
+import glob
+import json
+import os
+import sys
+import time
+import typing as tp
+
+
+class ParityResult(tp.NamedTuple):
+    """The outcome of parsing one file with both parsers."""
+
+    path: str
+    status: str
+    """One of ``same``, ``diff``, ``both-error``, ``ply-error`` and
+    ``rd-error``."""
+    ply_time: float
+    rd_time: float
+    detail: str = ""
+
+
+def _dump(tree):
+    # the PLY parser tags constants with its own kinds, e.g. ``num``, which
+    # the Python compiler ignores.
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Constant) and node.kind != "u":
+            node.kind = None
+    return ast.dump(tree, include_attributes=False)
+
+
+def _timed_parse(parser, source, filename):
+    start = time.perf_counter()
+    try:
+        tree = parser.parse(source, filename=filename, mode="exec")
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}", time.perf_counter() - start
+    return tree, "", time.perf_counter() - start
+
+
+def _first_difference(a, b):
+    for i, (x, y) in enumerate(zip(a, b, strict=False)):
+        if x != y:
+            lo = max(i - 40, 0)
+            return f"ply: ...{a[lo : i + 40]}...\nrd:  ...{b[lo : i + 40]}..."
+    return f"lengths differ: {len(a)} != {len(b)}"
+
+
+def compare_file(path, ply_parser, rd_parser):
+    """Parses one file with both parsers and compares the trees."""
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    if not source.endswith("\n"):
+        source += "\n"
+    ply_tree, ply_err, ply_time = _timed_parse(ply_parser, source, path)
+    rd_tree, rd_err, rd_time = _timed_parse(rd_parser, source, path)
+    if ply_tree is None and rd_tree is None:
+        return ParityResult(path, "both-error", ply_time, rd_time)
+    elif ply_tree is None:
+        return ParityResult(path, "ply-error", ply_time, rd_time, ply_err)
+    elif rd_tree is None:
+        return ParityResult(path, "rd-error", ply_time, rd_time, rd_err)
+    ply_dump, rd_dump = _dump(ply_tree), _dump(rd_tree)
+    if ply_dump == rd_dump:
+        return ParityResult(path, "same", ply_time, rd_time)
+    detail = _first_difference(ply_dump, rd_dump)
+    return ParityResult(path, "diff", ply_time, rd_time, detail)
+
+
+def corpus_files(paths=()):
+    """Expands the given files and directories to ``*.xsh`` and ``*.py``
+    files, defaulting to the test suite.
+    """
+    if not paths:
+        root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+        paths = [os.path.join(root, "tests")]
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for ext in ("xsh", "py"):
+                pattern = os.path.join(path, "**", f"*.{ext}")
+                files.extend(glob.glob(pattern, recursive=True))
+        else:
+            files.append(path)
+    return sorted(files)
+
+
+def run_parity(paths=(), ply_parser=None, rd_parser=None):
+    """Compares the parsers over the corpus and returns the results."""
+    if ply_parser is None:
+        from xonsh.parser import ply_parser_class
+
+        ply_parser = ply_parser_class()()
+    if rd_parser is None:
+        from xonsh.parsers.rd_parser import Parser as RDParser
+
+        rd_parser = RDParser()
+    return [compare_file(f, ply_parser, rd_parser) for f in corpus_files(paths)]
+
+
+def summarize(results):
+    """Counts the results per status and sums up the parse timings."""
+    summary = {
+        "files": len(results),
+        "ply_time": sum(r.ply_time for r in results),
+        "rd_time": sum(r.rd_time for r in results),
+    }
+    for r in results:
+        summary[r.status] = summary.get(r.status, 0) + 1
+    return summary
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m xonsh.parsers.parity",
+        description="Compares the trees of the PLY and RD parsers.",
+    )
+    parser.add_argument("paths", nargs="*", help="files or directories to parse")
+    parser.add_argument("--json", action="store_true", help="report as JSON")
+    ns = parser.parse_args(args)
+    results = run_parity(ns.paths)
+    summary = summarize(results)
+    if ns.json:
+        data = {"summary": summary, "files": [r._asdict() for r in results]}
+        print(json.dumps(data, indent=1))
+    else:
+        for r in results:
+            print(f"{r.status:<10} {r.ply_time:8.4f}s {r.rd_time:8.4f}s  {r.path}")
+            if r.detail and r.status != "both-error":
+                print("    " + r.detail.replace("\n", "\n    "))
+        print(
+            ", ".join(
+                f"{k}: {v:.3f}s" if isinstance(v, float) else f"{k}: {v}"
+                for k, v in summary.items()
+            )
+        )
+    return 1 if summary.get("diff") or summary.get("rd-error") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -69,10 +69,24 @@ class Parser:
             raise ex
         # hack for getting modes right
         if mode == "single":
-            assert isinstance(tree, ast.Module)
+            if not isinstance(tree, ast.Module):
+                raise self._mode_error(filename, mode)
             tree = ast.Interactive(body=tree.body)
         elif mode == "eval":
-            assert isinstance(tree, ast.Module)
-            assert len(tree.body) == 1
+            if not (
+                isinstance(tree, ast.Module)
+                and len(tree.body) == 1
+                and isinstance(tree.body[0], ast.Expr)
+            ):
+                raise self._mode_error(filename, mode)
             tree = ast.Expression(body=tree.body[0].value)
         return tree
+
+    def _mode_error(self, filename, mode):
+        """The error for a tree that does not fit ``mode``, a SyntaxError
+        so that the fallback parser gets the input.
+        """
+        line = self._source.partition("\n")[0]
+        ex = SyntaxError(f"invalid syntax in {mode} mode", (filename, 1, 1, line))
+        ex.loc = Location(filename, 1, 1)
+        return ex
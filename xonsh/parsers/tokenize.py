@@ -17,6 +17,7 @@ Original file credits:
 import builtins
 import codecs
 import collections
+import functools
 import io
 import itertools
 import re
@@ -422,6 +423,7 @@ def getPseudoTokenWithoutIO(is_subproc=False):
     return Whitespace + group(PseudoExtras, Number, Funny, ContStr, Name_RE)
 
 
+@functools.cache
 def _compile(expr):
     return re.compile(expr, re.UNICODE)
 
@@ -663,6 +665,14 @@ _fstring_start_tokens = frozenset(
     if any(c in t.split("'")[0].split('"')[0].lower() for c in "f")
 )
 
+# Dispatch tables on the first character of a token, these rule out the
+# candidates of the more expensive checks for most tokens.
+_fstring_start_initials = frozenset(t[0] for t in _fstring_start_tokens)
+_fstring_start_lengths = tuple(
+    sorted({len(t) for t in _fstring_start_tokens}, reverse=True)
+)
+_searchpath_initials = frozenset("rgpfm@`")
+
 
 class TokenError(Exception):
     pass
@@ -925,7 +935,6 @@ def _tokenize(
     contline = None
     indents = [0]
 
-    # Pre-compile pseudo-token regexes once instead of per-token.
     _get = getPseudoToken if tokenize_ioredirects else getPseudoTokenWithoutIO
     _pseudo_re = _compile(_get(is_subproc=False))
     _pseudo_re_subproc = _compile(_get(is_subproc=True))
@@ -1084,12 +1093,14 @@ def _tokenize(
             # Needed because the pseudomatch regex expects complete
             # string content on one line, but PEP 701 allows multi-line
             # expressions inside {}, so f"{\n is valid.
-            if fstring_stack is not None and (
-                not fstring_stack or fstring_stack[-1]["in_expr"]
+            if (
+                fstring_stack is not None
+                and (not fstring_stack or fstring_stack[-1]["in_expr"])
+                and line[pos] in _fstring_start_initials
             ):
                 _fs_tok = None
-                for _fs_end in range(min(pos + 5, max), pos, -1):
-                    _fs_candidate = line[pos:_fs_end]
+                for _fs_len in _fstring_start_lengths:
+                    _fs_candidate = line[pos : pos + _fs_len]
                     if _fs_candidate in _fstring_start_tokens:
                         _fs_tok = _fs_candidate
                         break
@@ -1311,7 +1322,9 @@ def _tokenize(
                         stashed = None
                     yield TokenInfo(COMMENT, token, spos, epos, line)
                 # Xonsh-specific Regex Globbing
-                elif re.match(SearchPath, token):
+                elif initial in _searchpath_initials and _compile(SearchPath).match(
+                    token
+                ):
                     yield TokenInfo(SEARCHPATH, token, spos, epos, line)
                 elif token in triple_quoted:
                     if fstring_stack is not None and token in _fstring_start_tokens:
@@ -19,6 +19,8 @@ _HAS_TYPE_PARAMS = PYTHON_VERSION_INFO >= (3, 12)
 
 
 class Parser(FStringRules, ThreeNineParser):
+    grammar = "v310"
+
     # ---- PEP 695: type parameter syntax (Python 3.12+) ----
 
     def p_simple_stmt_type(self, p):
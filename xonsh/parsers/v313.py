@@ -22,6 +22,8 @@ from xonsh.parsers.v310 import Parser as ThreeTenParser
 
 
 class Parser(ThreeTenParser):
+    grammar = "v313"
+
     def p_eval_input(self, p):
         """eval_input : testlist newlines_opt"""
         p1 = p[1]
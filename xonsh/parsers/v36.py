@@ -7,10 +7,12 @@ from xonsh.parsers.base import BaseParser, ensure_has_elts, lopen_loc, store_ctx
 class Parser(BaseParser):
     """A Python v3.6 compliant parser for the xonsh language."""
 
+    grammar = "v36"
+
     def __init__(
         self,
         yacc_optimize=True,
-        yacc_table="xonsh.parser_table",
+        yacc_table=None,
         yacc_debug=False,
         outputdir=None,
     ):
@@ -20,7 +22,8 @@ class Parser(BaseParser):
         yacc_optimize : bool, optional
             Set to false when unstable and true when parser is stable.
         yacc_table : str, optional
-            Parser module used when optimized.
+            Parser module used when optimized, defaults to the tables of
+            this grammar version.
         yacc_debug : debug, optional
             Dumps extra debug info.
         outputdir : str or None, optional
@@ -8,10 +8,12 @@ from xonsh.parsers.v36 import Parser as ThreeSixParser
 class Parser(ThreeSixParser):
     """A Python v3.8 compliant parser for the xonsh language."""
 
+    grammar = "v38"
+
     def __init__(
         self,
         yacc_optimize=True,
-        yacc_table="xonsh.parser_table",
+        yacc_table=None,
         yacc_debug=False,
         outputdir=None,
     ):
@@ -20,7 +22,8 @@ class Parser(ThreeSixParser):
         yacc_optimize : bool, optional
             Set to false when unstable and true when parser is stable.
         yacc_table : str, optional
-            Parser module used when optimized.
+            Parser module used when optimized, defaults to the tables of
+            this grammar version.
         yacc_debug : debug, optional
             Dumps extra debug info.
         outputdir : str or None, optional
@@ -12,6 +12,8 @@ from xonsh.parsers.v38 import Parser as ThreeEightParser
 
 
 class Parser(ThreeEightParser):
+    grammar = "v39"
+
     def p_subscript_test(self, p):
         """subscript : test"""
         p1 = p[1]
@@ -0,0 +1,305 @@
+"""Watches directories with the inotify API of Linux, through ctypes."""
+
+import ctypes
+import os
+import select
+import struct
+import threading
+
+from xonsh.lib.lazyasd import lazyobject
+from xonsh.platform import LIBC, ON_LINUX
+
+IN_ATTRIB = 0x00000004
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+
+DIR_EVENTS = (
+    IN_ATTRIB
+    | IN_CREATE
+    | IN_DELETE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+)
+"""The events that change which commands a directory holds: files created,
+deleted, renamed or made executable, and the directory itself removed."""
+
+_EVENT = struct.Struct("iIII")
+
+
+@lazyobject
+def _inotify():
+    """The inotify functions of libc, with their signatures."""
+    init1 = LIBC.inotify_init1
+    init1.argtypes = [ctypes.c_int]
+    add_watch = LIBC.inotify_add_watch
+    add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    rm_watch = LIBC.inotify_rm_watch
+    rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    return init1, add_watch, rm_watch
+
+
+def available():
+    """Whether inotify can be used on this platform."""
+    return bool(ON_LINUX) and LIBC is not None and hasattr(LIBC, "inotify_init1")
+
+
+def _symlinks(path, limit=40):
+    """Returns the symbolic links that resolving ``path`` goes through, in
+    the order they are met, including the ones of the links' targets.
+    """
+    links = []
+    resolved = os.sep
+    parts = os.path.abspath(path).split(os.sep)[::-1]
+    while parts:
+        name = parts.pop()
+        if name in ("", "."):
+            continue
+        if name == "..":
+            resolved = os.path.dirname(resolved)
+            continue
+        current = os.path.join(resolved, name)
+        try:
+            target = os.readlink(current)
+        except OSError:
+            # not a link, or missing
+            resolved = current
+            continue
+        links.append(current)
+        if len(links) > limit:
+            break
+        if os.path.isabs(target):
+            resolved = os.sep
+        parts.extend(target.split(os.sep)[::-1])
+    return links
+
+
+class DirWatcher:
+    """Watches directories from a daemon thread and collects the ones that
+    changed in :attr:`changed`, so that checking for changes costs no
+    system call.
+
+    A directory that is removed or renamed is reported as changed, and is
+    no longer watched. inotify follows symbolic links, so a path is watched
+    at its target: :meth:`watch_links` watches the links themselves.
+    """
+
+    def __init__(self):
+        init1, self._add_watch, self._rm_watch = _inotify
+        fd = init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError("inotify_init1 failed")
+        self._fd = fd
+        self._wds = {}
+        self._paths = {}
+        self._links = {}
+        """The watches of the directories that hold links, to the names of
+        the links and the paths that resolve through them."""
+        self._linked = set()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.changed = set()
+        """The watched directories that changed since :meth:`pop_changed`."""
+        self.pid = os.getpid()
+        """The process of the thread, which forked children do not have."""
+        self._stop_r, self._stop_w = os.pipe()
+        self._thread = threading.Thread(
+            target=self._run, name="xonsh-dir-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def watch(self, path):
+        """Watches the directory ``path``, returns whether it could. Watch a
+        directory before listing it, so that no change is missed.
+        """
+        if self.pid != os.getpid():
+            self.close()
+        with self._lock:
+            if self._closed:
+                return False
+            if path in self._paths:
+                return True
+            wd = self._add_watch(self._fd, os.fsencode(path), DIR_EVENTS | IN_ONLYDIR)
+            if wd < 0:
+                return False
+            other = self._wds.get(wd)
+            if other is not None and other != path:
+                # the same directory under another name
+                self._paths.pop(other, None)
+            self._wds[wd] = path
+            self._paths[path] = wd
+        return True
+
+    def watch_links(self, path):
+        """Watches the symbolic links that resolving ``path`` goes through,
+        from the directories that hold them, and returns whether it could.
+        A link that is re-pointed or removed reports ``path`` as changed,
+        whose links are then no longer watched.
+        """
+        if self.pid != os.getpid():
+            self.close()
+        links = _symlinks(path)
+        with self._lock:
+            if self._closed:
+                return False
+            if path in self._linked:
+                return True
+            for link in links:
+                parent, name = os.path.split(link)
+                wd = self._add_watch(
+                    self._fd, os.fsencode(parent), DIR_EVENTS | IN_ONLYDIR
+                )
+                if wd < 0:
+                    stale = []
+                    self._forget_links(path, stale)
+                    self._rm_stale(stale)
+                    return False
+                self._links.setdefault(wd, {}).setdefault(name, set()).add(path)
+            self._linked.add(path)
+        return True
+
+    def unwatch(self, path):
+        """Stops watching the directory ``path``, and its links."""
+        if self.pid != os.getpid():
+            self.close()
+        with self._lock:
+            if self._closed:
+                return
+            stale = []
+            wd = self._paths.pop(path, None)
+            if wd is not None:
+                del self._wds[wd]
+                stale.append(wd)
+            self._forget_links(path, stale)
+            self._rm_stale(stale)
+
+    def watching(self, path):
+        """Whether ``path`` is watched."""
+        return path in self._paths
+
+    def watched(self):
+        """The watched directories, and the paths whose links are watched."""
+        with self._lock:
+            return set(self._paths) | self._linked
+
+    def pop_changed(self):
+        """Returns the directories that changed and forgets them."""
+        with self._lock:
+            changed, self.changed = self.changed, set()
+        return changed
+
+    def close(self):
+        """Stops the thread, which closes the inotify instance. Closing
+        again does nothing, and nothing is watched once closed.
+
+        In a forked child, which has the file descriptors but not the
+        thread, the file descriptors are closed right away.
+        """
+        if self.pid != os.getpid():
+            # the thread may have held the lock when the process forked
+            self._lock = threading.Lock()
+            self.pid = os.getpid()
+            with self._lock:
+                if not self._closed:
+                    self._closed = True
+                    self._close_fds()
+            return
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            os.write(self._stop_w, b"x")
+
+    def _close_fds(self):
+        self._wds.clear()
+        self._paths.clear()
+        self._links.clear()
+        self._linked.clear()
+        for fd in (self._fd, self._stop_r, self._stop_w):
+            os.close(fd)
+
+    def _forget_links(self, path, stale):
+        """Stops watching the links of ``path``, and adds the watches that
+        no link needs any more to ``stale``. Called with the lock held.
+        """
+        if path not in self._linked:
+            return
+        self._linked.discard(path)
+        for wd, names in list(self._links.items()):
+            for name, paths in list(names.items()):
+                paths.discard(path)
+                if not paths:
+                    del names[name]
+            if not names:
+                del self._links[wd]
+                stale.append(wd)
+
+    def _rm_stale(self, stale):
+        """Removes the watches in ``stale`` that are not used any more.
+        Called with the lock held.
+        """
+        for wd in stale:
+            if wd not in self._wds and wd not in self._links:
+                self._rm_watch(self._fd, wd)
+
+    def _run(self):
+        try:
+            while True:
+                ready, _, _ = select.select([self._fd, self._stop_r], [], [])
+                if self._stop_r in ready:
+                    break
+                try:
+                    data = os.read(self._fd, 65536)
+                except BlockingIOError:
+                    continue
+                self._handle(data)
+        finally:
+            with self._lock:
+                self._closed = True
+                self._close_fds()
+
+    def _handle(self, data):
+        stale = []
+        with self._lock:
+            offset = 0
+            while offset + _EVENT.size <= len(data):
+                wd, mask, _, size = _EVENT.unpack_from(data, offset)
+                name = data[offset + _EVENT.size : offset + _EVENT.size + size]
+                offset += _EVENT.size + size
+                if mask & IN_Q_OVERFLOW:
+                    # events were dropped
+                    self.changed.update(self._paths)
+                    self.changed.update(self._linked)
+                    continue
+                links = self._links.get(wd)
+                if links:
+                    if mask & (IN_IGNORED | IN_MOVE_SELF):
+                        # the directory of the links is gone
+                        linked = set().union(*links.values())
+                    else:
+                        linked = links.get(os.fsdecode(name.rstrip(b"\0")), ())
+                    for path in tuple(linked):
+                        self.changed.add(path)
+                        self._forget_links(path, stale)
+                path = self._wds.get(wd)
+                if path is None:
+                    continue
+                self.changed.add(path)
+                if mask & IN_IGNORED:
+                    # removed, or on a file system that was unmounted
+                    del self._wds[wd]
+                    del self._paths[path]
+                elif mask & IN_MOVE_SELF:
+                    # the watch follows the directory, not its path
+                    del self._wds[wd]
+                    del self._paths[path]
+                    stale.append(wd)
+            self._rm_stale(stale)
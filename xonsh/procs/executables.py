@@ -2,10 +2,12 @@
 
 import itertools
 import os
+import threading
 import time
 from pathlib import Path
 
 from xonsh.built_ins import XSH
+from xonsh.lib.collections import LRUCache
 from xonsh.lib.itertools import unique_everseen
 from xonsh.platform import ON_WINDOWS
 
@@ -232,24 +234,124 @@ def _cache_debug(msg):
     print_above_prompt(msg)
 
 
-def locate_file_in_path_env(name, env=None, check_executable=False, use_pathext=False):
-    """Search file name in ``$PATH`` and return full path.
+_MISSING = object()
 
-    Compromise. There is no way to get case sensitive file name without listing all files.
-    If the file name is ``CaMeL.exe`` and we found that ``camel.EXE`` exists there is no way
-    to get back the case sensitive name. We don't want to read the list of files in all ``$PATH``
-    directories because of performance reasons. So we're ok to get existent
-    but case insensitive (or different) result from resolver.
-    May be in the future file systems as well as Python Path will be smarter to get the case sensitive name.
-    The task for reading and returning case sensitive filename we give to completer in interactive mode
-    with ``commands_cache``.
+
+class ExecutableCache:
+    """Remembers where names resolve in ``$PATH``, including the names that
+    are not found, for :func:`locate_file_in_path_env`. This is what
+    resolves the commands to run, and the commands that highlighting checks.
+
+    There is a single invalidation policy: all the entries are dropped when
+    ``$PATH``, ``$PATHEXT`` or ``$XONSH_COMMANDS_CACHE_READ_DIR_ONCE``
+    change, or when a ``$PATH`` directory changes. The mtime of a directory
+    changes when a file is added, removed or renamed in it. Validating the
+    cache therefore costs one stat per ``$PATH`` entry instead of a stat per
+    entry and name variant. When the commands cache watches the ``$PATH``
+    directories (``$XONSH_COMMANDS_CACHE_WATCH``) it costs no stat at all,
+    and :class:`xonsh.commands_cache.CommandsCache` calls :meth:`invalidate`
+    on the changes it sees.
+
+    Names that exist but are not executable are not remembered, since
+    making them executable leaves the mtime of the directory alone.
     """
-    env = env if env is not None else XSH.env
-    env_path = env.get("PATH", [])
-    paths = tuple(clear_paths(env_path))
-    possible_names = get_possible_names(name, env) if use_pathext else [name]
-    t0 = time.perf_counter()
 
+    def __init__(self, maxsize=512):
+        self._lock = threading.Lock()
+        self._entries = LRUCache(maxsize=maxsize)
+        self._config = None
+        self._dirs = None
+        self._paths: tuple[str, ...] = ()
+        self._generation = 0
+        self.invalidations = 0
+        self.watcher = None
+        """The :class:`xonsh.platforms.inotify.DirWatcher` of the commands
+        cache, if any."""
+
+    @property
+    def maxsize(self):
+        return self._entries.maxsize
+
+    @maxsize.setter
+    def maxsize(self, value):
+        with self._lock:
+            self._entries.maxsize = value
+            self._entries.trim()
+
+    def validate(self, env):
+        """Drops the entries if the resolution may have changed. Returns the
+        directories of ``$PATH``, and the generation to pass to :meth:`put`.
+        """
+        raw = tuple(env.get("PATH", []))
+        config = (raw, tuple(env.get("PATHEXT", [])), _get_stable_prefixes())
+        watcher = self.watcher
+        with self._lock:
+            if (
+                config == self._config
+                and self._dirs is not None
+                and watcher is not None
+                and not watcher.changed
+                and all(map(watcher.watching, self._paths))
+            ):
+                return self._paths, self._generation
+        dirs = []
+        for path in raw:
+            try:
+                st = os.stat(path)
+            except (OSError, ValueError):
+                dirs.append(None)
+            else:
+                dirs.append((st.st_ino, st.st_mtime_ns))
+        dirs = tuple(dirs)
+        with self._lock:
+            if config != self._config or dirs != self._dirs:
+                self._clear()
+                self._config = config
+                self._dirs = dirs
+                self._paths = tuple(clear_paths(raw))
+            return self._paths, self._generation
+
+    def get(self, key):
+        """Returns the resolution of ``key``, or ``_MISSING``."""
+        with self._lock:
+            return self._entries.get(key, _MISSING)
+
+    def put(self, key, result, generation):
+        """Remembers the resolution of ``key``, unless the entries were
+        dropped since ``generation``.
+        """
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = result
+
+    def _clear(self):
+        if self._config is not None:
+            self.invalidations += 1
+        self._entries.clear(reset_stats=False)
+        self._dirs = None
+        self._generation += 1
+
+    def invalidate(self):
+        """Drops the entries."""
+        with self._lock:
+            self._clear()
+
+    def stats(self):
+        """Returns the hit/miss counters, the current size and the number of
+        invalidations as a dict.
+        """
+        with self._lock:
+            return dict(self._entries.stats(), invalidations=self.invalidations)
+
+
+EXECUTABLE_CACHE = ExecutableCache()
+
+
+def _search_path_env(paths, possible_names, check_executable, t0):
+    """Returns the first match of ``possible_names`` in ``paths``, and whether
+    the result can be cached.
+    """
+    cacheable = True
     for path, possible_name in itertools.product(paths, possible_names):
         # Fast path: stable directory cache (System32 etc.) — O(1) hash lookup
         cached = _cached_dir_contains(path, possible_name)
@@ -261,9 +363,10 @@ def locate_file_in_path_env(name, env=None, check_executable=False, use_pathext=
             found, populated = cached
             # File exists per cache — verify it's a regular file and executable
             filepath = Path(path) / possible_name
-            if not is_file(filepath) or (
-                check_executable and not is_executable(filepath, check_file_exist=False)
-            ):
+            if not is_file(filepath):
+                continue
+            if check_executable and not is_executable(filepath, check_file_exist=False):
+                cacheable = False
                 continue
             result = str(filepath)
             prefix = "populate cache, get from cache" if populated else "get from cache"
@@ -271,23 +374,66 @@ def locate_file_in_path_env(name, env=None, check_executable=False, use_pathext=
                 f"xonsh-commands-cache: {prefix} `{result}` "
                 f"({time.perf_counter() - t0:.4f} sec)"
             )
-            return result
+            return result, cacheable
         # Not a cached dir — original stat-based check
         filepath = Path(path) / possible_name
         try:
-            if not is_file(filepath) or (
-                check_executable and not is_executable(filepath, check_file_exist=False)
-            ):
+            if not is_file(filepath):
+                continue
+            if check_executable and not is_executable(filepath, check_file_exist=False):
+                cacheable = False
                 continue
             result = str(filepath)
             _cache_debug(
                 f"xonsh-commands-cache: get from disk `{result}` "
                 f"({time.perf_counter() - t0:.4f} sec)"
             )
-            return result
+            return result, cacheable
         except PermissionError:
+            cacheable = False
             continue
+    return None, cacheable
+
+
+def locate_file_in_path_env(name, env=None, check_executable=False, use_pathext=False):
+    """Search file name in ``$PATH`` and return full path.
 
-    _cache_debug(
-        f"xonsh-commands-cache: not found `{name}` ({time.perf_counter() - t0:.4f} sec)"
-    )
+    Compromise. There is no way to get case sensitive file name without listing all files.
+    If the file name is ``CaMeL.exe`` and we found that ``camel.EXE`` exists there is no way
+    to get back the case sensitive name. We don't want to read the list of files in all ``$PATH``
+    directories because of performance reasons. So we're ok to get existent
+    but case insensitive (or different) result from resolver.
+    May be in the future file systems as well as Python Path will be smarter to get the case sensitive name.
+    The task for reading and returning case sensitive filename we give to completer in interactive mode
+    with ``commands_cache``.
+
+    The results are remembered in :data:`EXECUTABLE_CACHE` while ``$PATH`` and
+    its directories stay the same, unless ``$ENABLE_COMMANDS_CACHE`` is off.
+    """
+    env = env if env is not None else XSH.env
+    t0 = time.perf_counter()
+    cache = EXECUTABLE_CACHE
+    use_cache = cache.maxsize > 0 and env.get("ENABLE_COMMANDS_CACHE", True)
+    if use_cache:
+        paths, generation = cache.validate(env)
+        key = (name, check_executable, use_pathext)
+        result = cache.get(key)
+        if result is not _MISSING:
+            found = f"get `{result}`" if result else f"not found `{name}`"
+            _cache_debug(
+                f"xonsh-commands-cache: {found} from resolution cache "
+                f"({time.perf_counter() - t0:.4f} sec)"
+            )
+            return result
+    else:
+        paths = tuple(clear_paths(env.get("PATH", [])))
+    possible_names = get_possible_names(name, env) if use_pathext else [name]
+    result, cacheable = _search_path_env(paths, possible_names, check_executable, t0)
+    if use_cache and cacheable:
+        cache.put(key, result, generation)
+    if result is None:
+        _cache_debug(
+            f"xonsh-commands-cache: not found `{name}` "
+            f"({time.perf_counter() - t0:.4f} sec)"
+        )
+    return result
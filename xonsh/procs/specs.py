@@ -723,12 +723,16 @@ class SubprocSpec:
 
     def prep_env_subproc(self, kwargs):
         """Prepares the environment to use in the subprocess."""
+        if XSH.env.get("XONSH_SHARE_TYPED_ENV"):
+            from xonsh.environ import save_typed_env_to_file
+
+            save_typed_env_to_file(XSH.env, XSH.sessionid)
         with XSH.env.swap(self.env) as env:
             denv = env.detype()
         if xp.ON_WINDOWS:
             # Over write prompt variable as xonsh's $PROMPT does
             # not make much sense for other subprocs
-            denv["PROMPT"] = "$P$G"
+            denv = dict(denv, PROMPT="$P$G")
         kwargs["env"] = denv
 
     def prep_preexec_fn(self, kwargs, pipeline_group=None):
@@ -58,8 +58,7 @@ from xonsh.prompt.base import MultiPromptField, PromptField, PromptFields
 
 
 def _get_sp_output(xsh, *args: str, **kwargs) -> str:
-    denv = xsh.env.detype()
-    denv.update({"GIT_OPTIONAL_LOCKS": "0"})
+    denv = dict(xsh.env.detype(), GIT_OPTIONAL_LOCKS="0")
 
     kwargs.update(
         dict(
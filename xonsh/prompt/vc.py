@@ -268,10 +268,9 @@ def hg_dirty_working_directory():
     """
     env = XSH.env
     cwd = env["PWD"]
-    denv = env.detype()
     vcbt = env["VC_BRANCH_TIMEOUT"]
     # Override user configurations settings and aliases
-    denv["HGRCPATH"] = ""
+    denv = dict(env.detype(), HGRCPATH="")
     try:
         s = subprocess.check_output(
             ["hg", "identify", "--id"],
@@ -14,7 +14,7 @@ from xonsh.codecache import (
     get_cache_filename,
     run_compiled_code,
     should_use_cache,
-    update_cache,
+    update_code_cache,
 )
 from xonsh.completer import Completer
 from xonsh.events import events
@@ -587,7 +587,7 @@ class BaseShell:
                 compile_empty_tree=False,
             )
             if _cache:
-                update_cache(code, cachefname)
+                update_code_cache(code, cachefname)
             self.reset_buffer()
         except SyntaxError:
             partial_string_info = check_for_partial_string(src)
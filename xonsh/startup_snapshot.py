@@ -0,0 +1,361 @@
+"""Snapshots of the changes that the rc files made to a session.
+
+When ``$XONSH_STARTUP_SNAPSHOT`` is set, a non-interactive xonsh records
+what running its rc files changed: the environment variables, aliases,
+names of the execution context, ``sys.path`` entries, completers, event
+handlers and loaded xontribs. The next launch with the same rc files, the
+same environment and the same xonsh and Python versions applies the
+recorded changes instead of running the rc files.
+
+The files that the rc files source and the modules they import are
+recorded too, with their modification time and size, and the snapshot is
+not used once one of them changed. Files that the rc files only read,
+e.g. through ``open()`` or a subprocess, are not tracked: their changes
+are not seen until the rc files or the environment change.
+
+Every change is pickled, functions and classes by reference. The rc files
+are not snapshot if they change anything that cannot be restored this way,
+e.g. if they define an alias or event handler in the rc file itself.
+"""
+
+import contextlib
+import hashlib
+import importlib
+import io
+import os
+import pickle
+import sys
+import types
+
+from xonsh import __version__ as XONSH_VERSION
+from xonsh.built_ins import XSH
+from xonsh.codecache import _check_cache_versions, _touch, prune_cache
+from xonsh.environ import EnvPath, _rc_script_files
+from xonsh.events import AbstractEvent, events
+from xonsh.platform import ON_WINDOWS, PYTHON_VERSION_INFO_BYTES
+from xonsh.tools import print_warning
+
+MAX_SNAPSHOTS = 16
+"""The number of snapshots kept, the least recently used are removed."""
+
+VOLATILE_VARS = frozenset({"PWD", "OLDPWD", "_", "SHLVL"})
+"""Variables that are left out of the key of a snapshot, so that it is used
+from any directory.
+"""
+
+
+def snapshot_dir():
+    """The directory of the startup snapshots."""
+    return os.path.join(XSH.env["XONSH_CACHE_DIR"], "xonsh_startup_snapshot")
+
+
+class _Pickler(pickle.Pickler):
+    """Pickles the modules, by name."""
+
+    def reducer_override(self, obj):
+        if isinstance(obj, types.ModuleType):
+            if sys.modules.get(obj.__name__) is not obj:
+                raise pickle.PicklingError(f"module {obj.__name__} is not imported")
+            return importlib.import_module, (obj.__name__,)
+        return NotImplemented
+
+
+def _dumps(obj):
+    f = io.BytesIO()
+    _Pickler(f).dump(obj)
+    return f.getvalue()
+
+
+def _fingerprint(value):
+    """What tells whether ``value`` was changed in place."""
+    if isinstance(value, EnvPath):
+        return value.version
+    if isinstance(value, (list, dict, set)):
+        return value.copy()
+    return None
+
+
+def _items(mapping):
+    return {k: (v, _fingerprint(v)) for k, v in mapping.items()}
+
+
+def _changes(before, after):
+    """Returns the items of ``after`` that are new or changed since
+    ``before``, an :func:`_items` dict, and the keys that were removed.
+    """
+    changed = {}
+    for key, value in after.items():
+        old = before.get(key)
+        if old is None or old[0] is not value or old[1] != _fingerprint(value):
+            changed[key] = value
+    return changed, [key for key in before if key not in after]
+
+
+def _stamp(filename):
+    """What tells whether the file changed, ``None`` if it is missing."""
+    try:
+        st = os.stat(filename)
+    except (OSError, ValueError):
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+@contextlib.contextmanager
+def _recording_sources(execer, filenames):
+    """Adds the name of the files that ``execer`` parses, e.g. those run by
+    ``source``, to the ``filenames`` set.
+    """
+    if execer is None:
+        yield
+        return
+    parse = execer.parse
+
+    def recording_parse(input, ctx, mode="exec", filename=None, **kwargs):
+        if filename is not None:
+            filenames.add(filename)
+        return parse(input, ctx, mode=mode, filename=filename, **kwargs)
+
+    execer.parse = recording_parse
+    try:
+        yield
+    finally:
+        del execer.parse
+
+
+def _handlers():
+    return {
+        (name, id(handler)): (name, handler)
+        for name, event in vars(events).items()
+        if isinstance(event, AbstractEvent)
+        for handler in event
+    }
+
+
+class _SessionState:
+    """The parts of the session that the rc files may change."""
+
+    def __init__(self, env, ctx):
+        aliases = XSH.aliases
+        self.env = _items(env._d._global)
+        self.aliases = _items(aliases._raw)
+        self.docs = dict(aliases._docs)
+        self.ctx = _items(ctx)
+        self.sys_path = list(sys.path)
+        self.modules = set(sys.modules)
+        self.sources = set()
+        self.handlers = _handlers()
+        completers = XSH._completers
+        self.completers = None if completers is None else list(completers.items())
+
+    def changes(self, env, ctx):
+        """Returns the changes made to the session since this state."""
+        aliases = XSH.aliases
+        env_set, env_del = _changes(self.env, env._d._global)
+        alias_set, alias_del = _changes(self.aliases, aliases._raw)
+        for key, doc in aliases._docs.items():
+            if self.docs.get(key) != doc and key in aliases._raw:
+                alias_set[key] = aliases._raw[key]
+        ctx_set, ctx_del = _changes(self.ctx, ctx)
+        ctx_set.pop("__builtins__", None)
+        handlers = _handlers()
+        completers = XSH._completers
+        if completers is not None:
+            completers = list(completers.items())
+            if completers == self.completers:
+                completers = None
+        xontribs = {
+            name.split(".")[1]
+            for name in set(sys.modules) - self.modules
+            if name.startswith("xontrib.")
+        }
+        return {
+            "xontribs": sorted(xontribs),
+            "env": env_set,
+            "env_del": env_del,
+            "aliases": {k: (v, aliases._docs.get(k)) for k, v in alias_set.items()},
+            "aliases_del": alias_del,
+            "ctx": ctx_set,
+            "ctx_del": ctx_del,
+            "sys_path": [
+                p for p in sys.path if p not in self.sys_path and isinstance(p, str)
+            ],
+            "handlers": [h for k, h in handlers.items() if k not in self.handlers],
+            "handlers_del": [h for k, h in self.handlers.items() if k not in handlers],
+            "completers": completers,
+        }
+
+    def depends(self, rcfiles):
+        """Returns the files sourced and the modules imported since this
+        state, other than ``rcfiles``, with their :func:`_stamp`.
+        """
+        filenames = set(self.sources)
+        for name in set(sys.modules) - self.modules:
+            filename = getattr(sys.modules[name], "__file__", None)
+            if isinstance(filename, str):
+                filenames.add(filename)
+        filenames = {os.path.abspath(f) for f in filenames}
+        filenames.difference_update(os.path.abspath(f) for f in rcfiles)
+        stamps = ((f, _stamp(f)) for f in sorted(filenames))
+        return [(f, st) for f, st in stamps if st is not None]
+
+
+def _unpicklable(changes):
+    """Describes the first change that cannot be pickled."""
+    for kind, value in changes.items():
+        items = value.items() if isinstance(value, dict) else enumerate(value or ())
+        for key, item in items:
+            try:
+                _dumps(item)
+            except Exception as e:
+                return f"{kind} {key!r}: {e}"
+    return "?"
+
+
+class StartupSnapshot:
+    """The snapshot of the changes made by a set of rc files.
+
+    Parameters
+    ----------
+    rcfiles, rcdirs : sequences of str
+        The rc files and the rc directories, as given to
+        :func:`xonsh.environ.xonshrc_context`.
+    env : Env
+        The environment, before the rc files are loaded.
+    ctx : dict
+        The execution context the rc files are run in.
+    login : bool
+        Whether the session is a login shell.
+    """
+
+    def __init__(self, rcfiles, rcdirs, env, ctx, login=True):
+        self.env = env
+        self.ctx = ctx
+        self.files = _rc_script_files(rcfiles, rcdirs)
+        self.key = self._key(login)
+        self.filename = os.path.join(snapshot_dir(), self.key)
+
+    def _key(self, login):
+        h = hashlib.sha256()
+        for part in (XONSH_VERSION, sys.version, sys.executable, repr(login)):
+            h.update(part.encode() + b"\0")
+        for filename in self.files:
+            h.update(os.path.abspath(filename).encode() + b"\0")
+            with contextlib.suppress(OSError), open(filename, "rb") as f:
+                h.update(hashlib.sha256(f.read()).digest())
+        for key, val in sorted(self.env.detype().items()):
+            if key not in VOLATILE_VARS:
+                h.update(f"{key}={val}\0".encode(errors="surrogateescape"))
+        return h.hexdigest()
+
+    def load(self, run_rc):
+        """Restores the snapshot if there is one, otherwise calls ``run_rc()``
+        and saves what it changed. Returns the loaded rc files.
+        """
+        rc_files = self.restore()
+        if rc_files is not None:
+            return rc_files
+        state = _SessionState(self.env, self.ctx)
+        with _recording_sources(XSH.execer, state.sources):
+            rc_files = run_rc()
+        if len(rc_files) == len(self.files):
+            # the rc files that failed are not snapshot, to show their errors
+            changes = state.changes(self.env, self.ctx)
+            self.save(rc_files, changes, state.depends(self.files))
+        return rc_files
+
+    def restore(self):
+        """Applies the changes of the snapshot, returns the loaded rc files
+        or ``None`` if there is no usable snapshot.
+        """
+        try:
+            with open(self.filename, "rb") as f:
+                if not ON_WINDOWS:
+                    st = os.fstat(f.fileno())
+                    if st.st_uid != os.getuid() or st.st_mode & 0o077:
+                        return None
+                if not _check_cache_versions(f):
+                    return None
+                data = pickle.load(f)
+        except Exception:
+            # missing, corrupted or refers to something that is gone
+            return None
+        if data.get("key") != self.key:
+            return None
+        if any(_stamp(f) != st for f, st in data.get("depends", ())):
+            return None
+        _touch(self.filename)
+        self._apply(data["changes"])
+        return data["rc_files"]
+
+    def _apply(self, changes):
+        env = self.env
+        for key, value in changes["env"].items():
+            env[key] = value
+        for key in changes["env_del"]:
+            with contextlib.suppress(KeyError):
+                del env[key]
+        if changes["xontribs"]:
+            from xonsh.xontribs import xontribs_load
+
+            _, err, _ = xontribs_load(changes["xontribs"])
+            if err:
+                print(err, file=sys.stderr, end="")
+            # the rc files may have changed variables after loading them
+            glb = env._d._global
+            for key, value in changes["env"].items():
+                if glb.get(key) is not value:
+                    env[key] = value
+        sys.path.extend(p for p in changes["sys_path"] if p not in sys.path)
+        self.ctx.update(changes["ctx"])
+        for key in changes["ctx_del"]:
+            self.ctx.pop(key, None)
+        aliases = XSH.aliases
+        for key, (value, doc) in changes["aliases"].items():
+            aliases[key] = {"alias": value, "doc": doc} if doc else value
+        for key in changes["aliases_del"]:
+            aliases.pop(key, None)
+        if changes["completers"] is not None:
+            XSH.completers.clear()
+            XSH.completers.update(changes["completers"])
+        for name, handler in changes["handlers"]:
+            getattr(events, name).add(handler)
+        for name, handler in changes["handlers_del"]:
+            getattr(events, name).discard(handler)
+
+    def save(self, rc_files, changes, depends=()):
+        """Saves the ``changes`` made by the rc files, if they can all be
+        pickled. ``depends`` are the files the snapshot is valid for, as
+        returned by :meth:`_SessionState.depends`.
+        """
+        try:
+            data = _dumps(
+                {
+                    "key": self.key,
+                    "rc_files": rc_files,
+                    "depends": list(depends),
+                    "changes": changes,
+                }
+            )
+        except Exception:
+            if self.env.get("XONSH_DEBUG"):
+                print_warning(
+                    f"xonsh: the rc files cannot be snapshot, {_unpicklable(changes)}"
+                )
+            return
+        dirname = os.path.dirname(self.filename)
+        tmpfname = f"{self.filename}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(dirname, exist_ok=True)
+            fd = os.open(tmpfname, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with open(fd, "wb") as f:
+                f.write(XONSH_VERSION.encode() + b"\n")
+                f.write(bytes(PYTHON_VERSION_INFO_BYTES) + b"\n")
+                f.write(data)
+            os.replace(tmpfname, self.filename)
+        except OSError as e:
+            with contextlib.suppress(OSError):
+                os.remove(tmpfname)
+            if self.env.get("XONSH_DEBUG"):
+                print_warning(f"xonsh: could not save the startup snapshot: {e}")
+            return
+        prune_cache(dirname, max_files=MAX_SNAPSHOTS)
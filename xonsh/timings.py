@@ -16,7 +16,8 @@ import time
 import timeit
 
 from xonsh.built_ins import XSH
-from xonsh.events import events
+from xonsh.events import AbstractEvent, events
+from xonsh.lib import startup_profile
 from xonsh.lib.lazyasd import lazybool, lazyobject
 
 
@@ -246,9 +247,96 @@ def timeit_alias(args, stdin=None):
 _timings = {"start": clock()}
 
 
+def _event_namer():
+    names = {}
+
+    def event_name(event):
+        name = names.get(id(event))
+        if name is None:
+            names.clear()
+            names.update((id(e), n) for n, e in vars(events).items())
+            name = names.get(id(event), "event")
+        return name
+
+    return event_name
+
+
+def setup_startup_profile(filename=None):
+    """Extends the startup profiler with the timing probes and the event
+    handlers, and reports it once xonsh is initialized. The folded stacks
+    are written to ``filename``, if given.
+    """
+    profiler = startup_profile.start()
+    event_name = _event_namer()
+    probes = {}
+
+    @events.on_timingprobe
+    def profile_on_timingprobe(name, **kw):
+        # ``pre_X`` and ``post_X`` probes delimit a phase
+        prefix, _, phase = name.partition("_")
+        if prefix == "pre" and profiler.stop_time is None:
+            probes[phase] = profiler.push(phase)
+        elif prefix == "post" and phase in probes:
+            profiler.pop(probes.pop(phase))
+
+    def timed_call_handler(call_handler):
+        def _call_handler(event, handler, kwargs):
+            module = getattr(handler, "__module__", None)
+            if profiler.stop_time is not None or module == __name__:
+                return call_handler(event, handler, kwargs)
+            name = getattr(handler, "__qualname__", type(handler).__name__)
+            name = f"{event_name(event)} {module}.{name}"
+            with profiler.frame(name):
+                return call_handler(event, handler, kwargs)
+
+        return _call_handler
+
+    profiler.patch(AbstractEvent, "_call_handler", timed_call_handler)
+
+    @events.on_post_init
+    def profile_on_post_init(**kw):
+        profiler.stop()
+        print_startup_profile(profiler, file=sys.stderr)
+        if filename:
+            with open(filename, "w", encoding="utf-8") as f:
+                f.write(profiler.folded())
+            print(f"Startup profile written to {filename}", file=sys.stderr)
+
+    return profiler
+
+
+def print_startup_profile(profiler, file=None, limit=20):
+    """Prints the frames of the startup profile that took longest."""
+    totals = profiler.totals()
+    selfs = {}
+    for names, t in profiler.stacks.items():
+        selfs[names[-1]] = selfs.get(names[-1], 0.0) + t
+    root = totals.pop(profiler.root, 0.0)
+    top = sorted(totals.items(), key=lambda x: x[1], reverse=True)[:limit]
+    width = min(max([len(name) for name, _ in top] + [len("Startup frame")]), 70) + 2
+    row_format = f"|{{:<{width}}}|{{:^11.3f}}|{{:^11.3f}}|"
+    sepline = "|{}|{}|{}|".format("-" * width, "-" * 11, "-" * 11)
+    print(sepline, file=file)
+    print(
+        f"|{{:<{width}}}|{{:^11}}|{{:^11}}|".format(
+            "Startup frame", "Total (s)", "Self (s)"
+        ),
+        file=file,
+    )
+    print(sepline, file=file)
+    root_self = selfs.get(profiler.root, 0.0)
+    print(row_format.format(profiler.root, root, root_self), file=file)
+    for name, total in top:
+        label = name if len(name) <= 70 else name[:67] + "..."
+        print(row_format.format(label, total, selfs[name]), file=file)
+    print(sepline, file=file)
+
+
 def setup_timings(argv):
     global _timings
-    if "--timings" in argv:
+    timings, filename = startup_profile.timings_options(argv)
+    if timings:
+        setup_startup_profile(filename)
         events.doc(
             "on_timingprobe",
             """
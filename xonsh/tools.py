@@ -905,6 +905,9 @@ def strip_continuation_comments(src):
         out.append(raw)
         accumulated += raw
         in_triple = bool(_have_open_triple_quotes(accumulated))
+        if not in_triple:
+            # no string spans the line break, so rescanning can start afresh
+            accumulated = ""
         in_cont = False if in_triple else _ends_with_line_continuation(body, linecont)
     return "".join(out)
 
@@ -17,10 +17,19 @@ import xonsh.wizard as wiz
 from xonsh import __version__ as XONSH_VERSION
 from xonsh.built_ins import XSH
 from xonsh.cli_utils import Arg, ArgParserAlias
+from xonsh.codecache import (
+    cache_budget,
+    cache_dirs,
+    cache_usage,
+    clear_cache,
+    prune_cache,
+)
 from xonsh.events import events
 from xonsh.foreign_shells import CANON_SHELL_NAMES
 from xonsh.lib.lazyasd import lazyobject
+from xonsh.parser import parser_backend
 from xonsh.parsers import ply
+from xonsh.parsers.lexer import TOKEN_STREAMS
 from xonsh.platform import (
     DEFAULT_ENCODING,
     ON_CYGWIN,
@@ -38,6 +47,7 @@ from xonsh.platform import (
     ptk_version,
     pygments_version,
 )
+from xonsh.procs.executables import EXECUTABLE_CACHE
 from xonsh.prompt.base import is_template_string
 from xonsh.tools import (
     color_style,
@@ -530,6 +540,7 @@ def _info(
         [
             ("Python", "{}.{}.{}".format(*PYTHON_VERSION_INFO)),
             ("PLY", ply.__version__),
+            ("parser", parser_backend()),
             ("have readline", is_readline_available()),
             ("prompt toolkit", ptk_version() or None),
             ("shell type", env.get("SHELL_TYPE")),
@@ -578,11 +589,81 @@ def _info(
         if (val := XSH.env.get(e)) is not None and (show_if is None or val == show_if):
             data.extend([(e, val)])
 
+    if XSH.execer is not None:
+        stats = XSH.execer.line_cache.stats()
+        data.append(
+            (
+                "parser line cache",
+                "{hits} hits, {misses} misses, {size}/{maxsize} lines".format(**stats),
+            )
+        )
+    stats = TOKEN_STREAMS.stats()
+    data.append(
+        (
+            "token stream cache",
+            "{hits} hits, {misses} misses, {size}/{maxsize} inputs".format(**stats),
+        )
+    )
+    stats = EXECUTABLE_CACHE.stats()
+    data.append(
+        (
+            "executable cache",
+            "{hits} hits, {misses} misses, {size}/{maxsize} names, "
+            "{invalidations} invalidations".format(**stats),
+        )
+    )
+
     formatter = _xonfig_format_json if to_json else _xonfig_format_human
     s = formatter(data)
     return s
 
 
+def _cache(
+    prune=False,
+    clear=False,
+    to_json=False,
+):
+    """Reports on xonsh's code caches, and prunes or clears them
+
+    Parameters
+    ----------
+    prune : -p, --prune
+        evict the least recently used entries of the code and transform caches
+        beyond $XONSH_CODE_CACHE_MAX_FILES and $XONSH_CODE_CACHE_MAX_SIZE
+    clear : -c, --clear
+        remove all cached entries
+    to_json : -j, --json
+        reports results as json
+    """
+    max_files, max_bytes = cache_budget()
+    data: list[tp.Any] = []
+    for name, cachedir in cache_dirs().items():
+        if clear:
+            removed, freed = clear_cache(cachedir)
+        elif prune and name != "script":
+            removed, freed = prune_cache(cachedir, max_files, max_bytes)
+        else:
+            removed = freed = None
+        nfiles, nbytes = cache_usage(cachedir)
+        data.extend(
+            [
+                (f"{name} cache", cachedir),
+                (f"{name} cache files", nfiles),
+                (f"{name} cache bytes", nbytes),
+            ]
+        )
+        if removed is not None:
+            data.append((f"{name} cache removed", f"{removed} files, {freed} bytes"))
+    data.extend(
+        [
+            ("max files", max_files or "unlimited"),
+            ("max bytes", max_bytes or "unlimited"),
+        ]
+    )
+    formatter = _xonfig_format_json if to_json else _xonfig_format_human
+    return formatter(data)
+
+
 def _styles(to_json=False, _stdout=None):
     """Prints available xonsh color styles
 
@@ -730,6 +811,7 @@ class XonfigAlias(ArgParserAlias):
         parser.add_command(_web)
         parser.add_command(_wizard)
         parser.add_command(_styles)
+        parser.add_command(_cache)
         parser.add_command(_colors)
         parser.add_command(_tutorial)
         for fn in self.extra_commands: